@@ -5,4 +5,4 @@ psql -U ${POSTGRES_USER} <<-END
     CREATE DATABASE ${DJANGO_POSTGRES_DB} OWNER ${DJANGO_POSTGRES_USER};
 END
 
-psql -U ${POSTGRES_USER} ${DJANGO_POSTGRES_DB} -c 'CREATE EXTENSION IF NOT EXISTS hstore;'
+psql -U ${POSTGRES_USER} ${DJANGO_POSTGRES_DB} -c 'CREATE EXTENSION IF NOT EXISTS hstore; CREATE EXTENSION IF NOT EXISTS pg_trgm;'
@@ -5,4 +5,4 @@ psql -U postgres <<-END
     CREATE DATABASE utmcraft_opensource OWNER dev;
 END
 
-psql -U postgres utmcraft_opensource -c 'CREATE EXTENSION IF NOT EXISTS hstore;'
+psql -U postgres utmcraft_opensource -c 'CREATE EXTENSION IF NOT EXISTS hstore; CREATE EXTENSION IF NOT EXISTS pg_trgm;'
@@ -0,0 +1,181 @@
+"""
+Синтетический каталог для бенчмарков: форма с 50+ полями интерфейса, цепочка из
+10 Combined/Lookup-полей, select на 10 000 элементов и Lookup-таблица на 50 000 ключей.
+"""
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+
+from core.models import (
+    CheckboxFormField,
+    CombinedField,
+    Form,
+    InputIntFormField,
+    InputTextFormField,
+    LookupTableEntry,
+    LookupTableField,
+    SelectFormField,
+)
+
+User = get_user_model()
+
+INPUT_TEXT_FIELDS = 30
+INPUT_INT_FIELDS = 10
+CHECKBOX_FIELDS = 6
+SELECT_FIELDS = 6
+SELECT_CHOICES = 10_000
+LOOKUP_KEYS = 50_000
+CHAIN_LEVELS = 10
+# Максимальное количество полей в строке интерфейса формы.
+UI_ROW_SIZE = 6
+
+
+@dataclass
+class Catalog:
+    user: User
+    form: Form
+    big_select: SelectFormField
+    big_lookup: LookupTableField
+    # Поле ввода, которое используется во всех уровнях цепочки (для переименования).
+    chain_input: InputTextFormField
+    chain: list[CombinedField | LookupTableField] = field(default_factory=list)
+    ui_fields: list = field(default_factory=list)
+
+    def get_form_data(self, i: int) -> dict[str, str]:
+        """Данные формы, уникальные для каждого i."""
+        form_data = {}
+        for n, ui_field in enumerate(self.ui_fields):
+            pk = str(ui_field.pk)
+            if isinstance(ui_field, InputTextFormField):
+                form_data[pk] = f"value {n} {i}"
+            elif isinstance(ui_field, InputIntFormField):
+                form_data[pk] = str(i % 100)
+            elif isinstance(ui_field, CheckboxFormField):
+                if (i + n) % 2:
+                    form_data[pk] = "on"
+            elif isinstance(ui_field, SelectFormField):
+                form_data[pk] = f"choice_{(i * 7919 + n) % SELECT_CHOICES}"
+        return form_data
+
+
+def _create(model, user: User, title: str, **kwargs):
+    obj = model(
+        title=title,
+        full_title=f"{model.FIELD_TYPE}-{title}-{user.username}",
+        user=user,
+        label=title[:50],
+        **kwargs,
+    )
+    obj.save()
+    return obj
+
+
+def build_catalog(username: str = "benchmark") -> Catalog:
+    user = User.objects.create_user(username=username, password=username)
+    ui_fields = []
+    for i in range(INPUT_TEXT_FIELDS):
+        ui_fields.append(_create(InputTextFormField, user, f"text_{i}"))
+    for i in range(INPUT_INT_FIELDS):
+        ui_fields.append(_create(InputIntFormField, user, f"int_{i}"))
+    for i in range(CHECKBOX_FIELDS):
+        ui_fields.append(_create(CheckboxFormField, user, f"checkbox_{i}"))
+    choices = {f"Choice {i}": f"choice_{i}" for i in range(SELECT_CHOICES)}
+    selects = [
+        _create(
+            SelectFormField, user, f"select_{i}", choices=choices, is_searchable=True
+        )
+        for i in range(SELECT_FIELDS)
+    ]
+    ui_fields.extend(selects)
+    big_select = selects[0]
+    chain_input = ui_fields[0]
+
+    big_lookup = _create(
+        LookupTableField,
+        user,
+        "big_lookup",
+        depends_field=big_select,
+        default_value=["$" + ui_fields[1].full_title],
+        external_entries=True,
+    )
+    LookupTableEntry.objects.bulk_create(
+        [
+            LookupTableEntry(
+                field=big_lookup,
+                key=f"choice_{i}",
+                build_rule=[f"lookup_{i}", "$" + ui_fields[2 + i % 20].full_title],
+            )
+            for i in range(LOOKUP_KEYS)
+        ],
+        batch_size=5000,
+    )
+
+    # Цепочка: каждый уровень зависит от предыдущего, Lookup-поля – от select-полей.
+    chain = []
+    previous = big_lookup
+    for level in range(CHAIN_LEVELS):
+        if level % 2:
+            depends_field = selects[1 + level % (SELECT_FIELDS - 1)]
+            obj = _create(
+                LookupTableField,
+                user,
+                f"chain_{level}",
+                depends_field=depends_field,
+                default_value=["$" + previous.full_title],
+                lookup_values={
+                    f"choice_{i}": ["$" + previous.full_title, f"level_{level}_{i}"]
+                    for i in range(0, SELECT_CHOICES, 10)
+                },
+            )
+        else:
+            obj = _create(
+                CombinedField,
+                user,
+                f"chain_{level}",
+                build_rule=[
+                    "$" + previous.full_title,
+                    "$" + chain_input.full_title,
+                    "$" + ui_fields[INPUT_TEXT_FIELDS + level].full_title,
+                ],
+                separator="_",
+                add_hash=level == CHAIN_LEVELS - 2,
+            )
+        chain.append(obj)
+        previous = obj
+    url_field = _create(
+        CombinedField,
+        user,
+        "url",
+        build_rule=[
+            "https://example.com/?utm_source=",
+            "$" + ui_fields[3].full_title,
+            "&utm_campaign=",
+            "$" + previous.full_title,
+        ],
+        separator="",
+        clean_value=False,
+        chars_settings=CombinedField.CharsSettings.NOT_SET,
+    )
+
+    form = Form(
+        title="benchmark",
+        full_title=f"benchmark-{user.username}",
+        user=user,
+        main_result_field=url_field,
+        ui=[
+            [f"${f.full_title}" for f in ui_fields[i : i + UI_ROW_SIZE]]
+            for i in range(0, len(ui_fields), UI_ROW_SIZE)
+        ],
+    )
+    form.save()
+    form.result_fields.set(chain)
+    user.profile.forms.add(form)
+    return Catalog(
+        user=user,
+        form=form,
+        big_select=big_select,
+        big_lookup=big_lookup,
+        chain_input=chain_input,
+        chain=chain,
+        ui_fields=ui_fields,
+    )
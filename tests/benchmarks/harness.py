@@ -0,0 +1,140 @@
+import gc
+import json
+import math
+import platform
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from django.db import connections
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    rounds: int
+    ops_per_sec: float
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    queries_per_op: float
+    max_queries: int
+    peak_memory_kb: float
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    i = max(math.ceil(q * len(sorted_values)) - 1, 0)
+    return sorted_values[i]
+
+
+def measure(
+    name: str,
+    func: Callable[..., Any],
+    setup: Callable[[int], tuple] | None = None,
+    rounds: int = 50,
+    warmup: int = 3,
+) -> BenchmarkResult:
+    """
+    Замеряет функцию: время каждого вызова, количество SQL-запросов и пиковую память.
+    :param setup: Готовит аргументы вызова номер i, время подготовки не учитывается
+    """
+    setup = setup or (lambda i: ())
+    for i in range(warmup):
+        func(*setup(-i - 1))
+    durations = []
+    queries = []
+    gc.collect()
+    for i in range(rounds):
+        args = setup(i)
+        counter = _QueryCounter()
+        with connections["default"].execute_wrapper(counter):
+            started_at = time.perf_counter()
+            func(*args)
+            durations.append(time.perf_counter() - started_at)
+        queries.append(counter.count)
+    # tracemalloc сильно замедляет код, поэтому память замеряется отдельным вызовом.
+    args = setup(rounds)
+    tracemalloc.start()
+    try:
+        func(*args)
+        __, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    durations.sort()
+    mean = sum(durations) / len(durations)
+    return BenchmarkResult(
+        name=name,
+        rounds=rounds,
+        ops_per_sec=1 / mean if mean else math.inf,
+        mean_ms=mean * 1000,
+        p50_ms=_percentile(durations, 0.5) * 1000,
+        p90_ms=_percentile(durations, 0.9) * 1000,
+        p99_ms=_percentile(durations, 0.99) * 1000,
+        max_ms=durations[-1] * 1000,
+        queries_per_op=sum(queries) / len(queries),
+        max_queries=max(queries),
+        peak_memory_kb=peak / 1024,
+    )
+
+
+def save_results(path: Path, results: list[BenchmarkResult]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "benchmarks": {result.name: asdict(result) for result in results},
+    }
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
+
+
+def load_baseline(path: Path) -> dict[str, dict]:
+    return json.loads(path.read_text())["benchmarks"]
+
+
+def compare(
+    results: list[BenchmarkResult], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """
+    Регрессии относительно baseline: скорость упала или память выросла больше чем на
+    tolerance, количество SQL-запросов выросло. Замер без записи в baseline тоже
+    считается регрессией.
+    """
+    regressions = []
+    for result in results:
+        if not (base := baseline.get(result.name)):
+            regressions.append(
+                f"{result.name}: no baseline, run with --benchmark-save-baseline"
+            )
+            continue
+        if result.ops_per_sec < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: {result.ops_per_sec:.1f} ops/sec, baseline"
+                f" {base['ops_per_sec']:.1f}"
+            )
+        if result.queries_per_op > base["queries_per_op"]:
+            regressions.append(
+                f"{result.name}: {result.queries_per_op:.1f} queries/op, baseline"
+                f" {base['queries_per_op']:.1f}"
+            )
+        if result.peak_memory_kb > base["peak_memory_kb"] * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: {result.peak_memory_kb:.0f} KB peak memory, baseline"
+                f" {base['peak_memory_kb']:.0f} KB"
+            )
+    return regressions
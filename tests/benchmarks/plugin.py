@@ -0,0 +1,113 @@
+"""
+Плагин pytest для бенчмарков: бенчмарки запускаются только с --benchmarks, результаты
+сохраняются в JSON и сравниваются с baseline. Регрессия относительно baseline
+завершает запуск с ошибкой.
+"""
+from pathlib import Path
+
+import pytest
+
+from benchmarks.harness import BenchmarkResult, compare, load_baseline, save_results
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+
+_results: list[BenchmarkResult] = []
+_regressions: list[str] = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--benchmarks", action="store_true", help="Run benchmarks (tests/benchmarks)"
+    )
+    group.addoption(
+        "--benchmark-json",
+        default=str(BENCHMARKS_DIR / "results.json"),
+        help="Path of the JSON file with benchmark results",
+    )
+    group.addoption(
+        "--benchmark-baseline",
+        default=str(BENCHMARKS_DIR / "baseline.json"),
+        help="Path of the baseline JSON file to compare results with",
+    )
+    group.addoption(
+        "--benchmark-save-baseline",
+        action="store_true",
+        help="Save results as the new baseline instead of comparing",
+    )
+    group.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown and memory growth (default 0.2)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: performance benchmark, runs only with --benchmarks"
+    )
+    if not config.getoption("--benchmarks") or config.getoption(
+        "--benchmark-save-baseline"
+    ):
+        return
+    # Без baseline сравнивать не с чем, ошибка до запуска долгих замеров.
+    if not (baseline_path := Path(config.getoption("--benchmark-baseline"))).exists():
+        raise pytest.UsageError(
+            f"No benchmark baseline at {baseline_path}: record it on the reference"
+            " machine with --benchmark-save-baseline and commit the file"
+        )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks run only with --benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def benchmark_results() -> list[BenchmarkResult]:
+    return _results
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    config = session.config
+    save_results(Path(config.getoption("--benchmark-json")), _results)
+    baseline_path = Path(config.getoption("--benchmark-baseline"))
+    if config.getoption("--benchmark-save-baseline"):
+        save_results(baseline_path, _results)
+        return
+    _regressions.extend(
+        compare(
+            _results,
+            load_baseline(baseline_path),
+            config.getoption("--benchmark-tolerance"),
+        )
+    )
+    if _regressions:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.line(
+        f"{'name':<32} {'ops/sec':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}"
+        f" {'queries':>8} {'peak KB':>10}"
+    )
+    for r in _results:
+        terminalreporter.line(
+            f"{r.name:<32} {r.ops_per_sec:>10.1f} {r.p50_ms:>9.2f} {r.p90_ms:>9.2f}"
+            f" {r.p99_ms:>9.2f} {r.queries_per_op:>8.1f} {r.peak_memory_kb:>10.0f}"
+        )
+    baseline_path = Path(config.getoption("--benchmark-baseline"))
+    if config.getoption("--benchmark-save-baseline"):
+        terminalreporter.line(f"Baseline saved to {baseline_path}")
+    for regression in _regressions:
+        terminalreporter.line(f"REGRESSION {regression}", red=True, bold=True)
@@ -0,0 +1,78 @@
+"""
+Бенчмарки горячих путей: прометка, отрисовка формы, парсинг, валидация формы
+и переименование поля. Запуск: pytest ... --benchmarks.
+"""
+import pytest
+
+from benchmarks.catalog import Catalog, build_catalog
+from benchmarks.harness import measure
+from core.models import Form, InputTextFormField
+from core.services.form_constructor import FormFactory
+from core.services.utm_builder import UtmBuilder
+from core.services.utm_parser import UtmParser
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+@pytest.fixture(scope="module")
+def catalog(django_db_setup, django_db_blocker) -> Catalog:
+    with django_db_blocker.unblock():
+        return build_catalog()
+
+
+def test_utm_builder(catalog, benchmark_results):
+    def setup(i: int) -> tuple:
+        post_data = {"form_id": catalog.form.pk, "form_data": catalog.get_form_data(i)}
+        return (UtmBuilder(user=catalog.user, post_data=post_data),)
+
+    result = measure("utm_builder", lambda builder: builder(), setup=setup)
+    benchmark_results.append(result)
+
+
+def test_form_factory(catalog, benchmark_results):
+    result = measure(
+        "form_factory",
+        lambda: FormFactory(user=catalog.user, form=catalog.form)(),
+        rounds=20,
+    )
+    benchmark_results.append(result)
+
+
+def test_utm_parser(catalog, benchmark_results):
+    hashcodes = []
+    for i in range(10):
+        post_data = {"form_id": catalog.form.pk, "form_data": catalog.get_form_data(i)}
+        builder = UtmBuilder(user=catalog.user, post_data=post_data)
+        builder()
+        hashcodes.append(builder.hashcode)
+
+    result = measure(
+        "utm_parser",
+        lambda hashcode: UtmParser(user=catalog.user)(utm_hashcode=hashcode),
+        setup=lambda i: (hashcodes[i % len(hashcodes)],),
+    )
+    benchmark_results.append(result)
+
+
+def test_form_full_clean(catalog, benchmark_results):
+    result = measure(
+        "form_full_clean",
+        lambda form: form.full_clean(),
+        setup=lambda i: (Form.objects.get(pk=catalog.form.pk),),
+    )
+    benchmark_results.append(result)
+
+
+def test_field_rename(catalog, benchmark_results):
+    titles = (catalog.chain_input.title, f"{catalog.chain_input.title}_renamed")
+
+    def setup(i: int) -> tuple:
+        # Каждый раунд переименовывает поле туда или обратно, post_save заменяет
+        # название во всех Combined/Lookup-полях, Lookup-записях и форме.
+        obj = InputTextFormField.objects.get(pk=catalog.chain_input.pk)
+        obj.title = titles[(i + 1) % 2]
+        obj.clean()
+        return (obj,)
+
+    result = measure("field_rename", lambda obj: obj.save(), setup=setup, rounds=20)
+    benchmark_results.append(result)
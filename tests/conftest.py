@@ -1 +1 @@
-pytest_plugins = []
+pytest_plugins = ["benchmarks.plugin", "fixtures.forms", "query_budgets.plugin"]
@@ -0,0 +1,215 @@
+"""
+Типовые данные для тестов: форма со всеми типами полей, зависимостью select-полей,
+Combined- и Lookup-полями, и пользователь с доступом к клиентской админке.
+"""
+from dataclasses import dataclass, field
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from core.models import (
+    CheckboxFormField,
+    CombinedField,
+    Form,
+    InputIntFormField,
+    InputTextFormField,
+    LookupTableEntry,
+    LookupTableField,
+    RadiobuttonFormField,
+    SelectFormField,
+    SelectFormFieldDependence,
+)
+from core.services.utm_builder import UtmBuilder
+
+User = get_user_model()
+
+# Количество полей каждого типа: больше одного, чтобы запросы в цикле по полям
+# отличались от одиночных запросов.
+FIELDS_PER_TYPE = 3
+CHOICES = {f"Choice {i}": f"choice_{i}" for i in range(5)}
+
+
+@dataclass
+class FormSet:
+    user: User
+    form: Form
+    input_text_fields: list[InputTextFormField] = field(default_factory=list)
+    input_int_fields: list[InputIntFormField] = field(default_factory=list)
+    checkbox_fields: list[CheckboxFormField] = field(default_factory=list)
+    radiobutton_fields: list[RadiobuttonFormField] = field(default_factory=list)
+    select_fields: list[SelectFormField] = field(default_factory=list)
+    select_dependence: SelectFormFieldDependence | None = None
+
+    def get_form_data(self) -> dict[str, str]:
+        form_data = {}
+        for i, obj in enumerate(self.input_text_fields):
+            form_data[str(obj.pk)] = f"text {i}"
+        for i, obj in enumerate(self.input_int_fields):
+            form_data[str(obj.pk)] = str(i)
+        for obj in self.checkbox_fields[::2]:
+            form_data[str(obj.pk)] = "on"
+        for i, obj in enumerate([*self.radiobutton_fields, *self.select_fields]):
+            form_data[str(obj.pk)] = f"choice_{i % len(CHOICES)}"
+        return form_data
+
+    @property
+    def ui_fields(self) -> list:
+        return [
+            *self.input_text_fields,
+            *self.input_int_fields,
+            *self.checkbox_fields,
+            *self.radiobutton_fields,
+            *self.select_fields,
+        ]
+
+
+def _create(model, user: User, title: str, **kwargs):
+    obj = model(
+        title=title,
+        full_title=f"{model.FIELD_TYPE}-{title}-{user.username}",
+        user=user,
+        label=title,
+        **kwargs,
+    )
+    obj.save()
+    return obj
+
+
+def create_form_set(username: str) -> FormSet:
+    user = User.objects.create_user(username=username, password=username)
+    input_text_fields = [
+        _create(InputTextFormField, user, f"text_{i}") for i in range(FIELDS_PER_TYPE)
+    ]
+    input_int_fields = [
+        _create(InputIntFormField, user, f"int_{i}") for i in range(FIELDS_PER_TYPE)
+    ]
+    checkbox_fields = [
+        _create(CheckboxFormField, user, f"checkbox_{i}")
+        for i in range(FIELDS_PER_TYPE)
+    ]
+    radiobutton_fields = [
+        _create(RadiobuttonFormField, user, f"radio_{i}", choices=CHOICES)
+        for i in range(FIELDS_PER_TYPE)
+    ]
+    select_fields = [
+        _create(SelectFormField, user, f"select_{i}", choices=CHOICES)
+        for i in range(FIELDS_PER_TYPE)
+    ]
+    select_dependence = SelectFormFieldDependence(
+        title="select_dependence",
+        full_title=f"select_dependence-{user.username}",
+        user=user,
+        parent_field=select_fields[0],
+        child_field=select_fields[1],
+        values={"choice_0": ["Choice 1", "Choice 2"]},
+    )
+    select_dependence.save()
+
+    lookup = _create(
+        LookupTableField,
+        user,
+        "lookup",
+        depends_field=select_fields[2],
+        default_value=["$" + input_text_fields[0].full_title],
+        lookup_values={
+            value: [value, "$" + input_text_fields[1].full_title]
+            for value in CHOICES.values()
+        },
+    )
+    entries_lookup = _create(
+        LookupTableField,
+        user,
+        "entries_lookup",
+        depends_field=radiobutton_fields[0],
+        default_value=[""],
+        external_entries=True,
+    )
+    LookupTableEntry.objects.bulk_create(
+        [
+            LookupTableEntry(
+                field=entries_lookup,
+                key=value,
+                build_rule=[value, "$" + input_int_fields[0].full_title],
+            )
+            for value in CHOICES.values()
+        ]
+    )
+    campaign = _create(
+        CombinedField,
+        user,
+        "campaign",
+        build_rule=[
+            "$" + lookup.full_title,
+            "$" + entries_lookup.full_title,
+            "$" + select_fields[0].full_title,
+            "$" + input_text_fields[2].full_title,
+        ],
+        separator="_",
+    )
+    url = _create(
+        CombinedField,
+        user,
+        "url",
+        build_rule=[
+            "https://example.com/?utm_source=",
+            "$" + radiobutton_fields[1].full_title,
+            "&utm_campaign=",
+            "$" + campaign.full_title,
+        ],
+        separator="",
+        clean_value=False,
+        chars_settings=CombinedField.CharsSettings.NOT_SET,
+    )
+
+    form_set = FormSet(
+        user=user,
+        form=Form(title="form", full_title=f"form-{user.username}", user=user),
+        input_text_fields=input_text_fields,
+        input_int_fields=input_int_fields,
+        checkbox_fields=checkbox_fields,
+        radiobutton_fields=radiobutton_fields,
+        select_fields=select_fields,
+        select_dependence=select_dependence,
+    )
+    form = form_set.form
+    form.main_result_field = url
+    form.ui = [
+        [f"${obj.full_title}" for obj in form_set.ui_fields[i : i + 5]]
+        for i in range(0, len(form_set.ui_fields), 5)
+    ]
+    form.save()
+    form.result_fields.set([lookup, entries_lookup, campaign])
+    form.select_dependencies.set([select_dependence])
+    user.profile.forms.add(form)
+    return form_set
+
+
+@pytest.fixture
+def form_set(db) -> FormSet:
+    return create_form_set("form_owner")
+
+
+@pytest.fixture
+def client_admin_form_set(form_set) -> FormSet:
+    """Владелец формы с доступом ко всем полям формы в клиентской админке."""
+    profile = form_set.user.profile
+    profile.client_admin_access = True
+    profile.save()
+    client_admin = form_set.user.clientadmin
+    client_admin.input_text_fields.set(form_set.input_text_fields)
+    client_admin.input_int_fields.set(form_set.input_int_fields)
+    client_admin.checkbox_fields.set(form_set.checkbox_fields)
+    client_admin.radiobutton_fields.set(form_set.radiobutton_fields)
+    client_admin.select_fields.set(form_set.select_fields)
+    client_admin.select_dependencies.set([form_set.select_dependence])
+    return form_set
+
+
+@pytest.fixture
+def utm_hashcode(form_set) -> str:
+    builder = UtmBuilder(
+        user=form_set.user,
+        post_data={"form_id": form_set.form.pk, "form_data": form_set.get_form_data()},
+    )
+    builder()
+    return builder.hashcode
@@ -0,0 +1,164 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from django.db import connection, transaction
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import TASKS
+from jobs.services import (
+    cancel_job,
+    claim_job,
+    enqueue_job,
+    requeue_stale_jobs,
+    run_job,
+)
+
+
+@pytest.fixture
+def task(monkeypatch):
+    """Регистрирует функцию задачи на время теста."""
+
+    def register(name, func):
+        monkeypatch.setitem(TASKS, name, func)
+        return name
+
+    return register
+
+
+def _in_thread(func, *args):
+    """Вызывает функцию в отдельном потоке – со своим соединением с БД, как другой
+    обработчик. Ожидание блокировки ограничено, чтобы тест падал, а не зависал."""
+
+    def target():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET lock_timeout = '5s'")
+            return func(*args)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(target).result()
+
+
+def test_claim_skips_job_locked_by_another_worker(transactional_db, task):
+    name = task("test.noop", lambda ctx: None)
+    first, second = enqueue_job(name), enqueue_job(name)
+    with transaction.atomic():
+        # Первую задачу в этот момент забирает другой обработчик.
+        Job.objects.select_for_update().get(pk=first.pk)
+        claimed = _in_thread(claim_job, "worker-2")
+    assert claimed.pk == second.pk
+    assert claim_job("worker-1").pk == first.pk
+    assert claim_job("worker-1") is None
+
+
+def test_concurrent_claims_return_different_jobs(transactional_db, task):
+    name = task("test.noop", lambda ctx: None)
+    jobs = [enqueue_job(name) for _ in range(20)]
+    barrier = threading.Barrier(4)
+
+    def claim_all(worker: str) -> list[int]:
+        barrier.wait()
+        pks = []
+        try:
+            while job := claim_job(worker):
+                pks.append(job.pk)
+        finally:
+            connection.close()
+        return pks
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        claimed = [
+            pk
+            for pks in executor.map(claim_all, [f"worker-{i}" for i in range(4)])
+            for pk in pks
+        ]
+    assert sorted(claimed) == sorted(job.pk for job in jobs)
+    assert Job.objects.filter(status=Job.Status.RUNNING, attempts=1).count() == 20
+
+
+def test_failed_job_is_retried_with_backoff_then_failed(db, task, settings):
+    settings.JOBS_RETRY_DELAY = 30
+
+    def fail(ctx):
+        raise RuntimeError("boom")
+
+    job = enqueue_job(task("test.fail", fail), max_attempts=3)
+    for attempt in range(1, 4):
+        claimed = claim_job("worker-1")
+        assert claimed.pk == job.pk
+        assert claimed.attempts == attempt
+        failed_at = timezone.now()
+        run_job(claimed)
+        job.refresh_from_db()
+        if attempt == 3:
+            break
+        assert job.status == Job.Status.QUEUED
+        delay = timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** (attempt - 1))
+        assert failed_at + delay <= job.run_after <= timezone.now() + delay
+        # Задача не забирается раньше run_after.
+        assert claim_job("worker-1") is None
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+    assert job.status == Job.Status.FAILED
+    assert job.attempts == 3
+    assert "RuntimeError: boom" in job.error
+    assert job.finished_at is not None
+    assert claim_job("worker-1") is None
+
+
+def test_stale_running_job_is_requeued(db, task, settings):
+    settings.JOBS_HEARTBEAT_TIMEOUT = 60
+    name = task("test.noop", lambda ctx: None)
+    stale, alive = enqueue_job(name), enqueue_job(name)
+    claim_job("worker-1"), claim_job("worker-2")
+    Job.objects.filter(pk=stale.pk).update(
+        heartbeat_at=timezone.now() - timedelta(seconds=61)
+    )
+
+    assert requeue_stale_jobs() == 1
+
+    stale.refresh_from_db()
+    alive.refresh_from_db()
+    assert stale.status == Job.Status.QUEUED
+    assert "heartbeat lost" in stale.error
+    assert alive.status == Job.Status.RUNNING
+
+
+def test_stale_job_without_attempts_left_is_failed(db, task):
+    job = enqueue_job(task("test.noop", lambda ctx: None), max_attempts=1)
+    claim_job("worker-1")
+    Job.objects.filter(pk=job.pk).update(
+        heartbeat_at=timezone.now() - timedelta(days=1)
+    )
+
+    assert requeue_stale_jobs() == 1
+
+    job.refresh_from_db()
+    assert job.status == Job.Status.FAILED
+
+
+def test_cancelled_job_stops_at_next_progress(db, task, settings):
+    settings.JOBS_PROGRESS_INTERVAL = 0
+    steps = []
+
+    def work(ctx):
+        for i in range(10):
+            ctx.progress(i, total=10)
+            steps.append(i)
+            if i == 2:
+                # Задачу отменяют, пока она выполняется.
+                assert cancel_job(ctx.job)
+        return "done"
+
+    job = enqueue_job(task("test.work", work))
+    run_job(claim_job("worker-1"))
+
+    job.refresh_from_db()
+    assert steps == [0, 1, 2]
+    assert job.status == Job.Status.CANCELLED
+    assert job.result is None
+    assert not cancel_job(job)
@@ -0,0 +1,89 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+
+from core.models import InputIntFormField, InputTextFormField, LookupTableField
+
+User = get_user_model()
+
+
+def _create(model, user: User, title: str, **kwargs):
+    obj = model(
+        title=title,
+        full_title=f"{model.FIELD_TYPE}-{title}-{user.username}",
+        user=user,
+        label=title,
+        **kwargs,
+    )
+    obj.full_clean()
+    obj.save()
+    return obj
+
+
+@pytest.fixture
+def user(db) -> User:
+    return User.objects.create_user(username="lookup_owner", password="lookup_owner")
+
+
+@pytest.mark.parametrize(
+    "key_mode, depends_model, lookup_values",
+    [
+        (LookupTableField.KeyMode.EXACT, InputTextFormField, {"a": ["x"]}),
+        (
+            LookupTableField.KeyMode.RANGE,
+            InputIntFormField,
+            {"..17": ["child"], "18..64": ["adult"], "65..": ["senior"]},
+        ),
+        (
+            LookupTableField.KeyMode.PREFIX,
+            InputTextFormField,
+            {"promo": ["promo"], "promo_vk": ["vk"]},
+        ),
+        (
+            LookupTableField.KeyMode.REGEX,
+            InputTextFormField,
+            {r"(?i:promo)\d+": ["promo"], r"cp[cm]": ["paid"]},
+        ),
+    ],
+)
+def test_save_lookup_field(user, key_mode, depends_model, lookup_values):
+    depends_field = _create(depends_model, user, "depends")
+    lookup = _create(
+        LookupTableField,
+        user,
+        "lookup",
+        depends_field=depends_field,
+        default_value=[""],
+        key_mode=key_mode,
+        lookup_values=lookup_values,
+    )
+    lookup.refresh_from_db()
+    assert lookup.lookup_values == lookup_values
+
+
+@pytest.mark.parametrize(
+    "key_mode, depends_model, lookup_values",
+    [
+        (
+            LookupTableField.KeyMode.RANGE,
+            InputIntFormField,
+            {"..20": ["a"], "18..64": ["b"]},
+        ),
+        (LookupTableField.KeyMode.REGEX, InputTextFormField, {"(?i)promo": ["a"]}),
+        (LookupTableField.KeyMode.REGEX, InputTextFormField, {r"(a)\1": ["a"]}),
+        (LookupTableField.KeyMode.REGEX, InputTextFormField, {"(?P<x>a)": ["a"]}),
+    ],
+)
+def test_invalid_lookup_keys(user, key_mode, depends_model, lookup_values):
+    depends_field = _create(depends_model, user, "depends")
+    with pytest.raises(ValidationError) as e:
+        _create(
+            LookupTableField,
+            user,
+            "lookup",
+            depends_field=depends_field,
+            default_value=[""],
+            key_mode=key_mode,
+            lookup_values=lookup_values,
+        )
+    assert "lookup_values" in e.value.message_dict
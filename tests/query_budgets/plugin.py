@@ -0,0 +1,125 @@
+"""
+Бюджеты SQL-запросов: фикстура query_budget записывает запросы эндпоинта или сервиса
+и сравнивает их с бюджетом из tests/query_budgets/budgets/<name>.json. Тест падает,
+если общее количество запросов или количество запросов какого-либо вида (отпечатка)
+выросло. В сообщении об ошибке выводятся повторяющиеся отпечатки – обычно это N+1.
+
+Обновление бюджетов после осознанного изменения запросов: --update-query-budgets.
+Тест без файла бюджета падает.
+"""
+import json
+import re
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from django.db import connections
+
+BUDGETS_DIR = Path(__file__).resolve().parent / "budgets"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Списки параметров IN (%s, %s, ...) и VALUES (...), (...) разной длины дают один
+# отпечаток.
+_IN_RE = re.compile(r"\bIN \((?:%s(?:, )?)+\)")
+_VALUES_RE = re.compile(r"\bVALUES (?:\([^()]*\)(?:, )?)+")
+_SAVEPOINT_RE = re.compile(r'"s\d+_x\d+"')
+
+
+def get_fingerprint(sql: str) -> str:
+    """Запрос без значений: параметры уже вынесены в %s, схлопываются списки
+    параметров и имена точек сохранения."""
+    sql = _WHITESPACE_RE.sub(" ", sql).strip()
+    sql = _IN_RE.sub("IN (...)", sql)
+    sql = _VALUES_RE.sub("VALUES (...)", sql)
+    return _SAVEPOINT_RE.sub('"savepoint"', sql)
+
+
+class _QueryRecorder:
+    def __init__(self):
+        self.fingerprints = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.fingerprints.append(get_fingerprint(sql))
+        return execute(sql, params, many, context)
+
+
+class QueryBudget:
+    def __init__(self, update: bool):
+        self.update = update
+
+    @contextmanager
+    def __call__(self, name: str):
+        recorder = _QueryRecorder()
+        with connections["default"].execute_wrapper(recorder):
+            yield
+        counts = Counter(recorder.fingerprints)
+        path = BUDGETS_DIR / f"{name}.json"
+        if self.update:
+            _save_budget(path, counts)
+            return
+        if not path.exists():
+            pytest.fail(
+                (
+                    f"No query budget for {name!r}: record it with"
+                    " --update-query-budgets and commit the file"
+                ),
+                pytrace=False,
+            )
+        if errors := _check_budget(name, counts, json.loads(path.read_text())):
+            pytest.fail(errors, pytrace=False)
+
+
+def _save_budget(path: Path, counts: Counter) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "queries": sum(counts.values()),
+        "fingerprints": dict(sorted(counts.items())),
+    }
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
+
+
+def _check_budget(name: str, counts: Counter, budget: dict) -> str | None:
+    total = sum(counts.values())
+    budget_counts = budget["fingerprints"]
+    exceeded = {
+        fingerprint: (count, budget_counts.get(fingerprint, 0))
+        for fingerprint, count in counts.items()
+        if count > budget_counts.get(fingerprint, 0)
+    }
+    if total <= budget["queries"] and not exceeded:
+        return
+    lines = [
+        f"Query budget exceeded for {name!r}: {total} queries, budget"
+        f" {budget['queries']}"
+    ]
+    if exceeded:
+        lines.append("Fingerprints over budget (queries, budget):")
+        for fingerprint, (count, budget_count) in sorted(
+            exceeded.items(), key=lambda item: -item[1][0]
+        ):
+            lines.append(f"  {count:>4} {budget_count:>4}  {fingerprint}")
+    if duplicates := [(f, c) for f, c in counts.most_common() if c > 1]:
+        lines.append("Duplicate fingerprints:")
+        for fingerprint, count in duplicates:
+            lines.append(f"  {count:>4}  {fingerprint}")
+    lines.append("If the new queries are expected, run with --update-query-budgets")
+    return "\n".join(lines)
+
+
+def pytest_addoption(parser):
+    parser.getgroup("query budgets").addoption(
+        "--update-query-budgets",
+        action="store_true",
+        help="Rewrite query budget files with the recorded queries",
+    )
+
+
+@pytest.fixture
+def query_budget(request) -> QueryBudget:
+    """
+    Использование:
+        with query_budget("core.api_form_html"):
+            client.get(...)
+    """
+    return QueryBudget(update=request.config.getoption("--update-query-budgets"))
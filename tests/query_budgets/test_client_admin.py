@@ -0,0 +1,46 @@
+from django.urls import reverse
+
+
+def test_main(client, client_admin_form_set, query_budget):
+    client.force_login(client_admin_form_set.user)
+    with query_budget("client_admin.main"):
+        response = client.get(reverse("client_admin:main"))
+    assert response.status_code == 302
+
+
+def test_ui_select(client, client_admin_form_set, query_budget):
+    client.force_login(client_admin_form_set.user)
+    with query_budget("client_admin.ui_select"):
+        response = client.get(
+            reverse("client_admin:ui-select"),
+            {"f": client_admin_form_set.form.pk},
+        )
+    assert response.status_code == 200
+
+
+def test_api_input_text_update(client, client_admin_form_set, query_budget):
+    client.force_login(client_admin_form_set.user)
+    obj = client_admin_form_set.input_text_fields[0]
+    with query_budget("client_admin.api_input_text_update"):
+        response = client.patch(
+            reverse("client_admin:api-input-text-detail", args=[obj.pk]),
+            {"label": "new label"},
+            content_type="application/json",
+        )
+    assert response.status_code == 200
+
+
+def test_api_select_bulk_update(client, client_admin_form_set, query_budget):
+    client.force_login(client_admin_form_set.user)
+    # Запросы не должны расти с количеством объектов (проверка прав по объектам).
+    items = [
+        {"id": obj.pk, "label": f"new label {i}"}
+        for i, obj in enumerate(client_admin_form_set.select_fields)
+    ]
+    with query_budget("client_admin.api_select_bulk_update"):
+        response = client.patch(
+            reverse("client_admin:api-select-bulk-partial-update"),
+            items,
+            content_type="application/json",
+        )
+    assert response.status_code == 200
@@ -0,0 +1,70 @@
+from django.urls import reverse
+
+from core.services.form_constructor import FormFactory
+from core.services.utm_builder import UtmBuilder
+from core.services.utm_parser import UtmParser
+
+
+def test_main_page(client, form_set, query_budget):
+    client.force_login(form_set.user)
+    with query_budget("core.main_page"):
+        response = client.get(reverse("core:main_page"))
+    assert response.status_code == 200
+
+
+def test_api_form_html(client, form_set, query_budget):
+    client.force_login(form_set.user)
+    with query_budget("core.api_form_html"):
+        response = client.get(
+            reverse("core:api_form_html"), {"form_id": form_set.form.pk}
+        )
+    assert response.status_code == 200
+
+
+def test_api_result_blocks_html(client, form_set, query_budget):
+    client.force_login(form_set.user)
+    with query_budget("core.api_result_blocks_html"):
+        response = client.post(
+            reverse("core:api_result_blocks_html"),
+            {"form_id": form_set.form.pk, "form_data": form_set.get_form_data()},
+            content_type="application/json",
+        )
+    assert response.status_code == 200
+
+
+def test_api_parser(client, form_set, utm_hashcode, query_budget):
+    client.force_login(form_set.user)
+    with query_budget("core.api_parser"):
+        response = client.get(
+            reverse("core:api_parser"), {"utm_hashcode": utm_hashcode}
+        )
+    assert response.status_code == 200
+
+
+def test_api_parser_batch(client, form_set, utm_hashcode, query_budget):
+    client.force_login(form_set.user)
+    with query_budget("core.api_parser_batch"):
+        response = client.post(
+            reverse("core:api_parser_batch"),
+            {"utm_hashcodes": [utm_hashcode, "not_found"]},
+            content_type="application/json",
+        )
+        # Ответ отдается потоком: запросы выполняются при чтении ответа.
+        b"".join(response.streaming_content)
+    assert response.status_code == 200
+
+
+def test_form_factory(form_set, query_budget):
+    with query_budget("core.form_factory"):
+        FormFactory(user=form_set.user, form=form_set.form)()
+
+
+def test_utm_builder(form_set, query_budget):
+    post_data = {"form_id": form_set.form.pk, "form_data": form_set.get_form_data()}
+    with query_budget("core.utm_builder"):
+        UtmBuilder(user=form_set.user, post_data=post_data)()
+
+
+def test_utm_parser(form_set, utm_hashcode, query_budget):
+    with query_budget("core.utm_parser"):
+        UtmParser(user=form_set.user)(utm_hashcode=utm_hashcode)
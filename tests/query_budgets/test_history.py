@@ -0,0 +1,18 @@
+from django.urls import reverse
+
+from core.services.utm_builder import UtmBuilder
+
+
+def test_history(client, form_set, query_budget):
+    # Несколько результатов: запросы не должны расти с количеством строк Истории.
+    for i in range(3):
+        form_data = form_set.get_form_data()
+        form_data[str(form_set.input_text_fields[0].pk)] = f"history {i}"
+        UtmBuilder(
+            user=form_set.user,
+            post_data={"form_id": form_set.form.pk, "form_data": form_data},
+        )()
+    client.force_login(form_set.user)
+    with query_budget("history.utm"):
+        response = client.get(reverse("history:utm"))
+    assert response.status_code == 200
@@ -0,0 +1,118 @@
+import pytest
+
+from core.models import CombinedField, LookupTableField, SelectFormField
+from core.services.utm_builder import FieldCalculator, build_form_plan
+from core.services.utm_bulk_builder import calculate_row, calculate_rows
+from fixtures.forms import CHOICES, FormSet
+
+TEXTS = ["Привет мир", "  Spaces & symbols=?#  ", "", "UPPER case", "ёлка"]
+
+
+def _create(model, form_set: FormSet, title: str, **kwargs):
+    user = form_set.user
+    obj = model(
+        title=title,
+        full_title=f"{model.FIELD_TYPE}-{title}-{user.username}",
+        user=user,
+        label=title,
+        **kwargs,
+    )
+    obj.save()
+    return obj
+
+
+@pytest.fixture
+def bulk_form_set(form_set) -> tuple[FormSet, SelectFormField, list[CombinedField]]:
+    """
+    Типовая форма с дополнительными результатами: Lookup-поле с зависимостью от
+    чекбокса, select с ручным вводом, добавление уникального кода, транслитерация и
+    urlencode.
+    """
+    custom_select = _create(
+        SelectFormField, form_set, "select_custom", choices=CHOICES, custom_input=True
+    )
+    text_0, text_1, text_2 = (
+        f"${obj.full_title}" for obj in form_set.input_text_fields
+    )
+    checkbox_lookup = _create(
+        LookupTableField,
+        form_set,
+        "checkbox_lookup",
+        depends_field=form_set.checkbox_fields[0],
+        default_value=["unchecked", text_0],
+        lookup_values={"on": ["checked", f"${custom_select.full_title}"]},
+    )
+    result_fields = [
+        checkbox_lookup,
+        _create(
+            CombinedField,
+            form_set,
+            "hashed",
+            build_rule=[text_0, f"${custom_select.full_title}"],
+            separator="-",
+            add_hash=True,
+        ),
+        _create(
+            CombinedField,
+            form_set,
+            "transliterated",
+            build_rule=[text_1, "Константа"],
+            separator=" ",
+            disable_lowercase=True,
+            chars_settings=CombinedField.CharsSettings.TRANSLITERATE,
+        ),
+        _create(
+            CombinedField,
+            form_set,
+            "urlencoded",
+            build_rule=[text_2, "&", f"${form_set.radiobutton_fields[2].full_title}"],
+            separator=" ",
+            clean_value=False,
+            chars_settings=CombinedField.CharsSettings.URLENCODE,
+            remove_blank_values=False,
+        ),
+    ]
+    form = form_set.form
+    form.ui = [*form.ui, [f"${custom_select.full_title}"]]
+    form.save()
+    form.result_fields.add(*result_fields)
+    return form_set, custom_select, result_fields
+
+
+def _get_rows(form_set: FormSet, custom_select: SelectFormField) -> list[dict]:
+    rows = []
+    for i in range(20):
+        row = form_set.get_form_data()
+        for j, obj in enumerate(form_set.input_text_fields):
+            row[str(obj.pk)] = TEXTS[(i + j) % len(TEXTS)]
+        row[str(form_set.checkbox_fields[0].pk)] = "on" if i % 2 else ""
+        # Пустое значение select – правило Lookup-поля по умолчанию.
+        row[str(form_set.select_fields[2].pk)] = (
+            "" if i % 6 == 5 else f"choice_{i % len(CHOICES)}"
+        )
+        row[str(form_set.radiobutton_fields[0].pk)] = f"choice_{i % 3}"
+        if i % 3:
+            row[str(custom_select.pk)] = f"choice_{i % len(CHOICES)}"
+        else:
+            row[str(custom_select.pk)] = custom_select.CHOICES_CUSTOM_INPUT_VALUE
+            row[custom_select.custom_value_pk] = f"Свой вариант {i}"
+        rows.append(row)
+    # Повтор строки: значения колонок берутся из кэша калькулятора.
+    rows.append(dict(rows[1]))
+    return rows
+
+
+def test_columnar_calculator_matches_field_calculator(bulk_form_set):
+    form_set, custom_select, result_fields = bulk_form_set
+    plan = build_form_plan(form_set.form, form_set.user)
+    rows = _get_rows(form_set, custom_select)
+
+    expected = [calculate_row(plan, form_set.user, row) for row in rows]
+    FieldCalculator.cache_clear()
+    results = calculate_rows(plan, form_set.user, rows)
+
+    assert results == expected
+    # Каждый дополнительный результат действительно посчитан хотя бы для одной строки.
+    titles = {block["title"] for result in results for block in result.result_blocks}
+    for field_obj in result_fields:
+        assert f"result-block-{field_obj.pk}" in titles
@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.utils.translation import gettext_lazy as _
 
 
@@ -10,7 +10,20 @@ class AuthenticationConfig(AppConfig):
 
     def ready(self):
         from django.contrib.auth.models import User
-        from authorization.signals import create_user_profile, save_user_profile
+        from authorization.models import Profile
+        from authorization.signals import (
+            create_user_profile,
+            invalidate_form_access,
+            invalidate_profile_access,
+            invalidate_profile_forms_access,
+            save_user_profile,
+        )
+        from core.models import Form
 
         post_save.connect(create_user_profile, sender=User)
         post_save.connect(save_user_profile, sender=User)
+        post_save.connect(invalidate_profile_access, sender=Profile)
+        m2m_changed.connect(
+            invalidate_profile_forms_access, sender=Profile.forms.through
+        )
+        pre_delete.connect(invalidate_form_access, sender=Form)
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired DB sessions in small batches instead of one huge DELETE"
+        " like clearsessions does"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Sessions per DELETE"
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Pause between batches in seconds to reduce DB load",
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in (
+            "django.contrib.sessions.backends.db",
+            "django.contrib.sessions.backends.cached_db",
+        ):
+            print(f"Sessions are not stored in DB ({settings.SESSION_ENGINE})")
+            return
+        batch_size = options["batch_size"]
+        now = timezone.now()
+        total = 0
+        while True:
+            session_keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list(
+                    "session_key", flat=True
+                )[:batch_size]
+            )
+            if not session_keys:
+                break
+            total += Session.objects.filter(session_key__in=session_keys).delete()[0]
+            print(f"Deleted {total} expired sessions")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
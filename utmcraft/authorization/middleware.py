@@ -0,0 +1,100 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+    get_user_model,
+    load_backend,
+)
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import (
+    AuthenticationMiddleware as DjangoAuthenticationMiddleware,
+)
+from django.contrib.auth.models import AnonymousUser
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+User = get_user_model()
+
+# Связи пользователя, которые нужны почти в каждом запросе.
+USER_RELATED_FIELDS = ("profile", "clientadmin")
+
+
+def get_user(request):
+    """
+    Повторяет django.contrib.auth.get_user, но для ModelBackend загружает пользователя
+    вместе с профилем и клиентской админкой одним запросом. Путь бэкенда в сессии не
+    меняется, поэтому существующие сессии остаются рабочими.
+    """
+    if hasattr(request, "_cached_user"):
+        return request._cached_user
+    started_at = time.perf_counter()
+    user = None
+    try:
+        user_id = User._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        pass
+    else:
+        if backend_path in settings.AUTHENTICATION_BACKENDS:
+            backend = load_backend(backend_path)
+            if isinstance(backend, ModelBackend):
+                user = _get_user_with_relations(backend, user_id)
+            else:
+                user = backend.get_user(user_id)
+            if hasattr(user, "get_session_auth_hash") and not _verify_session_hash(
+                request, user
+            ):
+                request.session.flush()
+                user = None
+    request._cached_user = user or AnonymousUser()
+    request._auth_duration = time.perf_counter() - started_at
+    return request._cached_user
+
+
+def _get_user_with_relations(backend: ModelBackend, user_id) -> User | None:
+    try:
+        user = User._default_manager.select_related(*USER_RELATED_FIELDS).get(
+            pk=user_id
+        )
+    except User.DoesNotExist:
+        return
+    return user if backend.user_can_authenticate(user) else None
+
+
+def _verify_session_hash(request, user: User) -> bool:
+    if not (session_hash := request.session.get(HASH_SESSION_KEY)):
+        return False
+    session_auth_hash = user.get_session_auth_hash()
+    if constant_time_compare(session_hash, session_auth_hash):
+        return True
+    # Проверка по SECRET_KEY_FALLBACKS есть не во всех поддерживаемых версиях Django.
+    if not hasattr(user, "get_session_auth_fallback_hash"):
+        return False
+    if any(
+        constant_time_compare(session_hash, fallback_auth_hash)
+        for fallback_auth_hash in user.get_session_auth_fallback_hash()
+    ):
+        request.session.cycle_key()
+        request.session[HASH_SESSION_KEY] = session_auth_hash
+        return True
+    return False
+
+
+class AuthenticationMiddleware(DjangoAuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request._request_started_at = time.perf_counter()
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+    def process_response(self, request, response):
+        # Доля аутентификации (сессия + пользователь) во времени обработки запроса.
+        if settings.SERVER_TIMING_HEADER and hasattr(request, "_request_started_at"):
+            total = time.perf_counter() - request._request_started_at
+            auth = getattr(request, "_auth_duration", 0)
+            response["Server-Timing"] = (
+                f"auth;dur={auth * 1000:.2f}, app;dur={total * 1000:.2f}"
+            )
+        return response
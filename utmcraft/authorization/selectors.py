@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from sortedm2m.fields import SORT_VALUE_FIELD_NAME
+
+from authorization.models import Profile
+
+User = get_user_model()
+
+USER_ACCESS_CACHE_KEY = "user_access:{user_pk}"
+# Атрибут пользователя, в котором доступы хранятся до конца запроса.
+USER_ACCESS_ATTR = "_user_access"
+
+
+@dataclass(frozen=True)
+class UserAccess:
+    # PK доступных форм в порядке, заданном в профиле пользователя.
+    form_ids: tuple[int, ...] = ()
+    client_admin_access: bool = False
+
+    @cached_property
+    def form_ids_set(self) -> frozenset[int]:
+        return frozenset(self.form_ids)
+
+    def has_form(self, pk: int) -> bool:
+        return pk in self.form_ids_set
+
+
+def get_user_access(user: User) -> UserAccess:
+    if not user.is_authenticated:
+        return UserAccess()
+    if (user_access := getattr(user, USER_ACCESS_ATTR, None)) is not None:
+        return user_access
+    cache_key = USER_ACCESS_CACHE_KEY.format(user_pk=user.pk)
+    if (user_access := cache.get(cache_key)) is None:
+        user_access = _load_user_access(user.pk)
+        cache.set(cache_key, user_access, timeout=settings.USER_ACCESS_CACHE_TIMEOUT)
+    setattr(user, USER_ACCESS_ATTR, user_access)
+    return user_access
+
+
+def invalidate_user_access(user_pks: Iterable[int]) -> None:
+    keys = [USER_ACCESS_CACHE_KEY.format(user_pk=user_pk) for user_pk in user_pks]
+    # До коммита параллельный запрос прочитал бы старые доступы и снова их закэшировал.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_profiles_user_pks(profile_pks: Iterable[int]) -> list[int]:
+    return list(
+        Profile.objects.filter(pk__in=profile_pks).values_list("user_id", flat=True)
+    )
+
+
+def _load_user_access(user_pk: int) -> UserAccess:
+    through = Profile.forms.through
+    form_ids = (
+        through.objects.filter(profile_id=OuterRef("pk"))
+        .values("profile_id")
+        .annotate(ids=ArrayAgg("form_id", ordering=SORT_VALUE_FIELD_NAME))
+        .values("ids")
+    )
+    row = (
+        Profile.objects.filter(user_id=user_pk)
+        .annotate(form_ids=Subquery(form_ids))
+        .values_list("form_ids", "client_admin_access")
+        .first()
+    )
+    if not row:
+        return UserAccess()
+    return UserAccess(form_ids=tuple(row[0] or ()), client_admin_access=row[1])
@@ -1,4 +1,5 @@
 from authorization.models import Profile
+from authorization.selectors import get_profiles_user_pks, invalidate_user_access
 
 
 def create_user_profile(sender, instance, created, **kwargs):  # noqa
@@ -8,3 +9,34 @@ def create_user_profile(sender, instance, created, **kwargs):  # noqa
 
 def save_user_profile(sender, instance, **kwargs):  # noqa
     instance.profile.save()
+
+
+def invalidate_profile_access(sender, instance, **kwargs):  # noqa
+    invalidate_user_access([instance.user_id])
+
+
+def invalidate_profile_forms_access(
+    sender, instance, action, reverse, pk_set, **kwargs  # noqa
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_user_access([instance.user_id])
+        return
+    # Изменение со стороны формы: instance – форма, pk_set – PK профилей.
+    if action == "pre_clear":
+        instance._cleared_profile_pks = list(
+            instance.profile_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        invalidate_user_access(
+            get_profiles_user_pks(getattr(instance, "_cleared_profile_pks", []))
+        )
+    elif action in ("post_add", "post_remove") and pk_set:
+        invalidate_user_access(get_profiles_user_pks(pk_set))
+
+
+def invalidate_form_access(sender, instance, **kwargs):  # noqa
+    # Связи формы с профилями удаляются каскадно без сигнала m2m_changed.
+    invalidate_user_access(
+        Profile.objects.filter(forms=instance).values_list("user_id", flat=True)
+    )
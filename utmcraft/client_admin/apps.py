@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.utils.translation import gettext_lazy as _
 
 
@@ -10,7 +10,20 @@ class ClientAdminConfig(AppConfig):
 
     def ready(self):
         from django.contrib.auth.models import User
-        from client_admin.signals import create_client_admin, save_client_admin
+        from client_admin.models import ClientAdmin
+        from client_admin.selectors import CLIENT_ADMIN_RELATIONS
+        from client_admin.signals import (
+            create_client_admin,
+            invalidate_client_admin_object,
+            invalidate_client_admin_relations,
+            save_client_admin,
+        )
 
         post_save.connect(create_client_admin, sender=User)
         post_save.connect(save_client_admin, sender=User)
+        for model, relation in CLIENT_ADMIN_RELATIONS.items():
+            m2m_changed.connect(
+                invalidate_client_admin_relations,
+                sender=getattr(ClientAdmin, relation).through,
+            )
+            pre_delete.connect(invalidate_client_admin_object, sender=model)
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db import models, transaction
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 from sortedm2m.fields import SortedManyToManyField
 
@@ -58,20 +58,9 @@ class ClientAdmin(models.Model):
 
     @property
     def is_filled(self):
-        with transaction.atomic():
-            if self.input_text_fields.all().exists():
-                return True
-            if self.input_int_fields.all().exists():
-                return True
-            if self.checkbox_fields.all().exists():
-                return True
-            if self.radiobutton_fields.all().exists():
-                return True
-            if self.select_fields.all().exists():
-                return True
-            if self.select_dependencies.all().exists():
-                return True
-            return False
+        from client_admin.selectors import get_client_admin_capabilities
+
+        return get_client_admin_capabilities(self.user).is_filled
 
     class Meta:
         ordering = ["-pk"]
@@ -1,7 +1,13 @@
+from dataclasses import dataclass, field
 from typing import Iterable
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import QuerySet
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, QuerySet, Value
+
+from client_admin.models import ClientAdmin
 
 from core.models import (
     CheckboxFormField,
@@ -15,6 +21,16 @@ from core.selectors import get_user_form_by_pk
 
 User = get_user_model()
 
+# Связи ClientAdmin с полями, открытыми для редактирования, по моделям полей.
+CLIENT_ADMIN_RELATIONS = {
+    InputTextFormField: "input_text_fields",
+    InputIntFormField: "input_int_fields",
+    CheckboxFormField: "checkbox_fields",
+    RadiobuttonFormField: "radiobutton_fields",
+    SelectFormField: "select_fields",
+    SelectFormFieldDependence: "select_dependencies",
+}
+
 
 def get_input_text_fields_by_user(user_pk: int) -> QuerySet[InputTextFormField]:
     return InputTextFormField.objects.filter(user__pk=user_pk)
@@ -106,3 +122,101 @@ def get_client_admin_select_dependencies(
     if not form_pk:
         return select_deps.all()
     return select_deps.filter(form__pk=form_pk)
+
+
+def get_client_admin_available_pks(
+    user: User, model: type, pks: Iterable[int]
+) -> set[int]:
+    """PK объектов из pks, открытых пользователю в клиентской админке."""
+    if not (relation := CLIENT_ADMIN_RELATIONS.get(model)):
+        return set()
+    return get_client_admin_capabilities(user).pks[relation].intersection(pks)
+
+
+@dataclass(frozen=True)
+class ClientAdminCapabilities:
+    # PK объектов, открытых в клиентской админке, по связям ClientAdmin.
+    pks: dict[str, frozenset[int]] = field(
+        default_factory=lambda: {
+            relation: frozenset() for relation in CLIENT_ADMIN_RELATIONS.values()
+        }
+    )
+
+    def has_object(self, obj) -> bool:
+        if not (relation := CLIENT_ADMIN_RELATIONS.get(type(obj))):
+            return False
+        return obj.pk in self.pks[relation]
+
+    def exists(self, relation: str) -> bool:
+        return bool(self.pks[relation])
+
+    @property
+    def is_filled(self) -> bool:
+        return any(self.pks.values())
+
+
+CLIENT_ADMIN_CAPABILITIES_CACHE_KEY = "client_admin_capabilities:{user_pk}"
+# Атрибут пользователя, в котором возможности хранятся до конца запроса.
+CLIENT_ADMIN_CAPABILITIES_ATTR = "_client_admin_capabilities"
+
+
+def get_client_admin_capabilities(user: User) -> ClientAdminCapabilities:
+    if not user.is_authenticated:
+        return ClientAdminCapabilities()
+    if capabilities := getattr(user, CLIENT_ADMIN_CAPABILITIES_ATTR, None):
+        return capabilities
+    cache_key = CLIENT_ADMIN_CAPABILITIES_CACHE_KEY.format(user_pk=user.pk)
+    if (capabilities := cache.get(cache_key)) is None:
+        capabilities = _load_client_admin_capabilities(user.pk)
+        cache.set(cache_key, capabilities, timeout=settings.USER_ACCESS_CACHE_TIMEOUT)
+    setattr(user, CLIENT_ADMIN_CAPABILITIES_ATTR, capabilities)
+    return capabilities
+
+
+def invalidate_client_admin_capabilities(user_pks: Iterable[int]) -> None:
+    keys = [
+        CLIENT_ADMIN_CAPABILITIES_CACHE_KEY.format(user_pk=user_pk)
+        for user_pk in user_pks
+    ]
+    # До коммита параллельный запрос прочитал бы старые связи и снова их закэшировал.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_client_admins_user_pks(client_admin_pks: Iterable[int]) -> list[int]:
+    return list(
+        ClientAdmin.objects.filter(pk__in=client_admin_pks).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+def get_object_client_admins_user_pks(obj) -> list[int]:
+    """PK пользователей, у которых объект открыт в клиентской админке."""
+    if not (relation := CLIENT_ADMIN_RELATIONS.get(type(obj))):
+        return []
+    return list(
+        ClientAdmin.objects.filter(**{relation: obj}).values_list("user_id", flat=True)
+    )
+
+
+def _load_client_admin_capabilities(user_pk: int) -> ClientAdminCapabilities:
+    """Загружает PK объектов всех связей ClientAdmin одним UNION-запросом."""
+    queries = []
+    for relation in CLIENT_ADMIN_RELATIONS.values():
+        m2m_field = ClientAdmin._meta.get_field(relation)
+        queries.append(
+            m2m_field.remote_field.through.objects.filter(
+                **{f"{m2m_field.m2m_field_name()}__user_id": user_pk}
+            )
+            .annotate(relation=Value(relation, output_field=CharField()))
+            .order_by()
+            .values_list(f"{m2m_field.m2m_reverse_field_name()}_id", "relation")
+        )
+    pks = {relation: set() for relation in CLIENT_ADMIN_RELATIONS.values()}
+    for pk, relation in queries[0].union(*queries[1:], all=True):
+        pks[relation].add(pk)
+    return ClientAdminCapabilities(
+        pks={
+            relation: frozenset(relation_pks) for relation, relation_pks in pks.items()
+        }
+    )
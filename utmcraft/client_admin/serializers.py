@@ -1,4 +1,5 @@
 from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.serializers import raise_errors_on_nested_writes
 
@@ -145,3 +146,21 @@ class SelectDependenciesValuesErrorResponseSerializer(serializers.ModelSerialize
     class Meta:
         model = SelectFormFieldDependence
         fields = ("values",)
+
+
+class ChoiceOperationSerializer(serializers.Serializer):
+    ADD = "add"
+    RENAME = "rename"
+    REMOVE = "remove"
+
+    op = serializers.ChoiceField(choices=(ADD, RENAME, REMOVE))
+    label = serializers.CharField()
+    value = serializers.CharField(required=False, allow_blank=True)
+    new_label = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] == self.ADD and "value" not in attrs:
+            raise serializers.ValidationError({"value": [_("Обязательное поле.")]})
+        if attrs["op"] == self.RENAME and "new_label" not in attrs:
+            raise serializers.ValidationError({"new_label": [_("Обязательное поле.")]})
+        return attrs
@@ -1,4 +1,9 @@
 from client_admin.models import ClientAdmin
+from client_admin.selectors import (
+    get_client_admins_user_pks,
+    get_object_client_admins_user_pks,
+    invalidate_client_admin_capabilities,
+)
 
 
 def create_client_admin(sender, instance, created, **kwargs):  # noqa
@@ -8,3 +13,29 @@ def create_client_admin(sender, instance, created, **kwargs):  # noqa
 
 def save_client_admin(sender, instance, **kwargs):  # noqa
     instance.clientadmin.save()
+
+
+def invalidate_client_admin_relations(
+    sender, instance, action, reverse, pk_set, **kwargs  # noqa
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_client_admin_capabilities([instance.user_id])
+        return
+    # Изменение со стороны поля: instance – поле, pk_set – PK клиентских админок.
+    if action == "pre_clear":
+        instance._cleared_client_admin_user_pks = get_object_client_admins_user_pks(
+            instance
+        )
+    elif action == "post_clear":
+        invalidate_client_admin_capabilities(
+            getattr(instance, "_cleared_client_admin_user_pks", [])
+        )
+    elif action in ("post_add", "post_remove") and pk_set:
+        invalidate_client_admin_capabilities(get_client_admins_user_pks(pk_set))
+
+
+def invalidate_client_admin_object(sender, instance, **kwargs):  # noqa
+    # Связи удаляемого объекта с клиентскими админками удаляются каскадно без
+    # сигнала m2m_changed.
+    invalidate_client_admin_capabilities(get_object_client_admins_user_pks(instance))
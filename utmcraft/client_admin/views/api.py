@@ -1,10 +1,23 @@
+import copy
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.serializers import ValidationError as SerializerValidationError
 from rest_framework.viewsets import ModelViewSet
 
 from client_admin.permissions import ClientAdminAvailable
 from client_admin.selectors import (
     get_checkbox_fields_by_user,
+    get_client_admin_available_pks,
     get_input_int_fields_by_user,
     get_input_text_fields_by_user,
     get_radiobutton_fields_by_user,
@@ -14,6 +27,7 @@ from client_admin.selectors import (
 from client_admin.serializers import (
     CheckboxFieldErrorResponseSerializer,
     CheckboxFieldSerializer,
+    ChoiceOperationSerializer,
     InputIntFieldErrorResponseSerializer,
     InputIntFieldSerializer,
     InputTextFieldErrorResponseSerializer,
@@ -25,11 +39,134 @@ from client_admin.serializers import (
     SelectFieldErrorResponseSerializer,
     SelectFieldSerializer,
 )
+from core.services.choices import add_choice, remove_choice, rename_choice
+
+
+def _get_field_values(obj) -> dict:
+    return {
+        f.name: copy.deepcopy(f.value_from_object(obj))
+        for f in obj._meta.concrete_fields
+        if not f.primary_key
+    }
 
 
 class BaseClientAdminViewSet(ModelViewSet):
     permission_classes = (IsAuthenticated, ClientAdminAvailable)
     http_method_names = ("patch",)
+    # Связи, которые нужны для валидации объектов при массовом обновлении.
+    bulk_select_related = ("user",)
+
+    @extend_schema(
+        description=_(
+            "Массовое обновление объектов: массив объектов с id и изменяемыми полями."
+            " Изменения применяются, только если все объекты прошли валидацию, иначе"
+            " возвращаются ошибки по id объектов в формате ответа на обновление"
+            " одного объекта."
+        )
+    )
+    @action(detail=False, methods=["patch"], url_path="bulk")
+    def bulk_partial_update(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict) and isinstance(item.get("id"), int) for item in items
+        ):
+            return Response(
+                {"detail": _("Необходимо передать массив объектов с id.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.CLIENT_ADMIN_BULK_UPDATE_MAX_SIZE:
+            return Response(
+                {
+                    "detail": _("Можно обновить не больше %(max_size)s объектов.") % {
+                        "max_size": settings.CLIENT_ADMIN_BULK_UPDATE_MAX_SIZE
+                    }
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        pks = [item["id"] for item in items]
+        if len(set(pks)) != len(pks):
+            return Response(
+                {"detail": _("Каждый объект можно передать только один раз.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        model = self.get_serializer_class().Meta.model
+        with transaction.atomic():
+            objs = self.get_queryset().select_for_update(of=("self",))
+            objs = objs.select_related(*self.bulk_select_related).in_bulk(pks)
+            available_pks = get_client_admin_available_pks(request.user, model, pks)
+            errors, instances, fields = {}, [], set()
+            for item in items:
+                obj = objs.get(item["id"])
+                if obj is None or obj.pk not in available_pks:
+                    errors[item["id"]] = {"detail": _("Не найдено.")}
+                    continue
+                serializer = self.get_serializer(obj, data=item, partial=True)
+                if not serializer.is_valid():
+                    errors[obj.pk] = serializer.errors
+                    continue
+                initial_values = _get_field_values(obj)
+                for attr, value in serializer.validated_data.items():
+                    setattr(obj, attr, value)
+                try:
+                    # Поля клиентской админки не меняют название и владельца объекта,
+                    # поэтому проверки уникальности не нужны.
+                    obj.full_clean(validate_unique=False, validate_constraints=False)
+                except ValidationError as e:
+                    errors[obj.pk] = e.message_dict
+                    continue
+                instances.append(obj)
+                # Очистка тоже меняет поля (например, сбрасывает initial при изменении
+                # choices), они сохраняются так же, как при обновлении одного объекта.
+                fields.update(
+                    name
+                    for name, value in _get_field_values(obj).items()
+                    if value != initial_values[name]
+                )
+                obj.updated_at = timezone.now()
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            if instances:
+                model.objects.bulk_update(instances, fields=[*fields, "updated_at"])
+            for obj in instances:
+                obj.post_save()
+        return Response(self.get_serializer(instances, many=True).data)
+
+
+class ChoicesViewSetMixin:
+    """Точечное изменение элементов поля без передачи всего choices."""
+
+    @extend_schema(
+        description=_(
+            "Добавление (add), переименование (rename) или удаление (remove) одного"
+            " элемента поля."
+        ),
+        request=ChoiceOperationSerializer,
+        responses={
+            200: ChoiceOperationSerializer,
+            400: RadiobuttonFieldErrorResponseSerializer,
+        },
+    )
+    @action(detail=True, methods=["patch"], url_path="choices")
+    def update_choice(self, request, *args, **kwargs):
+        # Все элементы поля для операции не нужны.
+        field = get_object_or_404(self.get_queryset().only("pk"), pk=kwargs["pk"])
+        self.check_object_permissions(request, field)
+        serializer = ChoiceOperationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            match data["op"]:
+                case ChoiceOperationSerializer.ADD:
+                    add_choice(field, data["label"], data["value"])
+                case ChoiceOperationSerializer.RENAME:
+                    rename_choice(field, data["label"], data["new_label"])
+                case ChoiceOperationSerializer.REMOVE:
+                    remove_choice(field, data["label"])
+        except ValidationError as e:
+            raise SerializerValidationError(
+                e.message_dict if hasattr(e, "error_dict") else {"choices": e.messages}
+            )
+        return Response(serializer.data)
 
 
 @extend_schema(
@@ -83,7 +220,7 @@ class CheckboxViewSet(BaseClientAdminViewSet):
         400: RadiobuttonFieldErrorResponseSerializer,
     }
 )
-class RadiobuttonViewSet(BaseClientAdminViewSet):
+class RadiobuttonViewSet(ChoicesViewSetMixin, BaseClientAdminViewSet):
     serializer_class = RadiobuttonFieldSerializer
 
     def get_queryset(self):
@@ -97,7 +234,7 @@ class RadiobuttonViewSet(BaseClientAdminViewSet):
 @extend_schema(
     responses={200: SelectFieldSerializer, 400: SelectFieldErrorResponseSerializer}
 )
-class SelectViewSet(BaseClientAdminViewSet):
+class SelectViewSet(ChoicesViewSetMixin, BaseClientAdminViewSet):
     serializer_class = SelectFieldSerializer
 
     def get_queryset(self):
@@ -116,6 +253,7 @@ class SelectViewSet(BaseClientAdminViewSet):
 )
 class SelectDependenciesViewSet(BaseClientAdminViewSet):
     serializer_class = SelectDependenciesValuesSerializer
+    bulk_select_related = ("user", "parent_field", "child_field")
 
     def get_queryset(self):
         return get_select_dependencies_by_user(user_pk=self.request.user.pk)
@@ -1,12 +1,13 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import transaction
 from django.http import Http404
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
 from django.views import View
 from django.views.generic import ListView
 
+from authorization.selectors import get_user_access
 from client_admin.selectors import (
+    get_client_admin_capabilities,
     get_client_admin_checkbox_fields,
     get_client_admin_input_int_fields,
     get_client_admin_input_text_fields,
@@ -22,28 +23,27 @@ from core.models import (
     SelectFormField,
     SelectFormFieldDependence,
 )
+from core.selectors import get_user_forms
 
 
 class ClientAdminView(LoginRequiredMixin, View):
     login_url = reverse_lazy("auth:login")
 
     def get(self, request, *args, **kwargs):  # noqa
-        with transaction.atomic():
-            if not request.user.profile.client_admin_access:
-                raise Http404
-            if request.user.clientadmin.input_text_fields.all().exists():
-                return redirect(reverse("client_admin:ui-input-text"))
-            if request.user.clientadmin.input_int_fields.all().exists():
-                return redirect(reverse("client_admin:ui-input-int"))
-            if request.user.clientadmin.checkbox_fields.all().exists():
-                return redirect(reverse("client_admin:ui-checkbox"))
-            if request.user.clientadmin.radiobutton_fields.all().exists():
-                return redirect(reverse("client_admin:ui-radiobutton"))
-            if request.user.clientadmin.select_fields.all().exists():
-                return redirect(reverse("client_admin:ui-select"))
-            if request.user.clientadmin.select_dependencies.all().exists():
-                return redirect(reverse("client_admin:ui-select-deps"))
+        if not get_user_access(request.user).client_admin_access:
             raise Http404
+        capabilities = get_client_admin_capabilities(request.user)
+        for relation, url_name in (
+            ("input_text_fields", "client_admin:ui-input-text"),
+            ("input_int_fields", "client_admin:ui-input-int"),
+            ("checkbox_fields", "client_admin:ui-checkbox"),
+            ("radiobutton_fields", "client_admin:ui-radiobutton"),
+            ("select_fields", "client_admin:ui-select"),
+            ("select_dependencies", "client_admin:ui-select-deps"),
+        ):
+            if capabilities.exists(relation):
+                return redirect(reverse(url_name))
+        raise Http404
 
 
 class BaseClientAdminUiView(LoginRequiredMixin, ListView):
@@ -51,32 +51,20 @@ class BaseClientAdminUiView(LoginRequiredMixin, ListView):
     paginate_by = 25
 
     def get(self, request, *args, **kwargs):
-        if not request.user.profile.client_admin_access:
+        if not get_user_access(request.user).client_admin_access:
             raise Http404
         return super().get(request, *args, **kwargs)
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(**kwargs)
-        with transaction.atomic():
-            context["input_text_fields_exists"] = (
-                self.request.user.clientadmin.input_text_fields.all().exists()
-            )
-            context["input_int_fields_exists"] = (
-                self.request.user.clientadmin.input_int_fields.all().exists()
-            )
-            context["checkbox_fields_exists"] = (
-                self.request.user.clientadmin.checkbox_fields.all().exists()
-            )
-            context["radiobutton_fields_exists"] = (
-                self.request.user.clientadmin.radiobutton_fields.all().exists()
-            )
-            context["select_fields_exists"] = (
-                self.request.user.clientadmin.select_fields.all().exists()
-            )
-            context["selects_deps_exists"] = (
-                self.request.user.clientadmin.select_dependencies.all().exists()
-            )
-            context["utm_builders"] = self.request.user.profile.forms.all()
+        capabilities = get_client_admin_capabilities(self.request.user)
+        context["input_text_fields_exists"] = capabilities.exists("input_text_fields")
+        context["input_int_fields_exists"] = capabilities.exists("input_int_fields")
+        context["checkbox_fields_exists"] = capabilities.exists("checkbox_fields")
+        context["radiobutton_fields_exists"] = capabilities.exists("radiobutton_fields")
+        context["select_fields_exists"] = capabilities.exists("select_fields")
+        context["selects_deps_exists"] = capabilities.exists("select_dependencies")
+        context["utm_builders"] = get_user_forms(self.request.user)
         if value := self.request.GET.get("v"):
             context["active_form"] = value
         return context
@@ -0,0 +1,208 @@
+"""
+Неблокирующее логирование: обработчики с записью в файл, в консоль и отправкой писем
+работают в отдельных потоках QueueListener, а логгеры пишут записи в очередь.
+Поток запроса только собирает сообщение записи, форматирование и ввод-вывод выполняются
+в потоке обработчиков. Процессы, созданные fork после настройки логирования, пишут
+логи синхронно.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.config
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+from django.utils.log import AdminEmailHandler
+
+_listeners: list[QueueListener] = []
+# (логгер, его обработчик очереди, обработчики, перенесенные в QueueListener)
+_queued_loggers: list[tuple[logging.Logger, QueueHandler, list[logging.Handler]]] = []
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Кладет в очередь копию записи только с готовыми данными. Сообщение собирается
+    сразу: аргументы могут измениться после вызова логгера. Traceback записывается
+    текстом, а request убирается: после ответа поток обработчиков не должен трогать
+    ленивый request.user и кадры traceback. Обработчики с методом render (письмо об
+    ошибке) готовят свои данные здесь же, в потоке записи.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def __init__(self, queue, handlers: list[logging.Handler]):
+        super().__init__(queue)
+        self.handlers = handlers
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        for handler in self.handlers:
+            if (
+                hasattr(handler, "render")
+                and record.levelno >= handler.level
+                and handler.filter(record)
+            ):
+                handler.render(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exc_formatter.formatException(
+                record.exc_info
+            )
+        record.exc_info = None
+        record.__dict__.pop("request", None)
+        return record
+
+
+def configure_logging(config: dict) -> None:
+    """
+    LOGGING_CONFIG: применяет LOGGING и переносит обработчики из "queued_handlers"
+    в QueueListener. Для каждого набора обработчиков логгера создается своя очередь,
+    чтобы запись попадала только в обработчики своего логгера.
+    """
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+    _queued_loggers.clear()
+    config = dict(config)
+    queued_handlers = set(config.pop("queued_handlers", ()))
+    logging.config.dictConfig(config)
+    queue_handlers = {}
+    for logger_name in config.get("loggers", {}):
+        logger = logging.getLogger(logger_name)
+        handlers = [h for h in logger.handlers if h.get_name() in queued_handlers]
+        if not handlers:
+            continue
+        key = tuple(sorted(h.get_name() for h in handlers))
+        if (queue_handler := queue_handlers.get(key)) is None:
+            records = queue.SimpleQueue()
+            queue_handler = queue_handlers[key] = LazyQueueHandler(records, handlers)
+            listener = QueueListener(records, *handlers, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+        _queued_loggers.append((logger, queue_handler, handlers))
+
+
+def _unqueue_handlers() -> None:
+    # Потоки QueueListener не переживают fork: в дочернем процессе (воркеры заданий,
+    # пулы процессов прометки) записи из очередей никто бы не читал. Логгерам
+    # возвращаются их обработчики, и дочерний процесс пишет логи синхронно.
+    for logger, queue_handler, handlers in _queued_loggers:
+        logger.removeHandler(queue_handler)
+        for handler in handlers:
+            logger.addHandler(handler)
+    _queued_loggers.clear()
+    _listeners.clear()
+
+
+os.register_at_fork(after_in_child=_unqueue_handlers)
+
+
+@atexit.register
+def _stop_listeners() -> None:
+    # Обрабатывает записи, оставшиеся в очередях при завершении процесса.
+    for listener in _listeners:
+        listener.stop()
+
+
+class RateLimitedAdminEmailHandler(AdminEmailHandler):
+    """
+    Письмо об ошибке из одного места кода отправляется не чаще раза в interval секунд.
+    Количество пропущенных ошибок добавляется в следующее письмо. Письмо собирается
+    в render в потоке, где создана запись, а emit только отправляет его.
+    """
+
+    def __init__(self, interval: float = 300, **kwargs):
+        super().__init__(**kwargs)
+        self.interval = interval
+        # (логгер, файл, строка) -> (время последнего письма, пропущено писем)
+        self._sent: dict[tuple[str, str, int], tuple[float, int]] = {}
+
+    def render(self, record: logging.LogRecord) -> None:
+        """Сохраняет в record.email тему, текст и HTML письма или None, если письмо
+        из этого места кода недавно отправлялось."""
+        record.email = None
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            sent_at, suppressed = self._sent.get(key, (None, 0))
+            if sent_at is not None and now - sent_at < self.interval:
+                self._sent[key] = (sent_at, suppressed + 1)
+                return
+            self._sent[key] = (now, 0)
+        # Как в AdminEmailHandler.emit.
+        try:
+            request = record.request
+            subject = "%s (%s IP): %s" % (
+                record.levelname,
+                (
+                    "internal"
+                    if request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+                    else "EXTERNAL"
+                ),
+                record.getMessage(),
+            )
+        except Exception:
+            subject = "%s: %s" % (record.levelname, record.getMessage())
+            request = None
+        no_exc_record = copy.copy(record)
+        no_exc_record.exc_info = None
+        no_exc_record.exc_text = None
+        exc_info = record.exc_info or (None, record.getMessage(), None)
+        reporter = self.reporter_class(request, is_email=True, *exc_info)
+        message = f"{self.format(no_exc_record)}\n\n{reporter.get_traceback_text()}"
+        if suppressed:
+            message = (
+                f"{suppressed} similar errors were not sent in the last"
+                f" {now - sent_at:.0f} seconds\n\n{message}"
+            )
+        html_message = reporter.get_traceback_html() if self.include_html else None
+        record.email = (self.format_subject(subject), message, html_message)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Запись не прошла через очередь (например, в процессе после fork).
+        if not hasattr(record, "email"):
+            self.render(record)
+        if record.email is None:
+            return
+        subject, message, html_message = record.email
+        self.send_mail(subject, message, fail_silently=True, html_message=html_message)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей уровня DEBUG, остальные уровни – все."""
+
+    def __init__(self, rate: float = 0.01, name: str = ""):
+        super().__init__(name)
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись в одну строку JSON: поля события передаются в extra={"event": {...}}."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "event", {}),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
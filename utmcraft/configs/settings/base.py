@@ -26,6 +26,7 @@ APP_VERSION_NUMBER = (Path(BASE_DIR) / "version.txt").read_text().strip()
 # Logging
 
 LOGGING = logging_config
+LOGGING_CONFIG = "configs.log.configure_logging"
 
 # Application definition
 
@@ -45,16 +46,20 @@ INSTALLED_APPS = [
     "core",
     "history",
     "client_admin",
+    "jobs",
+    "monitoring",
 ]
 
 CRISPY_TEMPLATE_PACK = "bootstrap4"
 
 MIDDLEWARE = [
+    "monitoring.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "authorization.middleware.AuthenticationMiddleware",
+    "monitoring.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -129,6 +134,78 @@ CSRF_FAILURE_VIEW = "core.views.ui.error_403_csrf_handler"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 365 * 2  # 2 года
+# Для высокой нагрузки: django.contrib.sessions.backends.cached_db или .cache.
+SESSION_ENGINE = os.getenv(
+    "DJANGO_SESSION_ENGINE", "django.contrib.sessions.backends.db"
+)
+# Заголовок Server-Timing с длительностью аутентификации и обработки запроса.
+SERVER_TIMING_HEADER = (
+    os.getenv("DJANGO_SERVER_TIMING_HEADER", "false").lower() == "true"
+)
+# Доступы пользователя к формам и клиентской админке (см. authorization/selectors.py).
+USER_ACCESS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# UTM data storage
+# Блоки результата прометки хранятся как схема формы + массив значений.
+UTM_RESULT_COMPACT_STORAGE = (
+    os.getenv("DJANGO_UTM_RESULT_COMPACT_STORAGE", "true").lower() == "true"
+)
+# Максимальное количество уникальных кодов в одном запросе пакетного парсера.
+UTM_PARSER_BATCH_MAX_SIZE = 10000
+# Кэш разрешения уникальных кодов ссылок (см. core/services/hashcode_cache.py).
+UTM_HASHCODE_CACHE_TIMEOUT = 60 * 60 * 24
+UTM_HASHCODE_NEGATIVE_CACHE_TIMEOUT = 60
+UTM_HASHCODE_LOCAL_CACHE_SIZE = 10000
+UTM_HASHCODE_BLOOM_FILTER = (
+    os.getenv("DJANGO_UTM_HASHCODE_BLOOM_FILTER", "false").lower() == "true"
+)
+UTM_HASHCODE_BLOOM_FILTER_REBUILD_INTERVAL = 60 * 10
+# Матрица прометок: максимальное количество комбинаций и размер пачки расчета.
+UTM_MATRIX_MAX_SIZE = 10000
+UTM_MATRIX_CHUNK_SIZE = 500
+# Максимальное количество объектов в одном запросе массового обновления клиентской
+# админки.
+CLIENT_ADMIN_BULK_UPDATE_MAX_SIZE = 500
+
+# Background jobs (см. jobs/services.py)
+# Пауза между опросами пустой очереди, секунд.
+JOBS_POLL_INTERVAL = 1
+# Выполняемая задача обновляет heartbeat_at каждые JOBS_HEARTBEAT_INTERVAL секунд и
+# возвращается в очередь, если сигнала не было JOBS_HEARTBEAT_TIMEOUT секунд.
+JOBS_HEARTBEAT_INTERVAL = 10
+JOBS_HEARTBEAT_TIMEOUT = 60
+# Прогресс задачи сохраняется не чаще раза в JOBS_PROGRESS_INTERVAL секунд.
+JOBS_PROGRESS_INTERVAL = 1
+JOBS_MAX_ATTEMPTS = 3
+# Задержка перед повторным запуском после ошибки, удваивается с каждым запуском.
+JOBS_RETRY_DELAY = 30
+JOBS_LIST_MAX_SIZE = 50
+
+# Monitoring (см. monitoring/metrics.py)
+METRICS_ENABLED = os.getenv("DJANGO_METRICS_ENABLED", "false").lower() == "true"
+# Каталог файлов метрик процессов, общий для всех процессов gunicorn.
+METRICS_DIR = os.getenv("DJANGO_METRICS_DIR", os.path.join(BASE_DIR, "metrics"))
+METRICS_FLUSH_INTERVAL = 5
+
+# Профилирование запросов staff-пользователей по заголовку X-Utmcraft-Profile или
+# параметру ?_profile.
+PROFILER_ENABLED = os.getenv("DJANGO_PROFILER_ENABLED", "true").lower() == "true"
+# Интервал семплирования стека потока запроса, в секундах.
+PROFILER_INTERVAL = 0.005
+# Сохраняются только последние PROFILER_MAX_PROFILES профилей.
+PROFILER_MAX_PROFILES = 200
+# Количество SQL-запросов и длина параметров запроса, сохраняемые в профиле.
+PROFILER_MAX_QUERIES = 1000
+PROFILER_MAX_PARAMS_LENGTH = 1000
+
+# ASGI (configs/asgi.py): async-версии эндпоинтов прометки, HTML формы и парсера.
+# Под WSGI включать не нужно – каждый async-запрос будет выполняться в своем event loop.
+ASYNC_VIEWS_ENABLED = os.getenv("DJANGO_ASYNC_VIEWS_ENABLED", "false").lower() == "true"
+# Количество потоков процесса, в которых async-представления выполняют запросы к БД.
+ASYNC_DB_THREADS = int(os.getenv("DJANGO_ASYNC_DB_THREADS", "10"))
+
+# Archive
+UTM_ARCHIVE_DIR = os.getenv("DJANGO_UTM_ARCHIVE_DIR", os.path.join(BASE_DIR, "archive"))
 
 # Other
 USE_THOUSAND_SEPARATOR = True
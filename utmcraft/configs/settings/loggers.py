@@ -1,16 +1,30 @@
 import os
 
 log_level = os.getenv("DJANGO_LOG_LEVEL", "INFO")
+logs_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs"
+)
+# Доля записываемых DEBUG-записей логгеров с большим потоком записей.
+debug_sample_rate = float(os.getenv("DJANGO_LOG_DEBUG_SAMPLE_RATE", "0.01"))
 
 logging_config = {
     "version": 1,
     "disable_existing_loggers": False,
-    "filters": {"require_debug_false": {"()": "django.utils.log.RequireDebugFalse"}},
+    "filters": {
+        "require_debug_false": {"()": "django.utils.log.RequireDebugFalse"},
+        "sample_debug": {
+            "()": "configs.log.SamplingFilter",
+            "rate": debug_sample_rate,
+        },
+    },
     "formatters": {
         "standard": {
             "format": "%(asctime)s | %(levelname)-8s | %(name)s – %(message)s"
         },
+        "json": {"()": "configs.log.JsonFormatter"},
     },
+    # Обработчики, которые работают в отдельном потоке (см. configs.log).
+    "queued_handlers": ["logfile", "events_file", "console", "email_admins"],
     "handlers": {
         "null": {
             "level": "DEBUG",
@@ -19,15 +33,19 @@ logging_config = {
         "logfile": {
             "level": log_level,
             "class": "logging.handlers.RotatingFileHandler",
-            "filename": os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                "logs",
-                "utmcraft.log",
-            ),
+            "filename": os.path.join(logs_dir, "utmcraft.log"),
             "maxBytes": 10 * 1024 * 1024,  # 10Mb
             "backupCount": 20,
             "formatter": "standard",
         },
+        "events_file": {
+            "level": "INFO",
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": os.path.join(logs_dir, "events.log"),
+            "maxBytes": 10 * 1024 * 1024,  # 10Mb
+            "backupCount": 20,
+            "formatter": "json",
+        },
         "console": {
             "class": "logging.StreamHandler",
             "level": "INFO",
@@ -35,7 +53,9 @@ logging_config = {
         },
         "email_admins": {
             "level": "ERROR",
-            "class": "django.utils.log.AdminEmailHandler",
+            "class": "configs.log.RateLimitedAdminEmailHandler",
+            # Письмо об ошибке из одного места кода – не чаще раза в 5 минут.
+            "interval": 300,
             "filters": ["require_debug_false"],
         },
     },
@@ -57,6 +77,7 @@ logging_config = {
         "django.db.backends": {
             "handlers": ["logfile", "console"],
             "level": log_level,
+            "filters": ["sample_debug"],
             "propagate": True,
         },
         "authorization": {
@@ -79,5 +100,21 @@ logging_config = {
             "level": log_level,
             "propagate": True,
         },
+        "jobs": {
+            "handlers": ["logfile", "console", "email_admins"],
+            "level": log_level,
+            "propagate": True,
+        },
+        "monitoring": {
+            "handlers": ["logfile", "console", "email_admins"],
+            "level": log_level,
+            "propagate": True,
+        },
+        # Структурированные события (JSON), например, прометки.
+        "events": {
+            "handlers": ["events_file"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
@@ -21,6 +21,9 @@ DATABASES = {
         "PASSWORD": os.getenv("DJANGO_POSTGRES_PASSWORD"),
         "HOST": os.getenv("DJANGO_POSTGRES_HOST"),
         "PORT": os.getenv("DJANGO_POSTGRES_PORT"),
+        # Время жизни подключения в секундах (0 – подключение на запрос).
+        "CONN_MAX_AGE": int(os.getenv("DJANGO_CONN_MAX_AGE", "0")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -31,6 +31,8 @@ urlpatterns = [
     path("auth/", include("authorization.urls", namespace="auth")),
     path("history/", include("history.urls", namespace="history")),
     path("settings/", include("client_admin.urls", namespace="client_admin")),
+    path("jobs/", include("jobs.urls", namespace="jobs")),
+    path("", include("monitoring.urls", namespace="monitoring")),
 ]
 
 # txt
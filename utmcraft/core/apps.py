@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 from django.utils.translation import gettext_lazy as _
 
 
@@ -6,3 +7,9 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = _("основные настройки")
+
+    def ready(self):
+        from core.models import RawUtmData
+        from core.signals import cache_raw_utm_data
+
+        post_save.connect(cache_raw_utm_data, sender=RawUtmData)
@@ -0,0 +1,101 @@
+"""
+Запуск синхронного кода с ORM из async-представлений.
+
+В Django 4.x асинхронные методы ORM выполняют запросы в одном общем потоке процесса
+(thread_sensitive), поэтому запросы к БД из разных HTTP-запросов выполняются по
+очереди. run_in_db_thread выполняет синхронный код в пуле из ASYNC_DB_THREADS потоков.
+У каждого потока пула свое подключение к БД; как и в начале и конце запроса под WSGI,
+вокруг вызова закрываются подключения старше CONN_MAX_AGE и подключения с ошибками.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+
+from authorization.middleware import get_user
+from authorization.selectors import USER_ACCESS_ATTR, get_user_access
+
+# Контекстные менеджеры, которые оборачивают каждый вызов run_in_db_thread текущего
+# HTTP-запроса (например, счетчик SQL-запросов для метрик).
+db_thread_hooks: ContextVar[tuple[Callable[[], AbstractContextManager], ...]] = (
+    ContextVar("db_thread_hooks", default=())
+)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix="db"
+            )
+    return _executor
+
+
+def _run_with_hooks(func: Callable, *args, **kwargs) -> Any:
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for hook in db_thread_hooks.get():
+                stack.enter_context(hook())
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func: Callable, *args, **kwargs) -> Any:
+    """Выполняет синхронную функцию с запросами к БД в пуле потоков."""
+    return await sync_to_async(
+        _run_with_hooks, thread_sensitive=False, executor=_get_executor()
+    )(func, *args, **kwargs)
+
+
+@contextmanager
+def db_thread_hook(hook: Callable[[], AbstractContextManager]):
+    """Добавляет hook к вызовам run_in_db_thread внутри блока."""
+    token = db_thread_hooks.set((*db_thread_hooks.get(), hook))
+    try:
+        yield
+    finally:
+        db_thread_hooks.reset(token)
+
+
+async def iterate_in_request_thread(iterator: Iterator) -> AsyncIterator:
+    """
+    Асинхронный итератор по синхронному. Под ASGI Django собирает синхронный итератор
+    StreamingHttpResponse в список целиком, а асинхронный отдает по частям. Каждый
+    элемент вычисляется в потоке синхронного представления этого HTTP-запроса
+    (thread_sensitive), в котором итератор создан и открыты его подключения к БД.
+    """
+    end = object()
+    get_next = sync_to_async(next, thread_sensitive=True)
+    while (item := await get_next(iterator, end)) is not end:
+        yield item
+
+
+def _load_user(request):
+    user = get_user(request)
+    # Доступы загружаются сразу, чтобы дальше проверять их без запросов к БД и кэшу.
+    get_user_access(user)
+    return user
+
+
+async def aget_user(request):
+    """Пользователь запроса с загруженными доступами (request.user в async-коде
+    использовать нельзя: ленивая загрузка пользователя синхронная)."""
+    if not hasattr(request, "session"):
+        return AnonymousUser()
+    user = getattr(request, "_cached_user", None)
+    if user is None or (user.is_authenticated and not hasattr(user, USER_ACCESS_ATTR)):
+        user = await run_in_db_thread(_load_user, request)
+    request.user = user
+    return user
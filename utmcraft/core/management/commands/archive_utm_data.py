@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.services.utm_archive import archive_utm_data
+
+
+class Command(BaseCommand):
+    help = "Moves UTM data older than N days to a cold archive segment"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=365, help="Archive data older than N days"
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=256,
+            help="Records per compressed block of the segment",
+        )
+
+    def handle(self, *args, **options):
+        path, count = archive_utm_data(
+            days=options["days"], block_size=options["block_size"]
+        )
+        if not path:
+            print("Nothing to archive")
+            return
+        print(f"Archived {count} records to {path}")
@@ -0,0 +1,198 @@
+import csv
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from authorization.selectors import get_user_access
+from core.models import Form, FormField
+from core.models.form_constructor import BaseInputFormFieldModel
+from core.selectors import get_form_by_pk, get_form_ui_fields
+from core.services.utm_bulk_builder import BulkUtmResult, build_rows, init_worker
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds UTM links for every row of a CSV file with a process pool. CSV columns"
+        " are matched to form fields by full title or title"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", type=int, required=True, help="Form pk")
+        parser.add_argument("--input", default="-", help="CSV file path, - for stdin")
+        parser.add_argument(
+            "--output", default="-", help="CSV output path, - for stdout"
+        )
+        parser.add_argument(
+            "--user", help="Username the links are built by (default: form owner)"
+        )
+        parser.add_argument("--delimiter", default=",", help="CSV delimiter")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Worker processes"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000, help="Rows per worker task"
+        )
+        parser.add_argument(
+            "--no-save", action="store_true", help="Do not save links to the DB"
+        )
+        parser.add_argument(
+            "--row-by-row",
+            action="store_true",
+            help="Evaluate rows one by one instead of by columns (for verification)",
+        )
+
+    def handle(self, *args, **options):
+        if not (form_obj := get_form_by_pk(options["form"])):
+            raise CommandError(f"Form pk={options['form']} not found")
+        user = self._get_user(form_obj, options["user"])
+        fields = [f for f in get_form_ui_fields(form_obj) if isinstance(f, FormField)]
+        result_fields = list(form_obj.result_fields.all())
+        input_file = (
+            sys.stdin
+            if options["input"] == "-"
+            else open(options["input"], encoding="utf-8", newline="")
+        )
+        output_file = (
+            sys.stdout
+            if options["output"] == "-"
+            else open(options["output"], "w", encoding="utf-8", newline="")
+        )
+        # Процессы пула создаются fork-ом и не должны унаследовать открытые соединения.
+        connections.close_all()
+        total = 0
+        try:
+            reader = csv.reader(input_file, delimiter=options["delimiter"])
+            writer = csv.writer(output_file, delimiter=options["delimiter"])
+            if not (header := next(reader, None)):
+                raise CommandError("Input CSV is empty")
+            columns = self._get_columns(header, fields)
+            writer.writerow(
+                [*header, "utm_hashcode", "result", *(f.label for f in result_fields)]
+            )
+            result_titles = [f"result-block-{f.pk}" for f in result_fields]
+            input_pks = {
+                str(f.pk) for f in fields if isinstance(f, BaseInputFormFieldModel)
+            }
+            max_pending = options["workers"] * 2
+            pending: deque[tuple[list[list[str]], Future]] = deque()
+            with ProcessPoolExecutor(
+                max_workers=options["workers"],
+                # init_worker рассчитывает на настроенный Django родительского
+                # процесса, поэтому процессы создаются fork-ом на любой платформе.
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=init_worker,
+                initargs=(form_obj.pk, user.pk),
+            ) as executor:
+                for chunk in self._read_chunks(reader, options["chunk_size"]):
+                    future = executor.submit(
+                        build_rows,
+                        [self._get_form_data(row, columns, input_pks) for row in chunk],
+                        not options["no_save"],
+                        not options["row_by_row"],
+                    )
+                    pending.append((chunk, future))
+                    # Ограничиваем число пачек в работе, чтобы не читать весь файл в
+                    # память, и пишем результаты в порядке строк входного файла.
+                    while len(pending) >= max_pending:
+                        total += self._write_chunk(
+                            writer, result_titles, *pending.popleft()
+                        )
+                while pending:
+                    total += self._write_chunk(
+                        writer, result_titles, *pending.popleft()
+                    )
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+        sys.stderr.write(f"Built {total} links\n")
+
+    @staticmethod
+    def _get_user(form_obj: Form, username: str | None) -> User:
+        if not username:
+            return form_obj.user
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"User {username} not found")
+        if not get_user_access(user).has_form(form_obj.pk):
+            raise CommandError(f"User {username} has no access to form {form_obj.pk}")
+        return user
+
+    def _get_columns(
+        self, header: list[str], fields: list[FormField]
+    ) -> dict[int, str]:
+        """Сопоставляет номера колонок CSV с PK полей формы."""
+        by_full_title = {f.full_title: f for f in fields}
+        by_title = {}
+        for f in fields:
+            by_title.setdefault(f.title, []).append(f)
+        columns = {}
+        for i, column in enumerate(header):
+            column = column.removeprefix("$").strip()
+            if field := by_full_title.get(column):
+                columns[i] = str(field.pk)
+            elif len(found := by_title.get(column, [])) == 1:
+                columns[i] = str(found[0].pk)
+            elif found:
+                raise CommandError(
+                    f"Column {column} matches several form fields, use the full title"
+                )
+            else:
+                self.stderr.write(f"Column {column} is not a form field, skipped")
+        if not columns:
+            raise CommandError("No CSV columns match form fields")
+        return columns
+
+    @staticmethod
+    def _read_chunks(reader, chunk_size: int):
+        chunk = []
+        for row in reader:
+            if not any(row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _get_form_data(
+        row: list[str], columns: dict[int, str], input_pks: set[str]
+    ) -> dict[str, str]:
+        # Как и веб-форма, пустые поля ввода передаются пустой строкой, а невыбранные
+        # чекбоксы и радиокнопки не передаются: иначе уникальный код той же прометки
+        # отличался бы от кода из веб-формы.
+        form_data = {}
+        for i, pk in columns.items():
+            value = row[i].strip() if i < len(row) else ""
+            if value or pk in input_pks:
+                form_data[pk] = value
+        return form_data
+
+    @staticmethod
+    def _write_chunk(
+        writer, result_titles: list[str], chunk: list[list[str]], future: Future
+    ) -> int:
+        results: list[BulkUtmResult] = future.result()
+        for row, result in zip(chunk, results):
+            values = {rb["title"]: rb["value"] for rb in result.result_blocks}
+            writer.writerow(
+                [
+                    *row,
+                    result.hashcode,
+                    result.main_result_value,
+                    *(values.get(title, "") for title in result_titles),
+                ]
+            )
+        return len(results)
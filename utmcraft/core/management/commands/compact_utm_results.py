@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import UtmResult
+
+
+class Command(BaseCommand):
+    help = "Converts existing UtmResult rows to the compact schema + values storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows per transaction"
+        )
+
+    def handle(self, *args, **options):
+        if not settings.UTM_RESULT_COMPACT_STORAGE:
+            print("Compact storage is disabled by DJANGO_UTM_RESULT_COMPACT_STORAGE")
+            return
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            with transaction.atomic():
+                utm_results = list(
+                    UtmResult.objects.select_for_update(of=("self",))
+                    .select_related("raw_utm_data__form")
+                    .filter(schema__isnull=True)
+                    .exclude(result_fields_data=[])
+                    .order_by("pk")[:batch_size]
+                )
+                if not utm_results:
+                    break
+                for utm_result in utm_results:
+                    utm_result.set_result_blocks(
+                        utm_result.result_fields_data,
+                        form=utm_result.raw_utm_data.form,
+                    )
+                UtmResult.objects.bulk_update(
+                    utm_results,
+                    fields=["schema", "result_values", "result_fields_data"],
+                )
+            total += len(utm_results)
+            print(f"Compacted {total} rows")
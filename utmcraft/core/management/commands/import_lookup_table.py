@@ -0,0 +1,107 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import LookupTableEntry, LookupTableField
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports LookupTableField entries from CSV: key, build rule (JSON array or a"
+        " plain constant)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("full_title", help="Lookup field full title")
+        parser.add_argument("--file", required=True, help="CSV file path")
+        parser.add_argument("--delimiter", default=",", help="CSV delimiter")
+        parser.add_argument(
+            "--skip-header", action="store_true", help="Skip the first CSV row"
+        )
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete existing entries that are not in the file",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Entries per INSERT"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            field = LookupTableField.objects.get(full_title=options["full_title"])
+        except LookupTableField.DoesNotExist:
+            raise CommandError(f"Lookup field {options['full_title']} not found")
+        if not field.external_entries:
+            self.stderr.write(
+                f"Warning: external_entries is disabled for {field.full_title},"
+                " imported entries will not be used until it is enabled"
+            )
+        total = 0
+        with transaction.atomic(), open(options["file"], encoding="utf-8") as f:
+            if options["replace"]:
+                field.entries.all().delete()
+            reader = csv.reader(f, delimiter=options["delimiter"])
+            if options["skip_header"]:
+                next(reader, None)
+            batch = []
+            for line_number, row in enumerate(reader, start=1):
+                if not row:
+                    continue
+                batch.append(self._get_entry(field, line_number, row))
+                if len(batch) >= options["batch_size"]:
+                    total += self._save_batch(batch)
+                    batch = []
+            if batch:
+                total += self._save_batch(batch)
+            field.clean_entries_keys(field_title="key_mode")
+            if field.field_errors or field.errors:
+                raise CommandError(self._format_errors(field))
+            field.bump_entries_version()
+        print(f"Imported {total} entries to {field.full_title}")
+
+    @staticmethod
+    def _get_entry(
+        field: LookupTableField, line_number: int, row: list[str]
+    ) -> LookupTableEntry:
+        if len(row) < 2 or not row[0].strip():
+            raise CommandError(f"Line {line_number}: expected key and build rule")
+        raw_build_rule = row[1].strip()
+        try:
+            build_rule = json.loads(raw_build_rule)
+        except json.JSONDecodeError:
+            build_rule = [raw_build_rule]
+        if isinstance(build_rule, str):
+            build_rule = [build_rule]
+        return LookupTableEntry(
+            field=field,
+            key=row[0].strip(),
+            build_rule=field.clean_entry_build_rule(build_rule),
+        )
+
+    @staticmethod
+    def _save_batch(batch: list[LookupTableEntry]) -> int:
+        now = timezone.now()
+        for entry in batch:
+            entry.created_at = entry.updated_at = now
+        LookupTableEntry.objects.bulk_create(
+            # Последнее значение ключа в файле перекрывает предыдущие.
+            list({entry.key: entry for entry in batch}.values()),
+            update_conflicts=True,
+            unique_fields=["field", "key"],
+            update_fields=["build_rule", "updated_at"],
+        )
+        return len(batch)
+
+    @staticmethod
+    def _format_errors(field: LookupTableField) -> str:
+        messages = [
+            message
+            for errors in [*field.field_errors.values(), [*field.errors]]
+            for error in errors
+            for message in error.messages
+        ]
+        return "Import aborted:\n" + "\n".join(messages)
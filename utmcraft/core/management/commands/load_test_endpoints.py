@@ -0,0 +1,73 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends concurrent GET requests to a running server and reports throughput and"
+        " latency percentiles. Used to compare WSGI and ASGI worker profiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            required=True,
+            help="Full URL, e.g. http://localhost:8000/core/api/parser?utm_hashcode=..",
+        )
+        parser.add_argument(
+            "--session", required=True, help="sessionid cookie of a logged in user"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=1000, help="Total number of requests"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=50, help="Concurrent clients"
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=30, help="Request timeout, seconds"
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive")
+        local = threading.local()
+
+        def send_request(_) -> tuple[float, int | None]:
+            # Свой Session (и пул соединений) у каждого клиента.
+            if (session := getattr(local, "session", None)) is None:
+                session = local.session = requests.Session()
+                session.cookies.set("sessionid", options["session"])
+            started_at = time.perf_counter()
+            try:
+                status = session.get(options["url"], timeout=options["timeout"])
+                status = status.status_code
+            except requests.RequestException:
+                status = None
+            return time.perf_counter() - started_at, status
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(send_request, range(options["requests"])))
+        duration = time.perf_counter() - started_at
+
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+        self.stdout.write(
+            f"Requests: {len(results)}, concurrency: {options['concurrency']},"
+            f" errors (non-200): {errors}"
+        )
+        self.stdout.write(f"Throughput: {len(results) / duration:.1f} req/s")
+        if quantiles:
+            self.stdout.write(
+                "Latency, ms: "
+                + ", ".join(
+                    f"p{p} {quantiles[p - 1] * 1000:.1f}" for p in (50, 90, 95, 99)
+                )
+                + f", max {latencies[-1] * 1000:.1f}"
+            )
@@ -0,0 +1,50 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.services.utm_log_parser import UtmLogParser
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a landing page log, extracts UTM params and embedded hashcodes and"
+        " writes them joined with UTM data as JSONL"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", default="-", help="Log file path, - for stdin")
+        parser.add_argument(
+            "--output", default="-", help="JSONL output path, - for stdout"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000, help="Hashcodes per DB query"
+        )
+
+    def handle(self, *args, **options):
+        parser = UtmLogParser(chunk_size=options["chunk_size"])
+        input_file = (
+            sys.stdin
+            if options["input"] == "-"
+            else open(options["input"], encoding="utf-8", errors="replace")
+        )
+        output_file = (
+            sys.stdout
+            if options["output"] == "-"
+            else open(options["output"], "w", encoding="utf-8")
+        )
+        total = found = 0
+        try:
+            for record in parser.parse(input_file):
+                output_file.write(
+                    json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+                )
+                total += 1
+                found += record["found"]
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+        sys.stderr.write(f"Found {total} hashcodes, {found} resolved\n")
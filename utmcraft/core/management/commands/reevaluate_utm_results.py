@@ -0,0 +1,222 @@
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.models import Form, RawUtmData
+from core.services.utm_reevaluation import (
+    ReevaluationChunkResult,
+    get_affected_forms,
+    init_worker,
+    reevaluate_chunk,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-evaluates saved UTM results of forms that depend on the given fields and"
+        " updates the results that changed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--field",
+            action="append",
+            default=[],
+            help="Full title of a changed field (can be repeated)",
+        )
+        parser.add_argument(
+            "--form",
+            type=int,
+            action="append",
+            default=[],
+            help=(
+                "Form pk (can be repeated). Without --field all form results are"
+                " re-evaluated"
+            ),
+        )
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Worker processes"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000, help="Results per worker task"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without updating results",
+        )
+        parser.add_argument(
+            "--report", help="CSV report of changed values, - for stdout"
+        )
+        parser.add_argument(
+            "--checkpoint", help="JSON file with the progress of every form"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue from the progress saved in --checkpoint",
+        )
+
+    def handle(self, *args, **options):
+        if not options["field"] and not options["form"]:
+            raise CommandError("Specify --field or --form")
+        if options["resume"] and not options["checkpoint"]:
+            raise CommandError("--resume requires --checkpoint")
+        if options["field"]:
+            forms = get_affected_forms(options["field"], options["form"])
+        else:
+            forms = list(Form.objects.filter(pk__in=options["form"]).order_by("pk"))
+        if not forms:
+            self.stderr.write("No forms depend on the given fields")
+            return
+        checkpoint = self._load_checkpoint(options)
+        report_path = options["report"] or ("-" if options["dry_run"] else None)
+        report_file = None
+        if report_path:
+            report_file = (
+                sys.stdout
+                if report_path == "-"
+                else open(report_path, "w", encoding="utf-8", newline="")
+            )
+        report = csv.writer(report_file) if report_file else None
+        if report:
+            report.writerow(["form", "utm_hashcode", "field", "old_value", "new_value"])
+        try:
+            for form_obj in forms:
+                self._reevaluate_form(form_obj, checkpoint, report, options)
+        finally:
+            if report_file and report_file is not sys.stdout:
+                report_file.close()
+
+    def _reevaluate_form(
+        self, form_obj: Form, checkpoint: dict[str, int], report, options
+    ) -> None:
+        last_pk = checkpoint.get(str(form_obj.pk), 0)
+        total = RawUtmData.objects.filter(form=form_obj, pk__gt=last_pk).count()
+        self.stderr.write(f"Form {form_obj.pk} ({form_obj}): {total} results")
+        stats = {"processed": 0, "changed": 0, "missing": 0}
+        max_pending = options["workers"] * 2
+        pending: deque[Future] = deque()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            # init_worker рассчитывает на настроенный Django родительского процесса,
+            # поэтому процессы создаются fork-ом на любой платформе.
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_worker,
+            initargs=(form_obj.pk,),
+        ) as executor:
+            for chunk in self._iter_chunks(form_obj, last_pk, options["chunk_size"]):
+                # Процессы пула создаются fork-ом при первой задаче и не должны
+                # унаследовать открытые соединения.
+                if not pending:
+                    connections.close_all()
+                pending.append(
+                    executor.submit(reevaluate_chunk, chunk, options["dry_run"])
+                )
+                while pending and (len(pending) >= max_pending or pending[0].done()):
+                    self._complete_chunk(
+                        pending.popleft(),
+                        form_obj,
+                        total,
+                        stats,
+                        checkpoint,
+                        report,
+                        options,
+                    )
+            while pending:
+                self._complete_chunk(
+                    pending.popleft(),
+                    form_obj,
+                    total,
+                    stats,
+                    checkpoint,
+                    report,
+                    options,
+                )
+        action = "would change" if options["dry_run"] else "changed"
+        self.stderr.write(
+            f"Form {form_obj.pk}: {stats['processed']} processed,"
+            f" {stats['changed']} {action}, {stats['missing']} without result"
+        )
+
+    @staticmethod
+    def _iter_chunks(form_obj: Form, last_pk: int, chunk_size: int):
+        """PK прометок формы пачками по возрастанию, начиная после last_pk."""
+        while chunk := list(
+            RawUtmData.objects.filter(form=form_obj, pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        ):
+            yield chunk
+            last_pk = chunk[-1]
+
+    def _complete_chunk(
+        self,
+        future: Future,
+        form_obj: Form,
+        total: int,
+        stats: dict[str, int],
+        checkpoint: dict[str, int],
+        report,
+        options,
+    ) -> None:
+        result: ReevaluationChunkResult = future.result()
+        stats["processed"] += result.processed
+        stats["changed"] += result.changed
+        stats["missing"] += result.missing
+        self._write_report(report, form_obj, result)
+        # Пачки завершаются в порядке PK, поэтому в контрольную точку попадает PK,
+        # до которого обработаны все прометки формы.
+        self._save_checkpoint(checkpoint, form_obj, result.last_pk, options)
+        self.stderr.write(
+            f"Form {form_obj.pk}: {stats['processed']}/{total} processed,"
+            f" {stats['changed']} changed"
+        )
+
+    @staticmethod
+    def _write_report(report, form_obj: Form, result: ReevaluationChunkResult) -> None:
+        if not report:
+            return
+        for change in result.changes:
+            for label, (old_value, new_value) in change.values.items():
+                report.writerow(
+                    [
+                        form_obj.pk,
+                        change.hashcode,
+                        label or "result",
+                        old_value,
+                        new_value,
+                    ]
+                )
+
+    @staticmethod
+    def _load_checkpoint(options) -> dict[str, int]:
+        if not options["resume"]:
+            return {}
+        try:
+            return json.loads(Path(options["checkpoint"]).read_text())
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            raise CommandError(f"Invalid checkpoint file: {e}")
+
+    @staticmethod
+    def _save_checkpoint(
+        checkpoint: dict[str, int], form_obj: Form, last_pk: int, options
+    ) -> None:
+        # Пробный запуск ничего не меняет, поэтому и прогресс не сохраняется.
+        if not options["checkpoint"] or options["dry_run"]:
+            return
+        checkpoint[str(form_obj.pk)] = last_pk
+        path = Path(options["checkpoint"])
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(checkpoint))
+        tmp_path.replace(path)
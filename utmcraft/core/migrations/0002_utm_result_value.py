@@ -0,0 +1,93 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:35
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_utm_result_values(apps, schema_editor):
+    UtmResult = apps.get_model("core", "UtmResult")
+    UtmResultValue = apps.get_model("core", "UtmResultValue")
+    values = []
+    for utm_result in UtmResult.objects.only("pk", "result_fields_data").iterator(
+        chunk_size=2000
+    ):
+        for result in utm_result.result_fields_data:
+            if result["is_error"] or result["is_bas64_image"] or not result["value"]:
+                continue
+            values.append(
+                UtmResultValue(
+                    result_id=utm_result.pk,
+                    label=result["label"],
+                    value=result["value"][:1024],
+                )
+            )
+        if len(values) >= 5000:
+            UtmResultValue.objects.bulk_create(values)
+            values = []
+    UtmResultValue.objects.bulk_create(values)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="UtmResultValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "label",
+                    models.CharField(
+                        editable=False, max_length=50, verbose_name="ярлык"
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(
+                        editable=False, max_length=1024, verbose_name="значение"
+                    ),
+                ),
+                (
+                    "result",
+                    models.ForeignKey(
+                        editable=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="values",
+                        to="core.utmresult",
+                        verbose_name="результат прометки",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "значение поля результата прометки",
+                "verbose_name_plural": "значения полей результата прометки",
+                "ordering": ["pk"],
+                "indexes": [
+                    models.Index(
+                        fields=["label", "value"],
+                        name="utm_result_value_label_idx",
+                        opclasses=["varchar_pattern_ops", "varchar_pattern_ops"],
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["value"],
+                        name="utm_result_value_trgm_idx",
+                        opclasses=["gin_trgm_ops"],
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_utm_result_values, migrations.RunPython.noop),
+    ]
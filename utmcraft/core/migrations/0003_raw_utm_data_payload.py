@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:38
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_utm_result_value"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RawUtmDataPayload",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        editable=False,
+                        max_length=64,
+                        unique=True,
+                        verbose_name="хэш данных",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        default=dict,
+                        editable=False,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        verbose_name="данные для прометки",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "данные отправленной формы",
+                "verbose_name_plural": "данные отправленных форм",
+                "ordering": ["-pk"],
+            },
+        ),
+        migrations.AddField(
+            model_name="rawutmdata",
+            name="payload",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.rawutmdatapayload",
+                verbose_name="общие данные для прометки",
+            ),
+        ),
+    ]
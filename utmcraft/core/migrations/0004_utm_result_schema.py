@@ -0,0 +1,90 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:39
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_raw_utm_data_payload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="utmresult",
+            name="result_values",
+            field=models.JSONField(
+                default=list,
+                editable=False,
+                encoder=django.core.serializers.json.DjangoJSONEncoder,
+                help_text=(
+                    "Значения блоков результата в порядке блоков схемы. Если у блока"
+                    " есть флаги, значение хранится как [значение, is_error,"
+                    " is_bas64_image]."
+                ),
+                verbose_name="значения блоков результата",
+            ),
+        ),
+        migrations.CreateModel(
+            name="UtmResultSchema",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "schema_hash",
+                    models.CharField(
+                        editable=False,
+                        max_length=64,
+                        unique=True,
+                        verbose_name="хэш схемы",
+                    ),
+                ),
+                (
+                    "blocks",
+                    models.JSONField(
+                        default=list,
+                        editable=False,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Массив пар [название, ярлык] блоков результата.",
+                        verbose_name="блоки результата",
+                    ),
+                ),
+                (
+                    "form",
+                    models.ForeignKey(
+                        blank=True,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="core.form",
+                        verbose_name="форма",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "схема результата прометки",
+                "verbose_name_plural": "схемы результатов прометки",
+                "ordering": ["-pk"],
+            },
+        ),
+        migrations.AddField(
+            model_name="utmresult",
+            name="schema",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.utmresultschema",
+                verbose_name="схема результата прометки",
+            ),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:52
+
+import django.contrib.postgres.indexes
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_utm_result_schema"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookuptablefield",
+            name="entries_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="версия Lookup-записей"
+            ),
+        ),
+        migrations.AddField(
+            model_name="lookuptablefield",
+            name="external_entries",
+            field=models.BooleanField(
+                default=False,
+                help_text=(
+                    "Зависимые значения хранятся отдельными записями (Lookup-записи) и"
+                    " загружаются в прометчик по одной. Подходит для больших таблиц,"
+                    " которые загружаются из CSV командой"
+                    " <code>import_lookup_table</code>. Поле 'lookup_values' в этом"
+                    " случае должно быть пустым."
+                ),
+                verbose_name="зависимые значения хранятся отдельно",
+            ),
+        ),
+        migrations.CreateModel(
+            name="LookupTableEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="дата создания"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="дата обновления"),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=1024,
+                        verbose_name="значение поля, от которого зависит поле",
+                    ),
+                ),
+                (
+                    "build_rule",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        verbose_name="правило генерации результата",
+                    ),
+                ),
+                (
+                    "field",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries",
+                        to="core.lookuptablefield",
+                        verbose_name="поле Lookup",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lookup-запись",
+                "verbose_name_plural": "Lookup-записи",
+                "ordering": ["field", "key"],
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["build_rule"], name="core_lookup_build_r_80151b_gin"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="lookuptableentry",
+            constraint=models.UniqueConstraint(
+                fields=("field", "key"), name="unique_lookup_table_entry"
+            ),
+        ),
+    ]
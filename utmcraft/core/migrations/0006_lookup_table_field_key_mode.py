@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_lookup_table_entry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookuptablefield",
+            name="key_mode",
+            field=models.CharField(
+                choices=[
+                    ("exact", "Точное совпадение"),
+                    ("range", "Числовой интервал"),
+                    ("prefix", "Префикс"),
+                    ("regex", "Регулярное выражение"),
+                ],
+                default="exact",
+                help_text=(
+                    "📍Точное совпадение: ключ равен значению поля, от которого зависит"
+                    " данное поле.<br>📍Числовой интервал: ключ вида <code>18..24</code>"
+                    " (границы включаются, любую границу можно не указывать:"
+                    " <code>..17</code>, <code>65..</code>), интервалы не должны"
+                    " пересекаться. Только для полей ввода целого числа.<br>📍Префикс:"
+                    " значение начинается с ключа, при нескольких совпадениях"
+                    " выбирается самый длинный ключ.<br>📍Регулярное выражение: значение"
+                    " совпадает с выражением с начала строки, при нескольких"
+                    " совпадениях выбирается первый ключ по алфавиту."
+                ),
+                max_length=6,
+                verbose_name="тип ключей зависимых значений",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:10
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def restore_payload_data(apps, schema_editor):
+    # Данные прометок, сохраненных со ссылкой на общую запись, возвращаются в
+    # RawUtmData.data до удаления таблицы.
+    RawUtmData = apps.get_model("core", "RawUtmData")
+    RawUtmDataPayload = apps.get_model("core", "RawUtmDataPayload")
+    RawUtmData.objects.filter(payload__isnull=False).update(
+        data=Subquery(
+            RawUtmDataPayload.objects.filter(pk=OuterRef("payload_id")).values("data")[
+                :1
+            ]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_lookup_table_field_key_mode"),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_payload_data, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="rawutmdata",
+            name="payload",
+        ),
+        migrations.DeleteModel(
+            name="RawUtmDataPayload",
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:59
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_remove_raw_utm_data_payload"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="utmresultvalue",
+            name="utm_result_value_trgm_idx",
+        ),
+        migrations.AddIndex(
+            model_name="utmresultvalue",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("value"), name="gin_trgm_ops"
+                ),
+                name="utm_result_value_utrgm_idx",
+            ),
+        ),
+    ]
@@ -10,8 +10,14 @@ from core.models.form_constructor import (
     ResultField,
     CombinedField,
     LookupTableField,
+    LookupTableEntry,
     Form,
     FIELDS_MODELS,
     FORM_UI_FIELD_MODELS,
 )
-from core.models.utm_builder import RawUtmData, UtmResult
+from core.models.utm_builder import (
+    RawUtmData,
+    UtmResult,
+    UtmResultSchema,
+    UtmResultValue,
+)
@@ -2,6 +2,7 @@ import json
 from collections import Counter, defaultdict
 from copy import deepcopy
 from functools import cache
+from typing import Iterable
 
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import HStoreField
@@ -16,8 +17,15 @@ from sortedm2m.fields import SortedManyToManyField
 from core.models.common import (
     BaseFormConstructorElemModel,
     ErrorCollectorModel,
+    TimeTrackingModel,
     ValueSettingsModel,
 )
+from core.services.lookup_matchers import (
+    KeyMatcherError,
+    build_matcher,
+    compile_regex_key,
+    parse_range_key,
+)
 from core.utils import (
     cache_validation_result,
     get_available_fields_full_titles_for_admin_ui,
@@ -103,6 +111,20 @@ class Field(BaseFormConstructorElemModel):
                 LookupTableField.objects.bulk_update(
                     lt_fields, fields=["default_value", "lookup_values"]
                 )
+            # В Lookup-записях название поля может использоваться только в build_rule.
+            lt_entries = LookupTableEntry.objects.select_for_update(no_key=True).filter(
+                build_rule__contains=[old_title]
+            )
+            for lt_entry in lt_entries:
+                lt_entry.build_rule = [
+                    new_title if elem == old_title else elem
+                    for elem in lt_entry.build_rule
+                ]
+            if lt_entries:
+                LookupTableEntry.objects.bulk_update(lt_entries, fields=["build_rule"])
+                LookupTableField.objects.filter(
+                    pk__in={lt_entry.field_id for lt_entry in lt_entries}
+                ).update(entries_version=models.F("entries_version") + 1)
             # В форме название поля может использоваться только в UI.
             forms = Form.objects.select_for_update(no_key=True).filter(
                 ui__contains=[[old_title]]
@@ -135,6 +157,11 @@ class Field(BaseFormConstructorElemModel):
                     field_used_in.add(lt_field.full_title)
                 if title in json.dumps(lt_field.lookup_values, ensure_ascii=False):
                     field_used_in.add(lt_field.full_title)
+            field_used_in.update(
+                LookupTableEntry.objects.filter(build_rule__contains=[title])
+                .values_list("field__full_title", flat=True)
+                .distinct()
+            )
             field_used_in.update(
                 Form.objects.filter(ui__contains=[[title]]).values_list(
                     "full_title", flat=True
@@ -854,6 +881,12 @@ class CombinedField(ResultField):
 class LookupTableField(ResultField):
     FIELD_TYPE = "lt"
 
+    class KeyMode(models.TextChoices):
+        EXACT = "exact", _("Точное совпадение")
+        RANGE = "range", _("Числовой интервал")
+        PREFIX = "prefix", _("Префикс")
+        REGEX = "regex", _("Регулярное выражение")
+
     default_value = models.JSONField(
         verbose_name=_("значение по умолчанию"),
         encoder=DjangoJSONEncoder,
@@ -906,12 +939,43 @@ class LookupTableField(ResultField):
         ),
         default=dict,
     )
+    external_entries = models.BooleanField(
+        verbose_name=_("зависимые значения хранятся отдельно"),
+        default=False,
+        help_text=_(
+            "Зависимые значения хранятся отдельными записями (Lookup-записи) и"
+            " загружаются в прометчик по одной. Подходит для больших таблиц, которые"
+            " загружаются из CSV командой <code>import_lookup_table</code>. Поле"
+            " 'lookup_values' в этом случае должно быть пустым."
+        ),
+    )
+    entries_version = models.PositiveIntegerField(
+        verbose_name=_("версия Lookup-записей"), default=0, editable=False
+    )
+    key_mode = models.CharField(
+        max_length=6,
+        choices=KeyMode.choices,
+        default=KeyMode.EXACT,
+        verbose_name=_("тип ключей зависимых значений"),
+        help_text=_(
+            "📍Точное совпадение: ключ равен значению поля, от которого зависит данное"
+            " поле.<br>📍Числовой интервал: ключ вида <code>18..24</code> (границы"
+            " включаются, любую границу можно не указывать: <code>..17</code>,"
+            " <code>65..</code>), интервалы не должны пересекаться. Только для полей"
+            " ввода целого числа.<br>📍Префикс: значение начинается с ключа, при"
+            " нескольких совпадениях выбирается самый длинный ключ.<br>📍Регулярное"
+            " выражение: значение совпадает с выражением с начала строки, при"
+            " нескольких совпадениях выбирается первый ключ по алфавиту."
+        ),
+    )
 
     def __copy__(self):
         obj = super().__copy__()
         obj.default_value = deepcopy(self.default_value)
         obj.depends_field = self.depends_field
         obj.lookup_values = deepcopy(self.lookup_values)
+        obj.external_entries = self.external_entries
+        obj.key_mode = self.key_mode
         return obj
 
     class Meta:
@@ -931,10 +995,31 @@ class LookupTableField(ResultField):
         )
         if self.depends_field and self.pk:
             self._clean_depends_field()
+        self._clean_key_mode()
         self._clean_lookup_values()
+        if self.external_entries and self.pk:
+            self.clean_entries_keys(field_title="key_mode")
         self._clean_form_ui_if_used_in_form()
 
     def _clean_fields_filling(self) -> None:
+        if self.external_entries:
+            if not self.depends_field:
+                self.add_error(
+                    _(
+                        "Для хранения зависимых значений отдельно должно быть заполнено"
+                        " поле 'depends_field'."
+                    ),
+                    field_title="depends_field",
+                )
+            if self.lookup_values:
+                self.add_error(
+                    _(
+                        "Зависимые значения хранятся отдельно, поэтому поле"
+                        " 'lookup_values' должно быть пустым."
+                    ),
+                    field_title="lookup_values",
+                )
+            return
         if (self.depends_field and not self.lookup_values) or (
             not self.depends_field and self.lookup_values
         ):
@@ -954,6 +1039,21 @@ class LookupTableField(ResultField):
                 field_title="depends_field",
             )
 
+    def _clean_key_mode(self) -> None:
+        if (
+            self.key_mode == self.KeyMode.RANGE
+            and self.depends_field
+            and self.depends_field.full_title.split("-")[0]
+            != InputIntFormField.FIELD_TYPE
+        ):
+            self.add_error(
+                _(
+                    "Ключи в виде числовых интервалов можно использовать, только если"
+                    " Lookup-поле зависит от поля ввода целого числа."
+                ),
+                field_title="key_mode",
+            )
+
     def _clean_lookup_values(self) -> None:
         if not self.lookup_values:
             return
@@ -975,11 +1075,52 @@ class LookupTableField(ResultField):
                     field_title="lookup_values",
                 )
             else:
-                key = key.strip()
+                key = self.clean_key(key, field_title="lookup_values")
             value = self._clean_build_rule(value, model_field="lookup_values")
             cleaned_lookup_values[key] = value
+        self._clean_keys_matcher(cleaned_lookup_values, field_title="lookup_values")
         self.lookup_values = cleaned_lookup_values
 
+    def clean_key(self, key: str, field_title: str) -> str:
+        """Проверяет ключ зависимого значения в соответствии с key_mode."""
+        key = key.strip()
+        try:
+            match self.key_mode:
+                case self.KeyMode.RANGE:
+                    parse_range_key(key)
+                case self.KeyMode.REGEX:
+                    compile_regex_key(key)
+        except KeyMatcherError as e:
+            self.add_error(
+                _("Некорректный ключ зависимого значения '%(key)s': %(error)s")
+                % {"key": key, "error": e},
+                field_title=field_title,
+            )
+        return key
+
+    def clean_entries_keys(self, field_title: str) -> None:
+        """Проверяет ключи Lookup-записей поля в соответствии с key_mode."""
+        if self.key_mode == self.KeyMode.EXACT:
+            return
+        keys = [
+            self.clean_key(key, field_title=field_title)
+            for key in self.entries.values_list("key", flat=True)
+        ]
+        self._clean_keys_matcher(keys, field_title=field_title)
+
+    def _clean_keys_matcher(self, keys: Iterable[str], field_title: str) -> None:
+        # Ключи, корректные по отдельности, проверяются вместе: интервалы не должны
+        # пересекаться, регулярные выражения – собираться в одно общее выражение.
+        if self.field_errors.get(field_title):
+            return
+        try:
+            build_matcher(self.key_mode, keys)
+        except KeyMatcherError as e:
+            self.add_error(
+                _("Некорректные ключи зависимых значений: %(error)s") % {"error": e},
+                field_title=field_title,
+            )
+
     @property
     def dependencies(self) -> set[str]:
         """Возвращает все full_titles полей, которые используются в этом поле."""
@@ -989,8 +1130,25 @@ class LookupTableField(ResultField):
         if isinstance(self.lookup_values, dict):
             for value in self.lookup_values.values():
                 dependencies.union(self.get_fields_from_build_rule(value))
+        if self.external_entries and self.pk:
+            for build_rule in self.entries.filter(
+                build_rule__icontains='"$'
+            ).values_list("build_rule", flat=True):
+                dependencies.update(self.get_fields_from_build_rule(build_rule))
         return dependencies
 
+    def clean_entry_build_rule(self, build_rule: list[str]) -> list[str]:
+        """Проверяет правило генерации результата Lookup-записи так же, как значения
+        lookup_values. Ошибки собираются в self.field_errors["lookup_values"]."""
+        return self._clean_build_rule(build_rule, model_field="lookup_values")
+
+    def bump_entries_version(self) -> None:
+        """Инвалидирует закэшированные Lookup-записи поля."""
+        LookupTableField.objects.filter(pk=self.pk).update(
+            entries_version=models.F("entries_version") + 1
+        )
+        self.refresh_from_db(fields=["entries_version"])
+
     def get_all_dependencies(self) -> set[str]:
         all_dependencies = set()
         for field in self.dependencies:
@@ -998,6 +1156,40 @@ class LookupTableField(ResultField):
         return all_dependencies
 
 
+class LookupTableEntry(TimeTrackingModel):
+    """Зависимое значение Lookup-поля, которое хранится отдельной записью."""
+
+    field = models.ForeignKey(
+        to=LookupTableField,
+        on_delete=models.CASCADE,
+        verbose_name=_("поле Lookup"),
+        related_name="entries",
+    )
+    key = models.CharField(
+        max_length=1024,
+        verbose_name=_("значение поля, от которого зависит поле"),
+    )
+    build_rule = models.JSONField(
+        verbose_name=_("правило генерации результата"),
+        encoder=DjangoJSONEncoder,
+        default=list,
+    )
+
+    class Meta:
+        ordering = ["field", "key"]
+        verbose_name = _("Lookup-запись")
+        verbose_name_plural = _("Lookup-записи")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["field", "key"], name="unique_lookup_table_entry"
+            )
+        ]
+        indexes = (GinIndex(fields=["build_rule"]),)
+
+    def __str__(self):
+        return f"{self.field_id}: {self.key}"
+
+
 FIELDS_MODELS = (
     InputTextFormField,
     InputIntFormField,
@@ -0,0 +1,35 @@
+from django.contrib.postgres.fields import HStoreField
+from django.db.models import BooleanField, Func
+
+
+class HStorePair(Func):
+    """hstore(key, value) – HStore из одной пары."""
+
+    function = "hstore"
+    arity = 2
+    output_field = HStoreField()
+
+
+class HStoreConcat(Func):
+    """hstore || hstore – добавление/замена пар без перезаписи всего значения в
+    Python."""
+
+    template = "(%(expressions)s)"
+    arg_joiner = " || "
+    output_field = HStoreField()
+
+
+class HStoreDelete(Func):
+    """delete(hstore, key) – удаление ключа."""
+
+    function = "delete"
+    arity = 2
+    output_field = HStoreField()
+
+
+class JSONBPathExists(Func):
+    """jsonb_path_exists(target, path, vars)."""
+
+    function = "jsonb_path_exists"
+    arity = 3
+    output_field = BooleanField()
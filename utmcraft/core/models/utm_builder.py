@@ -1,6 +1,12 @@
-from django.contrib.postgres.indexes import GinIndex
+import hashlib
+import json
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from core.models import Form
@@ -39,6 +45,73 @@ class RawUtmData(AuthorTimeTrackingModel):
         indexes = (GinIndex(fields=["data"]),)
 
 
+class UtmResultSchema(models.Model):
+    """Названия и ярлыки блоков результата прометки, общие для всех прометок одной
+    версии формы. В UtmResult хранятся только значения блоков в том же порядке."""
+
+    # Схемы не меняются после создания, поэтому их можно кэшировать в процессе.
+    _blocks_cache: dict[int, list[list[str]]] = {}
+    _schemas_cache: dict[str, "UtmResultSchema"] = {}
+
+    schema_hash = models.CharField(
+        max_length=64, verbose_name=_("хэш схемы"), unique=True, editable=False
+    )
+    form = models.ForeignKey(
+        to=Form,
+        on_delete=models.SET_NULL,
+        verbose_name=_("форма"),
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    blocks = models.JSONField(
+        verbose_name=_("блоки результата"),
+        encoder=DjangoJSONEncoder,
+        default=list,
+        editable=False,
+        help_text=_("Массив пар [название, ярлык] блоков результата."),
+    )
+
+    def __str__(self):
+        return f"{self.__class__.__name__} ({self.schema_hash})"
+
+    class Meta:
+        ordering = ["-pk"]
+        verbose_name = _("схема результата прометки")
+        verbose_name_plural = _("схемы результатов прометки")
+
+    @classmethod
+    def intern(cls, form: Form | None, blocks: list[list[str]]) -> "UtmResultSchema":
+        content = json.dumps([form.pk if form else None, blocks], ensure_ascii=False)
+        schema_hash = hashlib.sha256(content.encode()).hexdigest()
+        if schema := cls._schemas_cache.get(schema_hash):
+            return schema
+        schema, _ = cls.objects.get_or_create(
+            schema_hash=schema_hash, defaults={"form": form, "blocks": blocks}
+        )
+        cls._blocks_cache[schema.pk] = schema.blocks
+        # Схема могла быть создана в транзакции, которая еще может откатиться.
+        transaction.on_commit(
+            lambda: cls._schemas_cache.setdefault(schema_hash, schema)
+        )
+        return schema
+
+    @classmethod
+    def get_blocks(cls, pk: int) -> list[list[str]]:
+        if pk not in cls._blocks_cache:
+            cls.preload([pk])
+        return cls._blocks_cache[pk]
+
+    @classmethod
+    def preload(cls, pks: Iterable[int]) -> None:
+        """Загружает в кэш процесса отсутствующие в нем схемы одним запросом."""
+        if missed_pks := set(pks) - set(cls._blocks_cache) - {None}:
+            for pk, blocks in cls.objects.filter(pk__in=missed_pks).values_list(
+                "pk", "blocks"
+            ):
+                cls._blocks_cache[pk] = blocks
+
+
 class UtmResult(AuthorTimeTrackingModel):
     main_result_value = models.CharField(
         max_length=1024,
@@ -59,6 +132,24 @@ class UtmResult(AuthorTimeTrackingModel):
         verbose_name=_("сырые данные отправленной формы"),
         editable=False,
     )
+    schema = models.ForeignKey(
+        to=UtmResultSchema,
+        on_delete=models.PROTECT,
+        verbose_name=_("схема результата прометки"),
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    result_values = models.JSONField(
+        verbose_name=_("значения блоков результата"),
+        encoder=DjangoJSONEncoder,
+        default=list,
+        editable=False,
+        help_text=_(
+            "Значения блоков результата в порядке блоков схемы. Если у блока есть"
+            " флаги, значение хранится как [значение, is_error, is_bas64_image]."
+        ),
+    )
 
     def __str__(self):
         return _("Результат прометки (%(hashcode)s)") % {
@@ -77,7 +168,7 @@ class UtmResult(AuthorTimeTrackingModel):
             "Уникальный код": self.raw_utm_data.utm_hashcode,
             "Результат прометки": self.main_result_value,
         }
-        for result in self.result_fields_data:
+        for result in self.result_blocks:
             data[result["label"]] = {
                 "value": result["value"],
                 "title": result["title"],
@@ -86,3 +177,109 @@ class UtmResult(AuthorTimeTrackingModel):
         data["Дата создания"] = self.created_at
         data["Дата обновления"] = self.updated_at
         return data
+
+    @property
+    def result_blocks(self) -> list[dict[str, Any]]:
+        """Блоки результата прометки независимо от способа их хранения."""
+        if not self.schema_id:
+            return self.result_fields_data
+        blocks = []
+        for (title, label), value in zip(
+            UtmResultSchema.get_blocks(self.schema_id), self.result_values
+        ):
+            is_error = is_bas64_image = False
+            if isinstance(value, list):
+                value, is_error, is_bas64_image = value
+            blocks.append(
+                {
+                    "title": title,
+                    "label": label,
+                    "value": value,
+                    "is_error": is_error,
+                    "is_bas64_image": is_bas64_image,
+                }
+            )
+        return blocks
+
+    def set_result_blocks(
+        self, result_blocks: list[dict[str, Any]], form: Form | None
+    ) -> None:
+        if not settings.UTM_RESULT_COMPACT_STORAGE:
+            self.schema = None
+            self.result_values = []
+            self.result_fields_data = result_blocks
+            return
+        self.schema = UtmResultSchema.intern(
+            form=form, blocks=[[rb["title"], rb["label"]] for rb in result_blocks]
+        )
+        self.result_values = [
+            (
+                [rb["value"], rb["is_error"], rb["is_bas64_image"]]
+                if rb["is_error"] or rb["is_bas64_image"]
+                else rb["value"]
+            )
+            for rb in result_blocks
+        ]
+        self.result_fields_data = []
+
+    def update_values(self) -> None:
+        """Пересобери значения полей результата в таблице UtmResultValue."""
+        self.values.all().delete()
+        UtmResultValue.objects.bulk_create(self.build_values())
+
+    def build_values(self) -> list["UtmResultValue"]:
+        """Несохраненные значения полей результата для таблицы UtmResultValue."""
+        values = []
+        for result in self.result_blocks:
+            # Ошибки и base64-картинки в поиске по истории не участвуют.
+            if result["is_error"] or result["is_bas64_image"] or not result["value"]:
+                continue
+            values.append(
+                UtmResultValue(
+                    result=self,
+                    label=result["label"],
+                    value=result["value"][: UtmResultValue.VALUE_MAX_LENGTH],
+                )
+            )
+        return values
+
+
+class UtmResultValue(models.Model):
+    """Значение поля результата прометки, вынесенное из result_fields_data для
+    индексированного поиска по истории."""
+
+    VALUE_MAX_LENGTH = 1024
+
+    result = models.ForeignKey(
+        to=UtmResult,
+        on_delete=models.CASCADE,
+        related_name="values",
+        verbose_name=_("результат прометки"),
+        editable=False,
+    )
+    label = models.CharField(max_length=50, verbose_name=_("ярлык"), editable=False)
+    value = models.CharField(
+        max_length=VALUE_MAX_LENGTH, verbose_name=_("значение"), editable=False
+    )
+
+    def __str__(self):
+        return f"{self.label}: {self.value}"
+
+    class Meta:
+        ordering = ["pk"]
+        verbose_name = _("значение поля результата прометки")
+        verbose_name_plural = _("значения полей результата прометки")
+        indexes = (
+            # varchar_pattern_ops нужен для поиска по префиксу (LIKE 'value%').
+            models.Index(
+                fields=["label", "value"],
+                name="utm_result_value_label_idx",
+                opclasses=["varchar_pattern_ops", "varchar_pattern_ops"],
+            ),
+            # Поиск по подстроке (icontains) сравнивает UPPER(value), поэтому
+            # триграммный индекс строится по тому же выражению.
+            GinIndex(
+                OpClass(Upper("value"), name="gin_trgm_ops"),
+                name="utm_result_value_utrgm_idx",
+            ),
+        )
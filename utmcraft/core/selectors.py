@@ -1,9 +1,10 @@
-from typing import Type, TypeVar
+from typing import Iterable, Type, TypeVar
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import QuerySet
 
+from authorization.selectors import get_user_access
 from core.models import (
     CheckboxFormField,
     CombinedField,
@@ -11,13 +12,17 @@ from core.models import (
     Form,
     InputIntFormField,
     InputTextFormField,
+    LookupTableEntry,
     LookupTableField,
     RadiobuttonFormField,
     RawUtmData,
+    ResultField,
     SelectFormField,
     SelectFormFieldDependence,
     UtmResult,
 )
+from core.services.hashcode_cache import hashcode_cache
+from core.services.utm_archive import get_archived_record, raw_utm_data_from_record
 
 User = get_user_model()
 
@@ -25,8 +30,10 @@ F = TypeVar("F", bound=Field)
 
 
 def get_user_form_by_pk(user: User, pk: int) -> Form | None:
+    if not _user_has_form(user, pk):
+        return
     try:
-        return user.profile.forms.get(pk=pk)
+        return Form.objects.get(pk=pk)
     except ObjectDoesNotExist:
         return
 
@@ -36,12 +43,29 @@ def get_form_select_dependencies(form: Form) -> QuerySet[SelectFormFieldDependen
 
 
 def get_user_form_with_relations_by_pk(user: User, pk: int) -> Form | None:
+    if not _user_has_form(user, pk):
+        return
     try:
-        return user.profile.forms.select_related("main_result_field").get(pk=pk)
+        return Form.objects.select_related("main_result_field").get(pk=pk)
     except ObjectDoesNotExist:
         return
 
 
+def get_user_forms(user: User) -> list[Form]:
+    """Доступные пользователю формы в порядке, заданном в его профиле."""
+    if not (form_ids := get_user_access(user).form_ids):
+        return []
+    forms = Form.objects.in_bulk(form_ids)
+    return [forms[pk] for pk in form_ids if pk in forms]
+
+
+def _user_has_form(user: User, pk: int | str) -> bool:
+    try:
+        return get_user_access(user).has_form(int(pk))
+    except (TypeError, ValueError):
+        return False
+
+
 def find_field_by_full_title(full_title: str) -> F | None:
     field_type = full_title.split("-")[0].strip()
     try:
@@ -115,7 +139,85 @@ def get_user_by_pk(pk: int) -> User | None:
 
 
 def get_raw_utm_data_by_hashcode(hashcode: str) -> RawUtmData | None:
-    try:
-        return RawUtmData.objects.select_related("form").get(utm_hashcode=hashcode)
-    except ObjectDoesNotExist:
-        return
+    return get_raw_utm_data_by_hashcodes([hashcode]).get(hashcode)
+
+
+def get_raw_utm_data_by_hashcodes(hashcodes: Iterable[str]) -> dict[str, RawUtmData]:
+    hashcodes = set(hashcodes)
+    cached = hashcode_cache.get_many(hashcodes)
+    raw_utm_data_objs = {h: obj for h, obj in cached.items() if obj is not None}
+    # Коды, которых точно нет в БД по данным фильтра Блума, в БД не ищем.
+    missed = {h for h in hashcodes - set(cached) if hashcode_cache.might_exist(h)}
+    found = {}
+    if missed:
+        found = {
+            raw_utm_data.utm_hashcode: raw_utm_data
+            for raw_utm_data in RawUtmData.objects.filter(utm_hashcode__in=missed)
+        }
+    # Старые прометки могли быть перенесены в архив.
+    for hashcode in hashcodes - set(cached) - set(found):
+        if record := get_archived_record(hashcode):
+            found[hashcode] = raw_utm_data_from_record(record)
+    hashcode_cache.set_many(
+        {hashcode: found.get(hashcode) for hashcode in hashcodes - set(cached)}
+    )
+    raw_utm_data_objs.update(found)
+    return raw_utm_data_objs
+
+
+def get_user_form_pks_in(user: User, pks: Iterable[int]) -> set[int]:
+    return get_user_access(user).form_ids_set.intersection(pks)
+
+
+def get_hash_separators() -> set[str]:
+    """Разделители, с которыми уникальный код ссылки добавляется в значения полей."""
+    separators = set()
+    for model in (
+        InputTextFormField,
+        RadiobuttonFormField,
+        SelectFormField,
+        ResultField,
+    ):
+        separators.update(
+            model.objects.filter(add_hash=True)
+            .exclude(hash_separator="")
+            .values_list("hash_separator", flat=True)
+            .distinct()
+        )
+    return separators
+
+
+def get_form_titles_by_pks(pks: Iterable[int]) -> dict[int, str]:
+    return dict(Form.objects.filter(pk__in=pks).values_list("pk", "title"))
+
+
+def get_usernames_by_pks(pks: Iterable[int]) -> dict[int, str]:
+    return dict(User.objects.filter(pk__in=pks).values_list("pk", "username"))
+
+
+def get_lookup_table_entry_build_rule(field_pk: int, key: str) -> list[str] | None:
+    return (
+        LookupTableEntry.objects.filter(field_id=field_pk, key=key)
+        .values_list("build_rule", flat=True)
+        .first()
+    )
+
+
+def get_lookup_table_entries(field_pk: int) -> dict[str, list[str]]:
+    return dict(
+        LookupTableEntry.objects.filter(field_id=field_pk)
+        .order_by()
+        .values_list("key", "build_rule")
+        .iterator(chunk_size=5000)
+    )
+
+
+def get_form_ui_fields(form: Form) -> list[F]:
+    """Поля формы в порядке интерфейса (пустые ячейки и ненайденные поля пропускаются)."""
+    fields = []
+    for row in form.ui:
+        for full_title in row:
+            full_title = full_title.removeprefix("$").strip()
+            if full_title and (field := find_field_by_full_title(full_title)):
+                fields.append(field)
+    return fields
@@ -0,0 +1,172 @@
+"""
+Точечное изменение элементов (choices) полей Radio Button и Select.
+
+Изменения выполняются SQL-операциями над ключами HStore (hstore || ..., delete(...)),
+без загрузки и перезаписи всех элементов в Python. В зависимостях Select-полей
+обновляются только записи, в которых встречается измененный ярлык.
+"""
+from django.contrib.postgres.fields import HStoreField
+from django.contrib.postgres.fields.hstore import KeyTransform
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import TextField, Value
+from django.db.models.functions import Cast, Coalesce, JSONObject
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from core.models import RadiobuttonFormField, SelectFormField, SelectFormFieldDependence
+from core.models.functions import (
+    HStoreConcat,
+    HStoreDelete,
+    HStorePair,
+    JSONBPathExists,
+)
+
+ChoicesField = RadiobuttonFormField | SelectFormField
+
+EMPTY_HSTORE = Cast(Value(""), output_field=HStoreField())
+# Есть ли ярлык в каком-либо массиве ярлыков зависимых значений.
+DEPENDENCE_LABEL_PATH = "$.*[*] ? (@ == $label)"
+
+
+def add_choice(field: ChoicesField, label: str, value: str) -> None:
+    if not label:
+        raise ValidationError({"choices": [_("Ярлык элемента обязателен.")]})
+    with transaction.atomic():
+        queryset = _lock(field)
+        if queryset.filter(choices__has_key=label).exists():
+            raise ValidationError(
+                {
+                    "choices": [
+                        _("Элемент с ярлыком '%(label)s' уже существует.")
+                        % {"label": label}
+                    ]
+                }
+            )
+        queryset.update(
+            choices=HStoreConcat(
+                Coalesce("choices", EMPTY_HSTORE),
+                HStorePair(_text(label), _text(value)),
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+def rename_choice(field: ChoicesField, label: str, new_label: str) -> None:
+    if not new_label:
+        raise ValidationError({"choices": [_("Ярлык элемента обязателен.")]})
+    if label == new_label:
+        return
+    with transaction.atomic():
+        queryset = _lock(field)
+        _check_choice_exists(queryset, label)
+        if queryset.filter(choices__has_key=new_label).exists():
+            raise ValidationError(
+                {
+                    "choices": [
+                        _("Элемент с ярлыком '%(label)s' уже существует.")
+                        % {"label": new_label}
+                    ]
+                }
+            )
+        queryset.update(
+            choices=HStoreConcat(
+                HStoreDelete("choices", _text(label)),
+                HStorePair(_text(new_label), KeyTransform(label, "choices")),
+            ),
+            updated_at=timezone.now(),
+        )
+        if isinstance(field, SelectFormField):
+            _update_dependencies_label(field, label, new_label)
+
+
+def remove_choice(field: ChoicesField, label: str) -> None:
+    with transaction.atomic():
+        queryset = _lock(field)
+        _check_choice_exists(queryset, label)
+        queryset.update(
+            choices=HStoreDelete("choices", _text(label)), updated_at=timezone.now()
+        )
+        # Проверки из BaseSelectFormFieldModel.clean, но по оставшимся в БД элементам.
+        # Ошибка откатывает удаление.
+        initial, is_required = queryset.values_list("initial", "is_required").get()
+        if is_required and queryset.filter(choices__keys=[]).exists():
+            raise ValidationError(
+                {
+                    "choices": [
+                        _(
+                            "Должен быть указан хотя бы 1 элемент, так как поле"
+                            " отмечено как обязательное к заполнению в прометчике."
+                        )
+                    ]
+                }
+            )
+        if (
+            initial
+            and not queryset.filter(choices__values__contains=[initial]).exists()
+        ):
+            raise ValidationError(
+                {
+                    "choices": [
+                        _(
+                            "Нельзя удалить элемент со значением по умолчанию. Сначала"
+                            " измените значение по умолчанию."
+                        )
+                    ]
+                }
+            )
+        if isinstance(field, SelectFormField):
+            _update_dependencies_label(field, label, None)
+
+
+def _lock(field: ChoicesField):
+    queryset = type(field).objects.filter(pk=field.pk)
+    if not list(queryset.select_for_update(no_key=True).values_list("pk", flat=True)):
+        raise ValidationError(_("Поле не найдено."))
+    return queryset
+
+
+def _check_choice_exists(queryset, label: str) -> None:
+    if not queryset.filter(choices__has_key=label).exists():
+        raise ValidationError(
+            {
+                "choices": [
+                    _("Элемент с ярлыком '%(label)s' не найден.") % {"label": label}
+                ]
+            }
+        )
+
+
+def _update_dependencies_label(
+    field: SelectFormField, label: str, new_label: str | None
+) -> None:
+    """Переименовывает (или удаляет, если new_label=None) ярлык в зависимостях, где
+    поле – зависимое."""
+    dependencies = list(
+        SelectFormFieldDependence.objects.select_for_update(no_key=True)
+        .filter(child_field=field)
+        .alias(
+            has_label=JSONBPathExists(
+                "values",
+                _text(DEPENDENCE_LABEL_PATH),
+                JSONObject(label=_text(label)),
+            )
+        )
+        .filter(has_label=True)
+        .only("pk", "values")
+    )
+    for dependence in dependencies:
+        updated_values = {}
+        for key, labels in dependence.values.items():
+            if label in labels:
+                labels = [l for l in labels if l != label]
+                if new_label is not None and new_label not in labels:
+                    labels.append(new_label)
+            updated_values[key] = labels
+        dependence.values = updated_values
+    if dependencies:
+        SelectFormFieldDependence.objects.bulk_update(dependencies, fields=["values"])
+
+
+def _text(value: str) -> Value:
+    return Value(value, output_field=TextField())
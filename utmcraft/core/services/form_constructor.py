@@ -189,5 +189,16 @@ class FormFactory:
         form.helper.layout = Layout(
             Field("form_id", type="hidden"),
             *form_interface,
+            HTML(
+                '<div class="custom-control custom-switch mt-3">'
+                '<input type="checkbox" class="custom-control-input" id="matrix-mode">'
+                '<label class="custom-control-label" for="matrix-mode">%s</label>'
+                "</div>"
+                % _(
+                    "Матрица: все комбинации значений (в полях ввода значения"
+                    " перечисляются через ';', в списках можно выбрать несколько"
+                    " значений), результат скачивается CSV-файлом"
+                )
+            ),
             Submit("build", _("Сгенерировать"), css_class="mt-3"),
         )
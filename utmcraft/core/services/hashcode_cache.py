@@ -0,0 +1,271 @@
+"""
+Кэш разрешения уникальных кодов ссылок в прометки.
+
+Прометки после сохранения не меняются, поэтому поиск по коду идет по цепочке:
+кэш процесса (LRU) -> общий кэш Django (Redis) -> фильтр Блума процесса -> БД.
+Неизвестные коды тоже кэшируются, но на короткое время. Новая прометка сразу
+записывается в общий кэш, поэтому устаревший фильтр Блума не скрывает ее от
+других процессов.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from core.models import RawUtmData
+
+log = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "utm_hashcode:"
+# Отрицательная запись кэша: прометки с таким кодом нет.
+NOT_FOUND = False
+MISSING = object()
+
+CachedRawUtmData = tuple[
+    int, int | None, dict[str, Any], int | None, int | None, datetime, datetime
+]
+
+
+class LocalCache:
+    """Потокобезопасный LRU-кэш процесса с временем жизни записей."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                return MISSING
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, timeout: int) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: str) -> None:
+        for position in self._get_positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._get_positions(key)
+        )
+
+    def _get_positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+
+class HashcodeCache:
+    def __init__(self):
+        self.local_cache = LocalCache(settings.UTM_HASHCODE_LOCAL_CACHE_SIZE)
+        self._bloom_filter: BloomFilter | None = None
+        self._bloom_filter_built_at: float | None = None
+        self._bloom_filter_lock = threading.Lock()
+        # Коды, сохраненные во время перестройки: скан БД мог их не увидеть.
+        self._bloom_filter_pending: list[str] | None = None
+
+    def get(self, hashcode: str) -> RawUtmData | None | object:
+        """Возвращает прометку, None для известного отсутствующего кода или MISSING."""
+        return self.get_many([hashcode]).get(hashcode, MISSING)
+
+    def get_many(self, hashcodes: Iterable[str]) -> dict[str, RawUtmData | None]:
+        result, missed = self._get_many_local(hashcodes)
+        if missed:
+            shared_values = cache.get_many([CACHE_KEY_PREFIX + h for h in missed])
+            self._update_from_shared(result, missed, shared_values)
+        return result
+
+    async def aget_many(self, hashcodes: Iterable[str]) -> dict[str, RawUtmData | None]:
+        """get_many для async-представлений: общий кэш через асинхронный API."""
+        result, missed = self._get_many_local(hashcodes)
+        if missed:
+            shared_values = await cache.aget_many(
+                [CACHE_KEY_PREFIX + h for h in missed]
+            )
+            self._update_from_shared(result, missed, shared_values)
+        return result
+
+    def _get_many_local(
+        self, hashcodes: Iterable[str]
+    ) -> tuple[dict[str, RawUtmData | None], list[str]]:
+        result = {}
+        missed = []
+        for hashcode in hashcodes:
+            value = self.local_cache.get(hashcode)
+            if value is MISSING:
+                missed.append(hashcode)
+            else:
+                result[hashcode] = self._from_cache_value(hashcode, value)
+        return result, missed
+
+    def _update_from_shared(
+        self,
+        result: dict[str, RawUtmData | None],
+        missed: list[str],
+        shared_values: dict[str, CachedRawUtmData | bool],
+    ) -> None:
+        for hashcode in missed:
+            value = shared_values.get(CACHE_KEY_PREFIX + hashcode)
+            if value is None:
+                continue
+            self._set_local(hashcode, value)
+            result[hashcode] = self._from_cache_value(hashcode, value)
+
+    def set(self, hashcode: str, raw_utm_data: RawUtmData | None) -> None:
+        self.set_many({hashcode: raw_utm_data})
+
+    def set_many(self, raw_utm_data_objs: dict[str, RawUtmData | None]) -> None:
+        positive, negative = {}, {}
+        for hashcode, raw_utm_data in raw_utm_data_objs.items():
+            value = self._to_cache_value(raw_utm_data)
+            self._set_local(hashcode, value)
+            (positive if value is not NOT_FOUND else negative)[
+                CACHE_KEY_PREFIX + hashcode
+            ] = value
+            if value is not NOT_FOUND:
+                if self._bloom_filter is not None:
+                    self._bloom_filter.add(hashcode)
+                if (pending := self._bloom_filter_pending) is not None:
+                    pending.append(hashcode)
+        if positive:
+            cache.set_many(positive, timeout=settings.UTM_HASHCODE_CACHE_TIMEOUT)
+        if negative:
+            cache.set_many(
+                negative, timeout=settings.UTM_HASHCODE_NEGATIVE_CACHE_TIMEOUT
+            )
+
+    def might_exist(self, hashcode: str) -> bool:
+        """False, только если кода точно нет в БД по данным фильтра Блума."""
+        if not settings.UTM_HASHCODE_BLOOM_FILTER:
+            return True
+        self._refresh_bloom_filter()
+        if self._bloom_filter is None:
+            return True
+        return hashcode in self._bloom_filter
+
+    def _refresh_bloom_filter(self) -> None:
+        if (
+            self._bloom_filter_built_at is not None
+            and time.monotonic() - self._bloom_filter_built_at
+            < settings.UTM_HASHCODE_BLOOM_FILTER_REBUILD_INTERVAL
+        ):
+            return
+        # Скан всех кодов идет в фоновом потоке, чтобы не задерживать запрос. Пока
+        # фильтр строится, используется старый, а до первой сборки might_exist
+        # возвращает True.
+        if not self._bloom_filter_lock.acquire(blocking=False):
+            return
+        self._bloom_filter_pending = []
+        threading.Thread(
+            target=self._rebuild_bloom_filter, name="hashcode-bloom-filter", daemon=True
+        ).start()
+
+    def _rebuild_bloom_filter(self) -> None:
+        try:
+            started_at = time.monotonic()
+            count = RawUtmData.objects.count()
+            # Запас на прометки, созданные до следующей перестройки.
+            bloom_filter = BloomFilter(capacity=count * 2 + 1000)
+            for hashcode in RawUtmData.objects.values_list(
+                "utm_hashcode", flat=True
+            ).iterator(chunk_size=10000):
+                bloom_filter.add(hashcode)
+            pending, self._bloom_filter_pending = self._bloom_filter_pending, None
+            for hashcode in pending:
+                bloom_filter.add(hashcode)
+            self._bloom_filter = bloom_filter
+            self._bloom_filter_built_at = time.monotonic()
+            log.info(
+                f"Hashcode bloom filter rebuilt: {count} hashcodes,"
+                f" {len(bloom_filter.bits)} bytes,"
+                f" {time.monotonic() - started_at:.2f}s"
+            )
+        except Exception as e:
+            log.exception(f"Failed to rebuild hashcode bloom filter: {e}")
+            self._bloom_filter_pending = None
+            self._bloom_filter_built_at = time.monotonic()
+        finally:
+            # Подключения к БД этого потока.
+            connections.close_all()
+            self._bloom_filter_lock.release()
+
+    def _set_local(self, hashcode: str, value: CachedRawUtmData | bool) -> None:
+        self.local_cache.set(
+            hashcode,
+            value,
+            timeout=(
+                settings.UTM_HASHCODE_CACHE_TIMEOUT
+                if value is not NOT_FOUND
+                else settings.UTM_HASHCODE_NEGATIVE_CACHE_TIMEOUT
+            ),
+        )
+
+    @staticmethod
+    def _to_cache_value(raw_utm_data: RawUtmData | None) -> CachedRawUtmData | bool:
+        if raw_utm_data is None:
+            return NOT_FOUND
+        return (
+            raw_utm_data.pk,
+            raw_utm_data.form_id,
+            raw_utm_data.data,
+            raw_utm_data.created_by_id,
+            raw_utm_data.updated_by_id,
+            raw_utm_data.created_at,
+            raw_utm_data.updated_at,
+        )
+
+    @staticmethod
+    def _from_cache_value(
+        hashcode: str, value: CachedRawUtmData | bool
+    ) -> RawUtmData | None:
+        if value is NOT_FOUND:
+            return
+        pk, form_id, data, created_by_id, updated_by_id, created_at, updated_at = value
+        return RawUtmData(
+            pk=pk,
+            utm_hashcode=hashcode,
+            form_id=form_id,
+            data=data,
+            created_by_id=created_by_id,
+            updated_by_id=updated_by_id,
+            created_at=created_at,
+            updated_at=updated_at,
+        )
+
+
+hashcode_cache = HashcodeCache()
@@ -0,0 +1,179 @@
+"""
+Сопоставление значения поля "Зависит от" с ключами Lookup-поля.
+
+Кроме точного совпадения ключи могут быть числовыми интервалами ("18..24", "..17",
+"65.."), префиксами или регулярными выражениями. Матчер строится один раз на версию
+ключей поля и возвращает найденный ключ, а правило генерации результата берется
+по нему из lookup_values или Lookup-записей:
+- интервалы: бинарный поиск по отсортированным левым границам;
+- префиксы: префиксное дерево, выигрывает самый длинный префикс;
+- регулярные выражения: одно скомпилированное выражение-альтернатива, сравнение с
+  начала значения, при нескольких совпадениях выигрывает первый ключ по алфавиту.
+"""
+import bisect
+import re
+from typing import Iterable
+
+from django.utils.translation import gettext_lazy as _
+
+RANGE_SEPARATOR = ".."
+# Имя группы регулярного выражения, соответствующей ключу с индексом i.
+REGEX_GROUP_NAME = "_lookup_key_{}"
+# Экранированный символ или начало условной группы (?(1)...). Обратные ссылки \1 и
+# условные группы ссылаются на номера групп, которые в общем выражении сдвигаются.
+_GROUP_REFERENCE_RE = re.compile(r"\\(.)|\(\?\(", re.DOTALL)
+
+
+class KeyMatcherError(ValueError):
+    pass
+
+
+class ExactMatcher:
+    MODE = "exact"
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys = frozenset(keys)
+
+    def match(self, value: str) -> str | None:
+        return value if value in self._keys else None
+
+
+class RangeMatcher:
+    """Интервалы включают обе границы и не должны пересекаться."""
+
+    MODE = "range"
+
+    def __init__(self, keys: Iterable[str]):
+        ranges = sorted((*parse_range_key(key), key) for key in keys)
+        for prev, current in zip(ranges, ranges[1:]):
+            if current[0] <= prev[1]:
+                raise KeyMatcherError(
+                    _("интервалы '%(prev)s' и '%(current)s' пересекаются")
+                    % {"prev": prev[2], "current": current[2]}
+                )
+        self._lows = [low for low, *__ in ranges]
+        self._ranges = ranges
+
+    def match(self, value: str) -> str | None:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return
+        i = bisect.bisect_right(self._lows, number) - 1
+        if i < 0:
+            return
+        __, high, key = self._ranges[i]
+        return key if number <= high else None
+
+
+class PrefixMatcher:
+    MODE = "prefix"
+
+    # Ключ, под которым в узле дерева хранится префикс, заканчивающийся в этом узле.
+    _END = ""
+
+    def __init__(self, keys: Iterable[str]):
+        self._root: dict = {}
+        for key in keys:
+            node = self._root
+            for char in key:
+                node = node.setdefault(char, {})
+            node[self._END] = key
+
+    def match(self, value: str) -> str | None:
+        node = self._root
+        found = node.get(self._END)
+        for char in value:
+            if (node := node.get(char)) is None:
+                break
+            found = node.get(self._END, found)
+        return found
+
+
+class RegexMatcher:
+    MODE = "regex"
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys = sorted(keys)
+        for key in self._keys:
+            compile_regex_key(key)
+        try:
+            self._regex = re.compile(
+                "|".join(
+                    f"(?P<{REGEX_GROUP_NAME.format(i)}>{key})"
+                    for i, key in enumerate(self._keys)
+                )
+            )
+        except re.error as e:
+            raise KeyMatcherError(
+                _("регулярные выражения не собираются в одно общее: %(error)s")
+                % {"error": e}
+            )
+        self._group_indexes = {
+            self._regex.groupindex[REGEX_GROUP_NAME.format(i)]: i
+            for i in range(len(self._keys))
+        }
+
+    def match(self, value: str) -> str | None:
+        if not self._keys or not (match := self._regex.match(value)):
+            return
+        # Группа ключа закрывается последней, поэтому lastindex указывает на нее.
+        return self._keys[self._group_indexes[match.lastindex]]
+
+
+MATCHERS = {
+    matcher.MODE: matcher
+    for matcher in (ExactMatcher, RangeMatcher, PrefixMatcher, RegexMatcher)
+}
+
+
+def build_matcher(
+    key_mode: str, keys: Iterable[str]
+) -> ExactMatcher | RangeMatcher | PrefixMatcher | RegexMatcher:
+    return MATCHERS[key_mode](keys)
+
+
+def parse_range_key(key: str) -> tuple[float, float]:
+    """Разбирает ключ "a..b" в границы интервала. Пропущенная граница – бесконечность."""
+    low, separator, high = key.partition(RANGE_SEPARATOR)
+    if not separator:
+        raise KeyMatcherError(_("интервал должен быть указан в виде 'a..b'"))
+    try:
+        low = int(low) if low.strip() else float("-inf")
+        high = int(high) if high.strip() else float("inf")
+    except ValueError:
+        raise KeyMatcherError(_("границы интервала должны быть целыми числами"))
+    if low > high:
+        raise KeyMatcherError(_("левая граница интервала больше правой"))
+    return low, high
+
+
+def compile_regex_key(key: str) -> re.Pattern:
+    try:
+        pattern = re.compile(key)
+    except re.error as e:
+        raise KeyMatcherError(
+            _("некорректное регулярное выражение: %(error)s") % {"error": e}
+        )
+    if pattern.groupindex:
+        # Именованные группы ключей могут пересечься с группами общего выражения.
+        raise KeyMatcherError(
+            _("регулярное выражение не должно содержать именованные группы")
+        )
+    if pattern.flags & ~re.UNICODE:
+        # Глобальный флаг в середине общего выражения – ошибка.
+        raise KeyMatcherError(
+            _(
+                "регулярное выражение не должно содержать глобальные флаги, например"
+                " (?i); используйте флаги группы: (?i:...)"
+            )
+        )
+    for match in _GROUP_REFERENCE_RE.finditer(key):
+        if match.group(1) is None or match.group(1) in "123456789":
+            raise KeyMatcherError(
+                _(
+                    "регулярное выражение не должно содержать обратные ссылки на"
+                    " группы и условные группы"
+                )
+            )
+    return pattern
@@ -0,0 +1,92 @@
+"""
+Получение зависимых значений Lookup-полей.
+
+Значения хранятся либо в LookupTableField.lookup_values, либо отдельными записями
+LookupTableEntry (external_entries). Отдельные записи по умолчанию читаются по одной
+по индексу (field, key). Для массовой генерации записи поля можно загрузить в кэш
+процесса целиком: кэш привязан к entries_version и сбрасывается при изменении записей.
+
+Если ключи не точные (key_mode), сначала матчер находит ключ, подходящий под значение,
+а затем по нему берется правило генерации результата. Матчер строится один раз на
+версию ключей поля (updated_at для lookup_values, entries_version для Lookup-записей).
+"""
+import logging
+import threading
+
+from core.models import LookupTableField
+from core.selectors import get_lookup_table_entries, get_lookup_table_entry_build_rule
+from core.services.lookup_matchers import KeyMatcherError, build_matcher
+
+log = logging.getLogger(__name__)
+
+
+class LookupTableEntriesCache:
+    def __init__(self):
+        self._data: dict[int, tuple[int, dict[str, list[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, field_obj: LookupTableField) -> dict[str, list[str]] | None:
+        if not (cached := self._data.get(field_obj.pk)):
+            return
+        version, entries = cached
+        if version != field_obj.entries_version:
+            return
+        return entries
+
+    def preload(self, field_obj: LookupTableField) -> dict[str, list[str]]:
+        if (entries := self.get(field_obj)) is not None:
+            return entries
+        entries = get_lookup_table_entries(field_obj.pk)
+        with self._lock:
+            # Записи старых версий поля больше не нужны.
+            self._data[field_obj.pk] = (field_obj.entries_version, entries)
+        return entries
+
+
+lookup_table_entries_cache = LookupTableEntriesCache()
+
+
+class LookupKeyMatchersCache:
+    def __init__(self):
+        self._data: dict[int, tuple[tuple, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, field_obj: LookupTableField):
+        version = (
+            field_obj.key_mode,
+            field_obj.external_entries,
+            field_obj.updated_at,
+            field_obj.entries_version,
+        )
+        if (cached := self._data.get(field_obj.pk)) and cached[0] == version:
+            return cached[1]
+        if field_obj.external_entries:
+            keys = lookup_table_entries_cache.preload(field_obj)
+        else:
+            keys = field_obj.lookup_values or {}
+        try:
+            matcher = build_matcher(field_obj.key_mode, keys)
+        except KeyMatcherError as e:
+            # Ключи проверяются при сохранении поля, сюда попадают только ключи,
+            # измененные в обход валидации. Поле считается без зависимых значений.
+            log.error(f"Invalid lookup keys in field {field_obj.full_title}: {e}")
+            matcher = build_matcher(LookupTableField.KeyMode.EXACT, ())
+        with self._lock:
+            self._data[field_obj.pk] = (version, matcher)
+        return matcher
+
+
+lookup_key_matchers_cache = LookupKeyMatchersCache()
+
+
+def get_lookup_build_rule(field_obj: LookupTableField, key: str) -> list[str] | None:
+    """Правило генерации результата для значения поля, от которого зависит
+    Lookup-поле, или None, если значение не найдено."""
+    if field_obj.key_mode != LookupTableField.KeyMode.EXACT:
+        if (key := lookup_key_matchers_cache.get(field_obj).match(key)) is None:
+            return
+    if not field_obj.external_entries:
+        return (field_obj.lookup_values or {}).get(key)
+    if (entries := lookup_table_entries_cache.get(field_obj)) is not None:
+        return entries.get(key)
+    return get_lookup_table_entry_build_rule(field_obj.pk, key)
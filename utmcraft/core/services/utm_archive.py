@@ -0,0 +1,267 @@
+"""
+Холодный архив старых прометок.
+
+Архив состоит из неизменяемых файлов-сегментов. Каждый сегмент – это
+последовательность сжатых zlib блоков с записями, отсортированными по уникальному
+коду ссылки, и разреженный индекс (первый код каждого блока) в конце файла. Поиск
+по коду – бинарный поиск по индексу и распаковка одного блока из memory-mapped файла.
+"""
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import RawUtmData, UtmResult
+
+log = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".utmarc"
+SEGMENT_MAGIC = b"UTMARC01"
+# Футер сегмента: смещение индекса, длина индекса, magic.
+SEGMENT_FOOTER = struct.Struct(">QQ8s")
+
+
+class ArchiveSegmentWriter:
+    """Записывает новый сегмент архива. Записи должны передаваться отсортированными
+    по уникальному коду ссылки."""
+
+    def __init__(self, directory: str | Path, block_size: int = 256):
+        self.directory = Path(directory)
+        self.block_size = block_size
+        self.path: Path | None = self.directory / (
+            timezone.now().strftime("%Y%m%d%H%M%S%f") + SEGMENT_SUFFIX
+        )
+        self.records_count = 0
+        self._tmp_path = self.path.with_suffix(".tmp")
+        self._file = None
+        self._block: list[dict] = []
+        self._index: list[tuple[str, int, int]] = []
+        self._last_hashcode: str | None = None
+
+    def __enter__(self) -> "ArchiveSegmentWriter":
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp_path, "wb")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        if exc_type is not None:
+            self._file.close()
+            self._tmp_path.unlink(missing_ok=True)
+            return False
+        self._flush_block()
+        if not self._index:
+            self._file.close()
+            self._tmp_path.unlink(missing_ok=True)
+            self.path = None
+            return False
+        index = zlib.compress(
+            json.dumps(
+                {"blocks": self._index, "last_hashcode": self._last_hashcode}
+            ).encode()
+        )
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(SEGMENT_FOOTER.pack(index_offset, len(index), SEGMENT_MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        # Сегмент появляется в директории архива только полностью записанным.
+        os.replace(self._tmp_path, self.path)
+        return False
+
+    def write(self, record: dict) -> None:
+        hashcode = record["hashcode"]
+        if self._last_hashcode is not None and hashcode <= self._last_hashcode:
+            raise ValueError(
+                f"Archive records must be sorted by hashcode: {hashcode} after"
+                f" {self._last_hashcode}"
+            )
+        self._last_hashcode = hashcode
+        self._block.append(record)
+        self.records_count += 1
+        if len(self._block) >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._block:
+            return
+        # Первая строка блока – список кодов, чтобы при поиске не парсить все записи.
+        lines = [json.dumps([record["hashcode"] for record in self._block])]
+        lines.extend(
+            json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+            for record in self._block
+        )
+        block = zlib.compress("\n".join(lines).encode())
+        self._index.append((self._block[0]["hashcode"], self._file.tell(), len(block)))
+        self._file.write(block)
+        self._block = []
+
+
+class ArchiveSegment:
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        index_offset, index_length, magic = SEGMENT_FOOTER.unpack(
+            self._mmap[-SEGMENT_FOOTER.size :]
+        )
+        if magic != SEGMENT_MAGIC:
+            self.close()
+            raise ValueError(f"File {path} is not an utmcraft archive segment")
+        index = json.loads(
+            zlib.decompress(self._mmap[index_offset : index_offset + index_length])
+        )
+        self._first_hashcodes = [block[0] for block in index["blocks"]]
+        self._blocks = [(block[1], block[2]) for block in index["blocks"]]
+        self._last_hashcode = index["last_hashcode"]
+
+    def get(self, hashcode: str) -> dict | None:
+        if not (self._first_hashcodes[0] <= hashcode <= self._last_hashcode):
+            return
+        i = bisect.bisect_right(self._first_hashcodes, hashcode) - 1
+        offset, length = self._blocks[i]
+        lines = zlib.decompress(self._mmap[offset : offset + length]).split(b"\n")
+        hashcodes = json.loads(lines[0])
+        j = bisect.bisect_left(hashcodes, hashcode)
+        if j == len(hashcodes) or hashcodes[j] != hashcode:
+            return
+        return json.loads(lines[j + 1])
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+
+class UtmArchive:
+    """Чтение архива. Новые сегменты подхватываются по изменению директории."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._segments: dict[Path, ArchiveSegment] = {}
+        self._directory_mtime: float | None = None
+
+    def get(self, hashcode: str) -> dict | None:
+        self._refresh()
+        # Более новые сегменты важнее: код мог быть заархивирован повторно.
+        for path in sorted(self._segments, reverse=True):
+            if record := self._segments[path].get(hashcode):
+                return record
+
+    def _refresh(self) -> None:
+        try:
+            mtime = self.directory.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._directory_mtime:
+            return
+        paths = set(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+        for path in set(self._segments) - paths:
+            self._segments.pop(path).close()
+        for path in paths - set(self._segments):
+            try:
+                self._segments[path] = ArchiveSegment(path)
+            except (OSError, ValueError, zlib.error) as e:
+                log.error(f"Failed to open archive segment {path}: {e}")
+        self._directory_mtime = mtime
+
+
+utm_archive = UtmArchive(settings.UTM_ARCHIVE_DIR)
+
+
+def get_archived_record(hashcode: str) -> dict | None:
+    return utm_archive.get(hashcode)
+
+
+def raw_utm_data_from_record(record: dict) -> RawUtmData:
+    return RawUtmData(
+        pk=record["id"],
+        utm_hashcode=record["hashcode"],
+        form_id=record["form_id"],
+        data=record["data"],
+        created_by_id=record["created_by_id"],
+        updated_by_id=record["updated_by_id"],
+        created_at=parse_datetime(record["created_at"]),
+        updated_at=parse_datetime(record["updated_at"]),
+    )
+
+
+def utm_result_from_record(record: dict) -> UtmResult | None:
+    if not (result := record["result"]):
+        return
+    utm_result = UtmResult(
+        pk=result["id"],
+        main_result_value=result["main_result_value"],
+        result_fields_data=result["result_fields_data"],
+        created_by_id=result["created_by_id"],
+        updated_by_id=result["updated_by_id"],
+        created_at=parse_datetime(result["created_at"]),
+        updated_at=parse_datetime(result["updated_at"]),
+    )
+    utm_result.raw_utm_data = raw_utm_data_from_record(record)
+    return utm_result
+
+
+def record_from_raw_utm_data(raw_utm_data: RawUtmData) -> dict:
+    record = {
+        "hashcode": raw_utm_data.utm_hashcode,
+        "id": raw_utm_data.pk,
+        "form_id": raw_utm_data.form_id,
+        "data": raw_utm_data.data,
+        "created_by_id": raw_utm_data.created_by_id,
+        "updated_by_id": raw_utm_data.updated_by_id,
+        "created_at": raw_utm_data.created_at,
+        "updated_at": raw_utm_data.updated_at,
+        "result": None,
+    }
+    try:
+        utm_result = raw_utm_data.utmresult
+    except UtmResult.DoesNotExist:
+        return record
+    record["result"] = {
+        "id": utm_result.pk,
+        "main_result_value": utm_result.main_result_value,
+        "result_fields_data": utm_result.result_blocks,
+        "created_by_id": utm_result.created_by_id,
+        "updated_by_id": utm_result.updated_by_id,
+        "created_at": utm_result.created_at,
+        "updated_at": utm_result.updated_at,
+    }
+    return record
+
+
+def archive_utm_data(
+    days: int, block_size: int = 256, delete_batch_size: int = 1000
+) -> tuple[Path | None, int]:
+    """
+    Переносит прометки старше days дней в новый сегмент архива и удаляет их из БД.
+    :return: Кортеж: (путь к сегменту, количество заархивированных прометок)
+    """
+    created_before = timezone.now() - timedelta(days=days)
+    raw_utm_data_objs = (
+        RawUtmData.objects.filter(created_at__lt=created_before)
+        .select_related("utmresult")
+        .order_by("utm_hashcode")
+    )
+    archived_pks = []
+    with ArchiveSegmentWriter(settings.UTM_ARCHIVE_DIR, block_size) as writer:
+        for raw_utm_data in raw_utm_data_objs.iterator(chunk_size=2000):
+            writer.write(record_from_raw_utm_data(raw_utm_data))
+            archived_pks.append(raw_utm_data.pk)
+    # Удаляем из БД только после того, как сегмент полностью записан на диск.
+    for i in range(0, len(archived_pks), delete_batch_size):
+        pks = archived_pks[i : i + delete_batch_size]
+        with transaction.atomic():
+            UtmResult.objects.filter(raw_utm_data__pk__in=pks).delete()
+            RawUtmData.objects.filter(pk__in=pks).delete()
+    return writer.path, writer.records_count
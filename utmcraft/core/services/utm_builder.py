@@ -2,7 +2,7 @@ import logging
 import re
 import urllib.parse
 from copy import deepcopy
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from functools import cache
 from typing import TypeVar
 
@@ -30,6 +30,11 @@ from core.selectors import (
     get_user_form_with_relations_by_pk,
     get_utm_result_by_raw_utm_data,
 )
+from core.services.lookup_tables import (
+    get_lookup_build_rule,
+    lookup_key_matchers_cache,
+    lookup_table_entries_cache,
+)
 from core.utils import get_hash
 
 log = logging.getLogger(__name__)
@@ -67,19 +72,132 @@ class FieldObjProxy:
     def get(self, full_title: str) -> F | None:
         if full_title.startswith("$"):
             full_title = full_title[1:]
-        if value := self._cache.get(full_title):
-            return value
+        if full_title in self._cache:
+            return self._cache[full_title]
         value = find_field_by_full_title(full_title)
         self._cache[full_title] = value
         return value
 
 
+# Псевдозависимость поля от уникального кода ссылки (опция "добавить уникальный код").
+HASH_DEPENDENCY = "#hash"
+
+
+@dataclass
+class FormPlan:
+    """
+    Предзагруженная форма для массовой прометки: поля, от которых зависят поля
+    результата, и настройки, которые иначе запрашивались бы из БД для каждой прометки.
+    """
+
+    form_obj: Form
+    field_obj_proxy: FieldObjProxy
+    # PK чекбоксов 'use_https' пользователя.
+    use_https_pks: frozenset[int] = field(default_factory=frozenset)
+    # Полные названия всех полей, которые могут понадобиться для прометки.
+    full_titles: tuple[str, ...] = ()
+    _dependencies: dict[str, frozenset[int | str]] = field(
+        default_factory=dict, repr=False
+    )
+
+    def get_dependencies(self, full_title: str) -> frozenset[int | str]:
+        """
+        PK полей формы, от значений которых зависит значение поля, и HASH_DEPENDENCY,
+        если в значение поля или его зависимостей добавляется уникальный код ссылки.
+        """
+        full_title = full_title.removeprefix("$").strip()
+        if (dependencies := self._dependencies.get(full_title)) is not None:
+            return dependencies
+        # Циклические зависимости запрещены валидацией, но рекурсия не должна зависнуть.
+        self._dependencies[full_title] = frozenset()
+        field_obj = self.field_obj_proxy.get(full_title)
+        dependencies = set()
+        if isinstance(field_obj, FormField):
+            dependencies.add(field_obj.pk)
+        elif field_obj:
+            for build_rule in get_field_build_rules(field_obj):
+                for elem in build_rule:
+                    if elem.startswith("$"):
+                        dependencies.update(self.get_dependencies(elem))
+        if getattr(field_obj, "add_hash", False):
+            dependencies.add(HASH_DEPENDENCY)
+        self._dependencies[full_title] = frozenset(dependencies)
+        return self._dependencies[full_title]
+
+
+def get_field_build_rules(field_obj: F) -> list[list[str]]:
+    """Все правила генерации результата, по которым может считаться значение поля."""
+    if isinstance(field_obj, CombinedField):
+        return [field_obj.build_rule]
+    if not isinstance(field_obj, LookupTableField):
+        return []
+    build_rules = [field_obj.default_value]
+    if field_obj.depends_field:
+        build_rules.append([f"${field_obj.depends_field.full_title}"])
+    if field_obj.external_entries:
+        build_rules.extend(lookup_table_entries_cache.preload(field_obj).values())
+    else:
+        build_rules.extend((field_obj.lookup_values or {}).values())
+    return build_rules
+
+
+def build_form_plan(form_obj: Form, user: User) -> FormPlan:
+    """Загружает все поля, которые могут понадобиться для прометки формой."""
+    form_obj = (
+        Form.objects.select_related("main_result_field")
+        .prefetch_related("result_fields")
+        .get(pk=form_obj.pk)
+    )
+    field_obj_proxy = FieldObjProxy()
+    full_titles = [form_obj.main_result_field.full_title]
+    full_titles.extend(f.full_title for f in form_obj.result_fields.all())
+    seen = {}
+    while full_titles:
+        full_title = full_titles.pop().removeprefix("$").strip()
+        if full_title in seen:
+            continue
+        seen[full_title] = None
+        if not (field_obj := field_obj_proxy.get(full_title)):
+            continue
+        if (
+            isinstance(field_obj, LookupTableField)
+            and field_obj.key_mode != LookupTableField.KeyMode.EXACT
+        ):
+            lookup_key_matchers_cache.get(field_obj)
+        for build_rule in get_field_build_rules(field_obj):
+            full_titles.extend(elem for elem in build_rule if elem.startswith("$"))
+    use_https_pks = CheckboxFormField.objects.filter(
+        title="use_https", user=user
+    ).values_list("pk", flat=True)
+    return FormPlan(
+        form_obj=form_obj,
+        field_obj_proxy=field_obj_proxy,
+        use_https_pks=frozenset(use_https_pks),
+        full_titles=tuple(seen),
+    )
+
+
 class FieldCalculator:
     URL_SPECIAL_SYMBOLS = ("=", "&", "?", "#", "'", '"', "\n", "\r")
 
-    def __init__(self, utm_builder: "UtmBuilder"):
+    def __init__(
+        self, utm_builder: "UtmBuilder", field_obj_proxy: FieldObjProxy | None = None
+    ):
         self.utm_builder = utm_builder
-        self.field_obj_proxy = FieldObjProxy()
+        self.field_obj_proxy = field_obj_proxy or FieldObjProxy()
+
+    @classmethod
+    def cache_clear(cls) -> None:
+        """Очищает кэши значений всех калькуляторов. Кэши методов хранят ссылки на
+        калькуляторы, поэтому при массовой прометке их нужно периодически очищать."""
+        for method in (
+            cls.__call__,
+            cls.calculate_simple_field,
+            cls.calculate_combined_field,
+            cls.calculate_lookup_field,
+            cls.calculate_build_rule,
+        ):
+            method.cache_clear()
 
     @cache
     def __call__(self, full_title: str) -> str:
@@ -131,7 +249,7 @@ class FieldCalculator:
             # Т.к. поле "Зависит от" указано, то сначала нужно посчитать его значение.
             depends_field_value = self(f"${field_obj.depends_field.full_title}")
             # Находим нужный build rule по посчитанному значению поля "Зависит от".
-            build_rule = field_obj.lookup_values.get(depends_field_value)
+            build_rule = get_lookup_build_rule(field_obj, depends_field_value)
             # Если build rule не нашли, а поле "Зависит от" является чекбоксом и оно
             # заполнено – пробуем найти build rule по значению 'on'.
             if (
@@ -140,7 +258,7 @@ class FieldCalculator:
                 and field_obj.depends_field.full_title.split("-")[0]
                 == CheckboxFormField.FIELD_TYPE
             ):
-                build_rule = field_obj.lookup_values.get("on")
+                build_rule = get_lookup_build_rule(field_obj, "on")
             # Если не нашли build rule – считаем значение по умолчанию.
             if build_rule is None:
                 value = self.calculate_build_rule(tuple(field_obj.default_value))
@@ -200,14 +318,14 @@ class FieldCalculator:
         return value
 
     def clean_url(self, value: str) -> str:
-        # Проверяем нужно ли принудительно менять протокол на https.
-        use_https_obj = find_field_in_pks_by_title_and_user(
-            self.utm_builder.form_data_pks,
-            user=self.utm_builder.user,
-            title="use_https",
-            model=CheckboxFormField,
+        return self.clean_url_value(
+            value, use_https=self.utm_builder.has_use_https_field()
         )
-        if use_https_obj:
+
+    @staticmethod
+    def clean_url_value(value: str, use_https: bool) -> str:
+        # Проверяем нужно ли принудительно менять протокол на https.
+        if use_https:
             value = "https://" + re.sub(r"http(s)?://", "", value)
         # Заменяем повторные символы "?" на "&".
         was_question_mark = False
@@ -238,9 +356,12 @@ class FieldCalculator:
 
 
 class UtmBuilder:
-    def __init__(self, user: User, post_data: QueryDict):
+    def __init__(
+        self, user: User, post_data: QueryDict | dict, plan: FormPlan | None = None
+    ):
         self.user = user
         self.post_data = post_data
+        self.plan = plan
         self.form_id: str | int = post_data.get("form_id")
         self.form_data: dict = post_data.get("form_data", {})
         self.form_data_pks: list[int] = []
@@ -249,7 +370,9 @@ class UtmBuilder:
         self.__raw_utm_data_obj: RawUtmData | None = None
         self.__result_blocks = {"results": []}
         self.__main_result_value: str | None = None
-        self.field_calculator = FieldCalculator(self)
+        self.field_calculator = FieldCalculator(
+            self, field_obj_proxy=plan.field_obj_proxy if plan else None
+        )
         self.result_blocks_factory = ResultBlockFactory()
 
     @property
@@ -277,11 +400,7 @@ class UtmBuilder:
         if not self.__form_obj:
             log.warning(f"Form pk={self.form_id} not found for user.pk={self.user.pk}")
             return {}
-        for pk in self.form_data:
-            try:
-                self.form_data_pks.append(int(pk))
-            except ValueError:
-                pass
+        self.set_form_data_pks()
         self.set_hashcode()
         self.save_raw_utm_data()
         with transaction.atomic():
@@ -289,25 +408,61 @@ class UtmBuilder:
             self.save_utm_result()
         return self.__result_blocks
 
+    def calculate(self) -> dict[str, [ResultBlock | list[ResultBlock]]]:
+        """Считает прометку без сохранения в БД (для массовой прометки)."""
+        self.set_form_obj()
+        self.set_form_data_pks()
+        self.set_hashcode()
+        self.calculate_result_blocks()
+        return self.__result_blocks
+
     def set_form_obj(self) -> None:
+        if self.plan:
+            self.__form_obj = self.plan.form_obj
+            return
         self.__form_obj = get_user_form_with_relations_by_pk(
             user=self.user, pk=self.form_id
         )
 
+    def set_form_data_pks(self) -> None:
+        for pk in self.form_data:
+            try:
+                self.form_data_pks.append(int(pk))
+            except ValueError:
+                pass
+
+    def has_use_https_field(self) -> bool:
+        if self.plan:
+            return not self.plan.use_https_pks.isdisjoint(self.form_data_pks)
+        return bool(
+            find_field_in_pks_by_title_and_user(
+                self.form_data_pks,
+                user=self.user,
+                title="use_https",
+                model=CheckboxFormField,
+            )
+        )
+
     def set_hashcode(self) -> None:
-        form_data = dict(sorted(deepcopy(self.form_data).items()))
-        hash_values = ["form_id", str(self.form_id), "user", str(self.user.pk)]
+        self.__hashcode = self.get_hashcode(self.form_id, self.user.pk, self.form_data)
+
+    @staticmethod
+    def get_hashcode(form_id: str | int, user_pk: int, form_data: dict) -> str:
+        form_data = dict(sorted(deepcopy(form_data).items()))
+        hash_values = ["form_id", str(form_id), "user", str(user_pk)]
         for k, v in form_data.items():
             hash_values.extend([str(k), str(v)])
-        self.__hashcode = get_hash("".join(hash_values))
+        return get_hash("".join(hash_values))
 
     def save_raw_utm_data(self) -> None:
         self.__raw_utm_data_obj, _ = RawUtmData.objects.get_or_create(
             utm_hashcode=self.__hashcode,
-            form=self.__form_obj,
-            data=self.form_data,
-            created_by=self.user,
-            updated_by=self.user,
+            defaults={
+                "form": self.__form_obj,
+                "created_by": self.user,
+                "updated_by": self.user,
+                "data": self.form_data,
+            },
         )
 
     def calculate_result_blocks(self) -> None:
@@ -349,8 +504,10 @@ class UtmBuilder:
                 raw_utm_data=self.__raw_utm_data_obj, created_by=self.user
             )
         utm_result.main_result_value = self.__main_result_value
-        utm_result.result_fields_data = [
-            asdict(rb) for rb in self.__result_blocks["results"]
-        ]
+        utm_result.set_result_blocks(
+            [asdict(rb) for rb in self.__result_blocks["results"]],
+            form=self.__form_obj,
+        )
         utm_result.updated_by = self.user
         utm_result.save()
+        utm_result.update_values()
@@ -0,0 +1,404 @@
+"""
+Массовая прометка без HTTP.
+
+Строки считаются в пуле процессов. Каждый процесс один раз загружает план формы
+(FormPlan) и дальше считает пачки строк без запросов к БД на каждую строку. Результаты
+пачки сохраняются несколькими bulk-запросами в одной транзакции.
+
+По умолчанию пачка считается по колонкам (ColumnarFieldCalculator): каждое поле
+считается один раз для всех строк пачки. Результат совпадает с построчным расчетом
+UtmBuilder/FieldCalculator, который остается доступен для сверки.
+"""
+import logging
+import re
+import urllib.parse
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+
+from django.db import transaction
+from django.utils import timezone
+from transliterate import translit
+
+from core.models import (
+    CheckboxFormField,
+    CombinedField,
+    Form,
+    FormField,
+    LookupTableField,
+    RawUtmData,
+    UtmResult,
+    UtmResultValue,
+)
+from core.models.common import User, ValueSettingsModel
+from core.models.form_constructor import BaseSelectFormFieldModel, ResultField
+from core.services.hashcode_cache import hashcode_cache
+from core.services.lookup_tables import get_lookup_build_rule
+from core.services.utm_builder import (
+    F,
+    FF,
+    FieldCalculator,
+    FormPlan,
+    ResultBlock,
+    UtmBuilder,
+    build_form_plan,
+)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkUtmResult:
+    hashcode: str
+    form_data: dict[str, str]
+    main_result_value: str
+    # Блоки результата (кроме основного) в виде словарей ResultBlock.
+    result_blocks: list[dict]
+
+
+# План формы и пользователь процесса пула, загружаются в init_worker.
+_plan: FormPlan | None = None
+_user: User | None = None
+
+
+def init_worker(form_pk: int, user_pk: int) -> None:
+    global _plan, _user
+    _user = User.objects.get(pk=user_pk)
+    _plan = build_form_plan(Form.objects.get(pk=form_pk), _user)
+
+
+def build_rows(
+    rows: list[dict[str, str]], save: bool = True, columnar: bool = True
+) -> list[BulkUtmResult]:
+    """Считает (и сохраняет) пачку строк в процессе пула."""
+    if columnar:
+        results = calculate_rows(_plan, _user, rows)
+    else:
+        results = [calculate_row(_plan, _user, form_data) for form_data in rows]
+        FieldCalculator.cache_clear()
+    if save:
+        save_results(_plan.form_obj, _user, results)
+    return results
+
+
+def calculate_row(
+    plan: FormPlan, user: User, form_data: dict[str, str]
+) -> BulkUtmResult:
+    utm_builder = UtmBuilder(
+        user=user,
+        post_data={"form_id": plan.form_obj.pk, "form_data": form_data},
+        plan=plan,
+    )
+    result_blocks = utm_builder.calculate()
+    return BulkUtmResult(
+        hashcode=utm_builder.hashcode,
+        form_data=form_data,
+        main_result_value=utm_builder.main_result_value or "",
+        result_blocks=[asdict(rb) for rb in result_blocks["results"]],
+    )
+
+
+def calculate_rows(
+    plan: FormPlan,
+    user: User,
+    rows: list[dict[str, str]],
+    shared_values: dict[str, str] | None = None,
+    hashcodes: list[str] | None = None,
+) -> list[BulkUtmResult]:
+    """
+    Считает пачку строк по колонкам, результат совпадает с calculate_row.
+    :param shared_values: Значения полей, одинаковые для всех строк (по full_title с '$')
+    :param hashcodes: Уникальные коды уже сохраненных прометок строк
+    """
+    form_obj = plan.form_obj
+    if hashcodes is None:
+        hashcodes = [
+            UtmBuilder.get_hashcode(form_obj.pk, user.pk, form_data)
+            for form_data in rows
+        ]
+    calculator = ColumnarFieldCalculator(plan, rows, hashcodes, shared_values)
+    main_column = calculator(f"${form_obj.main_result_field.full_title}")
+    if form_obj.main_result_is_url:
+        main_column = [
+            (
+                FieldCalculator.clean_url_value(
+                    value,
+                    use_https=not plan.use_https_pks.isdisjoint(
+                        _get_form_data_pks(form_data)
+                    ),
+                )
+                if value
+                else ""
+            )
+            for value, form_data in zip(main_column, rows)
+        ]
+    result_columns = []
+    for result_field in form_obj.result_fields.all():
+        full_title = f"${result_field.full_title}"
+        if field_obj := plan.field_obj_proxy.get(full_title):
+            block = asdict(
+                ResultBlock(
+                    title=f"result-block-{field_obj.pk}",
+                    label=field_obj.label,
+                    value="",
+                )
+            )
+            result_columns.append((block, calculator(full_title)))
+    results = []
+    for i, form_data in enumerate(rows):
+        result_blocks = {}
+        for block, column in result_columns:
+            if column[i] and block["title"] not in result_blocks:
+                result_blocks[block["title"]] = {**block, "value": column[i]}
+        results.append(
+            BulkUtmResult(
+                hashcode=hashcodes[i],
+                form_data=form_data,
+                main_result_value=main_column[i],
+                result_blocks=list(result_blocks.values()),
+            )
+        )
+    return results
+
+
+class ColumnarFieldCalculator:
+    """
+    Считает значения полей сразу для пачки строк: значение поля – колонка (список
+    значений по строкам). Тип поля, настройки очистки значения и правила Lookup-полей
+    определяются один раз на колонку или на уникальное значение поля "Зависит от",
+    а не для каждой строки, как в FieldCalculator.
+    """
+
+    URL_SPECIAL_SYMBOLS_REGEX = re.compile(
+        "|".join(["\\" + i for i in FieldCalculator.URL_SPECIAL_SYMBOLS])
+    )
+
+    def __init__(
+        self,
+        plan: FormPlan,
+        rows: list[dict[str, str]],
+        hashcodes: list[str],
+        shared_values: dict[str, str] | None = None,
+    ):
+        self.field_obj_proxy = plan.field_obj_proxy
+        self.rows = rows
+        self.hashcodes = hashcodes
+        self.shared_values = shared_values or {}
+        self._columns: dict[str, list[str]] = {}
+
+    def __call__(self, full_title: str) -> list[str]:
+        if not full_title:
+            return [""] * len(self.rows)
+        if (column := self._columns.get(full_title)) is not None:
+            return column
+        if (value := self.shared_values.get(full_title)) is not None:
+            column = [value] * len(self.rows)
+        elif not (field_obj := self.field_obj_proxy.get(full_title)):
+            log.error(f"Field not found by full_title={full_title}")
+            column = [""] * len(self.rows)
+        elif issubclass(field_obj.__class__, FormField):
+            column = self.calculate_simple_field(field_obj)
+        elif isinstance(field_obj, CombinedField):
+            column = self.calculate_combined_field(field_obj)
+        elif isinstance(field_obj, LookupTableField):
+            column = self.calculate_lookup_field(field_obj)
+        else:
+            raise Exception(
+                f"Failed to calculate field value full_title={full_title}: unknown"
+                f" field type {type(field_obj)}"
+            )
+        self._columns[full_title] = column
+        return column
+
+    def calculate_simple_field(self, field_obj: FF) -> list[str]:
+        pk = str(field_obj.pk)
+        values = [form_data.get(pk) for form_data in self.rows]
+        # Если поле чекбокс, то вместо значения "on" нужно отдавать title этого поля.
+        if isinstance(field_obj, CheckboxFormField):
+            return [field_obj.title if value else "" for value in values]
+        # Проверяем, использовался ли ручной ввод для полей radio button и select.
+        if issubclass(field_obj.__class__, BaseSelectFormFieldModel):
+            custom_value_pk = field_obj.custom_value_pk
+            values = [
+                (
+                    form_data.get(custom_value_pk, "")
+                    if value == field_obj.CHOICES_CUSTOM_INPUT_VALUE
+                    else value
+                )
+                for value, form_data in zip(values, self.rows)
+            ]
+        return self.clean_column(values, field_obj)
+
+    def calculate_combined_field(self, field_obj: CombinedField) -> list[str]:
+        columns = self.calculate_build_rule(tuple(field_obj.build_rule))
+        values = list(zip(*columns)) if columns else [()] * len(self.rows)
+        return self.clean_column(self.join_column(values, field_obj), field_obj)
+
+    def calculate_lookup_field(self, field_obj: LookupTableField) -> list[str]:
+        # Строки группируются по правилу генерации результата, и каждое правило
+        # считается один раз для своей группы строк.
+        groups: dict[tuple[str, ...], list[int] | range] = defaultdict(list)
+        if not field_obj.depends_field:
+            groups[tuple(field_obj.default_value)] = range(len(self.rows))
+        else:
+            depends_column = self(f"${field_obj.depends_field.full_title}")
+            is_checkbox = (
+                field_obj.depends_field.full_title.split("-")[0]
+                == CheckboxFormField.FIELD_TYPE
+            )
+            build_rules = {}
+            for i, depends_field_value in enumerate(depends_column):
+                if (build_rule := build_rules.get(depends_field_value)) is None:
+                    build_rule = get_lookup_build_rule(field_obj, depends_field_value)
+                    if build_rule is None and depends_field_value and is_checkbox:
+                        build_rule = get_lookup_build_rule(field_obj, "on")
+                    if build_rule is None:
+                        build_rule = field_obj.default_value
+                    build_rule = build_rules[depends_field_value] = tuple(build_rule)
+                groups[build_rule].append(i)
+        values: list[tuple[str, ...]] = [()] * len(self.rows)
+        for build_rule, indexes in groups.items():
+            columns = self.calculate_build_rule(build_rule)
+            for i in indexes:
+                values[i] = tuple(column[i] for column in columns)
+        return self.clean_column(self.join_column(values, field_obj), field_obj)
+
+    def calculate_build_rule(self, build_rule: tuple[str, ...]) -> list[list[str]]:
+        columns = []
+        for elem in build_rule:
+            # Константу никак не обрабатываем.
+            if not elem.startswith("$"):
+                columns.append([elem.strip()] * len(self.rows))
+                continue
+            columns.append(self(elem))
+        return columns
+
+    def clean_column(self, values: list[str | None], field_obj: F) -> list[str]:
+        lowercase = (
+            hasattr(field_obj, "disable_lowercase") and not field_obj.disable_lowercase
+        )
+        remove_url_symbols = hasattr(field_obj, "clean_value") and field_obj.clean_value
+        chars_settings = getattr(field_obj, "chars_settings", None)
+        add_hash = hasattr(field_obj, "add_hash") and field_obj.add_hash
+        # Очистка зависит только от значения, поэтому повторы считаются один раз.
+        cleaned_values = {}
+        column = []
+        for value, hashcode in zip(values, self.hashcodes):
+            if not value:
+                column.append("")
+                continue
+            if (cleaned_value := cleaned_values.get(value)) is None:
+                cleaned_value = value.strip()
+                if lowercase:
+                    cleaned_value = cleaned_value.lower()
+                if remove_url_symbols:
+                    cleaned_value = self.URL_SPECIAL_SYMBOLS_REGEX.sub(
+                        "", cleaned_value
+                    )
+                match chars_settings:
+                    case ValueSettingsModel.CharsSettings.TRANSLITERATE:
+                        cleaned_value = translit(
+                            cleaned_value.replace(" ", "_"), "ru", reversed=True
+                        )
+                    case ValueSettingsModel.CharsSettings.URLENCODE:
+                        cleaned_value = urllib.parse.quote_plus(cleaned_value)
+                cleaned_values[value] = cleaned_value
+            if add_hash and hashcode:
+                cleaned_value += field_obj.hash_separator + hashcode
+            column.append(cleaned_value)
+        return column
+
+    @staticmethod
+    def join_column(values: list[tuple[str, ...]], field_obj: ResultField) -> list[str]:
+        separator = field_obj.separator
+        # Удаляем пустые значения и собираем значение через разделитель.
+        if field_obj.remove_blank_values:
+            return [separator.join([v for v in value if v]) for value in values]
+        return [separator.join(value) for value in values]
+
+
+def _get_form_data_pks(form_data: dict[str, str]) -> list[int]:
+    pks = []
+    for pk in form_data:
+        try:
+            pks.append(int(pk))
+        except ValueError:
+            pass
+    return pks
+
+
+def save_results(form_obj: Form, user: User, results: list[BulkUtmResult]) -> None:
+    """Сохраняет прометки так же, как UtmBuilder, но пачкой."""
+    # Одинаковые строки дают один и тот же код – сохраняем их один раз.
+    results = list({result.hashcode: result for result in results}.values())
+    now = timezone.now()
+    with transaction.atomic():
+        raw_utm_data_objs = _save_raw_utm_data(form_obj, user, results)
+        utm_results = []
+        for result in results:
+            utm_result = UtmResult(
+                raw_utm_data=raw_utm_data_objs[result.hashcode],
+                main_result_value=result.main_result_value,
+                created_by=user,
+                updated_by=user,
+                created_at=now,
+                updated_at=now,
+            )
+            utm_result.set_result_blocks(result.result_blocks, form=form_obj)
+            utm_results.append(utm_result)
+        UtmResult.objects.bulk_create(
+            utm_results,
+            update_conflicts=True,
+            unique_fields=["raw_utm_data"],
+            update_fields=[
+                "main_result_value",
+                "result_fields_data",
+                "schema",
+                "result_values",
+                "updated_by",
+                "updated_at",
+            ],
+        )
+        # При конфликте PK не возвращаются, поэтому получаем их отдельным запросом.
+        result_pks = dict(
+            UtmResult.objects.filter(
+                raw_utm_data__in=[obj.pk for obj in raw_utm_data_objs.values()]
+            ).values_list("raw_utm_data_id", "pk")
+        )
+        values = []
+        for utm_result in utm_results:
+            utm_result.pk = result_pks[utm_result.raw_utm_data_id]
+            values.extend(utm_result.build_values())
+        UtmResultValue.objects.filter(result__in=result_pks.values()).delete()
+        UtmResultValue.objects.bulk_create(values)
+
+
+def _save_raw_utm_data(
+    form_obj: Form, user: User, results: list[BulkUtmResult]
+) -> dict[str, RawUtmData]:
+    hashcodes = [result.hashcode for result in results]
+    raw_utm_data_objs = RawUtmData.objects.only("pk", "utm_hashcode").in_bulk(
+        hashcodes, field_name="utm_hashcode"
+    )
+    if not (new := [r for r in results if r.hashcode not in raw_utm_data_objs]):
+        return raw_utm_data_objs
+    RawUtmData.objects.bulk_create(
+        [
+            RawUtmData(
+                utm_hashcode=result.hashcode,
+                form=form_obj,
+                created_by=user,
+                updated_by=user,
+                data=result.form_data,
+            )
+            for result in new
+        ],
+        # Ту же прометку мог одновременно сохранить другой процесс.
+        ignore_conflicts=True,
+    )
+    # Новые прометки загружаются целиком для кэша уникальных кодов: bulk_create не
+    # отправляет post_save, по которому прометка попадает в кэш (core/signals.py).
+    new_objs = RawUtmData.objects.in_bulk(
+        [result.hashcode for result in new], field_name="utm_hashcode"
+    )
+    transaction.on_commit(lambda: hashcode_cache.set_many(new_objs))
+    return {**raw_utm_data_objs, **new_objs}
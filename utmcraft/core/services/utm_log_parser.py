@@ -0,0 +1,114 @@
+"""
+Разбор логов посадочных страниц с промеченными ссылками.
+
+Лог читается построчно: из каждой строки извлекаются ссылки, их UTM-метки и
+уникальные коды, добавленные полями с включенной опцией "добавить уникальный код
+ссылки". Коды разрешаются в прометки пачками по chunk_size, поэтому потребление
+памяти не зависит от размера лога.
+"""
+import re
+import urllib.parse
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from core.selectors import (
+    get_form_titles_by_pks,
+    get_hash_separators,
+    get_raw_utm_data_by_hashcodes,
+    get_usernames_by_pks,
+)
+
+# Абсолютные ссылки и пути запросов (как в access-логах nginx) с query-строкой.
+URL_REGEX = re.compile(r"(?:https?://|/)[^\s\"'<>]*\?[^\s\"'<>]+")
+UTM_PARAM_PREFIX = "utm_"
+HASHCODE_PATTERN = r"([a-z0-9+/=]{8})(?![a-z0-9+/=])"
+
+
+@dataclass
+class UtmLogMatch:
+    line_number: int
+    url: str
+    utm_params: dict[str, str]
+    hashcode: str
+
+
+class UtmLogParser:
+    def __init__(self, separators: Iterable[str] | None = None, chunk_size: int = 1000):
+        if separators is None:
+            separators = get_hash_separators()
+        self.chunk_size = chunk_size
+        self._hashcode_regex: re.Pattern | None = None
+        # Длинные разделители первыми, чтобы "~~" не распознавался как "~".
+        separators = sorted(set(separators), key=len, reverse=True)
+        if separators:
+            self._hashcode_regex = re.compile(
+                "(?:"
+                + "|".join(re.escape(s) for s in separators)
+                + ")"
+                + HASHCODE_PATTERN
+            )
+
+    def parse(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Возвращает по одной записи на каждый найденный в логе уникальный код."""
+        chunk = []
+        for match in self.find_matches(lines):
+            chunk.append(match)
+            if len(chunk) >= self.chunk_size:
+                yield from self._resolve_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._resolve_chunk(chunk)
+
+    def find_matches(self, lines: Iterable[str]) -> Iterator[UtmLogMatch]:
+        if not self._hashcode_regex:
+            return
+        for line_number, line in enumerate(lines, start=1):
+            for url in URL_REGEX.findall(line):
+                yield from self._find_url_matches(line_number, url)
+
+    def _find_url_matches(self, line_number: int, url: str) -> Iterator[UtmLogMatch]:
+        query = urllib.parse.urlsplit(url).query
+        utm_params = {
+            k: v
+            for k, v in urllib.parse.parse_qsl(query, keep_blank_values=True)
+            if k.startswith(UTM_PARAM_PREFIX)
+        }
+        # Код может оказаться в любой части ссылки, а не только в UTM-метках.
+        hashcodes = dict.fromkeys(
+            self._hashcode_regex.findall(urllib.parse.unquote_plus(url))
+        )
+        for hashcode in hashcodes:
+            yield UtmLogMatch(
+                line_number=line_number,
+                url=url,
+                utm_params=utm_params,
+                hashcode=hashcode,
+            )
+
+    @staticmethod
+    def _resolve_chunk(chunk: list[UtmLogMatch]) -> Iterator[dict]:
+        raw_utm_data_objs = get_raw_utm_data_by_hashcodes(
+            match.hashcode for match in chunk
+        )
+        form_titles = get_form_titles_by_pks(
+            {raw_utm_data.form_id for raw_utm_data in raw_utm_data_objs.values()}
+        )
+        usernames = get_usernames_by_pks(
+            {raw_utm_data.created_by_id for raw_utm_data in raw_utm_data_objs.values()}
+        )
+        for match in chunk:
+            raw_utm_data = raw_utm_data_objs.get(match.hashcode)
+            yield {
+                "line": match.line_number,
+                "url": match.url,
+                "utm_params": match.utm_params,
+                "hashcode": match.hashcode,
+                "found": raw_utm_data is not None,
+                "form_id": raw_utm_data.form_id if raw_utm_data else None,
+                "form": form_titles.get(raw_utm_data.form_id) if raw_utm_data else None,
+                "user_id": raw_utm_data.created_by_id if raw_utm_data else None,
+                "user": (
+                    usernames.get(raw_utm_data.created_by_id) if raw_utm_data else None
+                ),
+                "form_data": raw_utm_data.form_data if raw_utm_data else None,
+            }
@@ -0,0 +1,75 @@
+"""
+Матрица прометок: все комбинации нескольких значений выбранных полей формы.
+
+Комбинации перебираются генератором и считаются пачками по колонкам, поэтому матрица
+целиком в памяти не хранится. Значения полей, которые не зависят от варьируемых полей
+и уникального кода ссылки, считаются один раз на всю матрицу. Каждая пачка сохраняется
+bulk-запросами так же, как при массовой прометке.
+"""
+import itertools
+import math
+from typing import Iterator
+
+from core.models import Form
+from core.models.common import User
+from core.services.utm_builder import HASH_DEPENDENCY, FormPlan, build_form_plan
+from core.services.utm_bulk_builder import (
+    BulkUtmResult,
+    ColumnarFieldCalculator,
+    calculate_rows,
+    save_results,
+)
+
+
+class UtmMatrixBuilder:
+    def __init__(
+        self,
+        user: User,
+        form_obj: Form,
+        form_data: dict[str, str],
+        matrix: dict[str, list[str]],
+        chunk_size: int = 500,
+    ):
+        """
+        :param form_data: Данные формы, общие для всех комбинаций
+        :param matrix: Значения варьируемых полей по их PK
+        """
+        self.user = user
+        self.form_obj = form_obj
+        self.form_data = form_data
+        self.matrix = matrix
+        self.chunk_size = chunk_size
+
+    @property
+    def size(self) -> int:
+        return math.prod(len(values) for values in self.matrix.values())
+
+    def combinations(self) -> Iterator[dict[str, str]]:
+        pks = list(self.matrix)
+        for values in itertools.product(*self.matrix.values()):
+            yield {**self.form_data, **dict(zip(pks, values))}
+
+    def __iter__(self) -> Iterator[BulkUtmResult]:
+        plan = build_form_plan(self.form_obj, self.user)
+        combinations = self.combinations()
+        shared_values = None
+        while chunk := list(itertools.islice(combinations, self.chunk_size)):
+            if shared_values is None:
+                shared_values = self._get_shared_values(plan, chunk[0])
+            results = calculate_rows(plan, self.user, chunk, shared_values)
+            save_results(plan.form_obj, self.user, results)
+            yield from results
+
+    def _get_shared_values(
+        self, plan: FormPlan, form_data: dict[str, str]
+    ) -> dict[str, str]:
+        """Значения полей, одинаковые во всех комбинациях матрицы."""
+        varying = {int(pk) for pk in self.matrix} | {HASH_DEPENDENCY}
+        full_titles = [
+            f"${full_title}"
+            for full_title in plan.full_titles
+            if plan.get_dependencies(full_title).isdisjoint(varying)
+        ]
+        # Уникальный код не нужен: поля, зависящие от него, в общие не попадают.
+        calculator = ColumnarFieldCalculator(plan, [form_data], hashcodes=[""])
+        return {full_title: calculator(full_title)[0] for full_title in full_titles}
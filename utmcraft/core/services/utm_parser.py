@@ -1,11 +1,25 @@
+from typing import Iterable, Iterator
+
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 
+from authorization.selectors import USER_ACCESS_ATTR, get_user_access
+from core.async_utils import run_in_db_thread
 from core.models import RawUtmData
-from core.selectors import get_raw_utm_data_by_hashcode
+from core.selectors import (
+    get_raw_utm_data_by_hashcode,
+    get_raw_utm_data_by_hashcodes,
+    get_user_form_pks_in,
+)
+from core.services.hashcode_cache import MISSING, hashcode_cache
 
 
 class UtmParser:
+    STATUS_OK = "ok"
+    STATUS_INVALID = "invalid"
+    STATUS_NOT_FOUND = "not_found"
+    STATUS_NO_ACCESS = "no_access"
+
     def __init__(self, user: User):
         self.user = user
         self.raw_utm_data: RawUtmData | None = None
@@ -14,6 +28,64 @@ class UtmParser:
         if not utm_hashcode:
             return self._get_error_result(_("Уникальный код обязателен."))
         self.raw_utm_data = get_raw_utm_data_by_hashcode(utm_hashcode)
+        return self._get_parse_result()
+
+    async def acall(self, utm_hashcode: str) -> dict[str, str | None]:
+        """
+        __call__ для async-представлений. Прометка ищется в кэше через асинхронный
+        API кэша, запросы к БД (промах кэша, загрузка доступов пользователя)
+        выполняются синхронным разбором в пуле потоков БД.
+        """
+        if not utm_hashcode:
+            return self._get_error_result(_("Уникальный код обязателен."))
+        cached = await hashcode_cache.aget_many([utm_hashcode])
+        raw_utm_data = cached.get(utm_hashcode, MISSING)
+        if raw_utm_data is MISSING or not hasattr(self.user, USER_ACCESS_ATTR):
+            return await run_in_db_thread(self, utm_hashcode)
+        self.raw_utm_data = raw_utm_data
+        return self._get_parse_result()
+
+    def parse_many(
+        self, utm_hashcodes: Iterable[str]
+    ) -> Iterator[dict[str, str | None]]:
+        """Разбирает сразу несколько уникальных кодов: один запрос за прометками и
+        один запрос за проверкой доступа к формам. Результаты отдаются в порядке
+        переданных кодов."""
+        utm_hashcodes = list(utm_hashcodes)
+        raw_utm_data_objs = get_raw_utm_data_by_hashcodes(
+            utm_hashcode for utm_hashcode in utm_hashcodes if utm_hashcode
+        )
+        available_form_pks = get_user_form_pks_in(
+            self.user,
+            {
+                raw_utm_data.form_id
+                for raw_utm_data in raw_utm_data_objs.values()
+                if raw_utm_data.form_id
+            },
+        )
+        for utm_hashcode in utm_hashcodes:
+            if not utm_hashcode:
+                result = self._get_error_result(
+                    _("Уникальный код обязателен."), status=self.STATUS_INVALID
+                )
+            elif not (raw_utm_data := raw_utm_data_objs.get(utm_hashcode)):
+                result = self._get_error_result(
+                    _("Промеченная ссылка с таким уникальным кодом не найдена."),
+                    status=self.STATUS_NOT_FOUND,
+                )
+            elif raw_utm_data.form_id not in available_form_pks:
+                result = self._get_error_result(
+                    _(
+                        "Нет доступа к UTM-прометчику, с помощью которого была создана"
+                        " промеченная ссылка с таким уникальным кодом."
+                    ),
+                    status=self.STATUS_NO_ACCESS,
+                )
+            else:
+                result = self._get_result(raw_utm_data, status=self.STATUS_OK)
+            yield {"utm_hashcode": utm_hashcode, **result}
+
+    def _get_parse_result(self) -> dict[str, str | None]:
         if not self.raw_utm_data:
             return self._get_error_result(
                 _("Промеченная ссылка с таким уникальным кодом не найдена.")
@@ -25,15 +97,29 @@ class UtmParser:
                     " промеченная ссылка с таким уникальным кодом."
                 )
             )
-        return {
-            "form_id": self.raw_utm_data.form.pk,
-            "form_data": self.raw_utm_data.data,
+        return self._get_result(self.raw_utm_data)
+
+    @staticmethod
+    def _get_result(
+        raw_utm_data: RawUtmData, status: str | None = None
+    ) -> dict[str, str | None]:
+        result = {
+            "form_id": raw_utm_data.form_id,
+            "form_data": raw_utm_data.data,
             "error": None,
         }
+        if status:
+            result["status"] = status
+        return result
 
     @staticmethod
-    def _get_error_result(error_text: str) -> dict[str, str | None]:
-        return {"form_id": None, "form_data": None, "error": error_text}
+    def _get_error_result(
+        error_text: str, status: str | None = None
+    ) -> dict[str, str | None]:
+        result = {"form_id": None, "form_data": None, "error": error_text}
+        if status:
+            result["status"] = status
+        return result
 
     def _validate_user_permissions(self) -> bool:
-        return self.user.profile.forms.filter(pk=self.raw_utm_data.form.pk).exists()
+        return get_user_access(self.user).has_form(self.raw_utm_data.form_id)
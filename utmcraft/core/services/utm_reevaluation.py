@@ -0,0 +1,160 @@
+"""
+Пересчет сохраненных прометок после изменения конструктора.
+
+Когда исправляют правило генерации результата комбинированного поля или значения
+Lookup-поля, уже сохраненные прометки остаются со старыми значениями. Пересчет
+находит формы, поля результата которых зависят от измененных полей, и считает их
+прометки заново пачками в пуле процессов тем же расчетом по колонкам, что и массовая
+прометка. Уникальный код и данные отправленной формы не меняются, обновляются только
+прометки, у которых изменился основной результат или поля результата.
+"""
+import dataclasses
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import CheckboxFormField, Form, RawUtmData, UtmResult, UtmResultValue
+from core.services.utm_builder import FormPlan, build_form_plan
+from core.services.utm_bulk_builder import BulkUtmResult, calculate_rows
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class UtmResultChange:
+    hashcode: str
+    # Ярлык поля результата ("" – основной результат) -> (старое, новое значение).
+    values: dict[str, tuple[str, str]]
+
+
+@dataclass
+class ReevaluationChunkResult:
+    # PK последней RawUtmData пачки, до него включительно пачка обработана.
+    last_pk: int
+    processed: int = 0
+    changed: int = 0
+    # Прометки без UtmResult пересчитать нельзя, их только считаем.
+    missing: int = 0
+    changes: list[UtmResultChange] = field(default_factory=list)
+
+
+def get_affected_forms(
+    full_titles: list[str], form_pks: list[int] | None = None
+) -> list[Form]:
+    """
+    Формы, основной результат или поля результата которых зависят от полей с
+    указанными полными названиями.
+    """
+    full_titles = {full_title.removeprefix("$").strip() for full_title in full_titles}
+    forms = Form.objects.select_related("user").order_by("pk")
+    if form_pks:
+        forms = forms.filter(pk__in=form_pks)
+    return [
+        form_obj
+        for form_obj in forms
+        if not full_titles.isdisjoint(
+            build_form_plan(form_obj, form_obj.user).full_titles
+        )
+    ]
+
+
+# План формы процесса пула и PK чекбоксов 'use_https' по авторам прометок.
+_plan: FormPlan | None = None
+_use_https_pks: dict[int | None, frozenset[int]] = {}
+
+
+def init_worker(form_pk: int) -> None:
+    global _plan
+    form_obj = Form.objects.select_related("user").get(pk=form_pk)
+    _plan = build_form_plan(form_obj, form_obj.user)
+    _use_https_pks.clear()
+
+
+def reevaluate_chunk(pks: list[int], dry_run: bool = False) -> ReevaluationChunkResult:
+    """Пересчитывает пачку прометок формы в процессе пула."""
+    raw_utm_data_objs = list(
+        RawUtmData.objects.filter(pk__in=pks).select_related("utmresult").order_by("pk")
+    )
+    chunk_result = ReevaluationChunkResult(last_pk=max(pks), processed=len(pks))
+    # Ссылка с принудительным https зависит от чекбоксов автора прометки.
+    by_user = defaultdict(list)
+    for raw_utm_data in raw_utm_data_objs:
+        if not hasattr(raw_utm_data, "utmresult"):
+            chunk_result.missing += 1
+            continue
+        by_user[raw_utm_data.created_by_id].append(raw_utm_data)
+    changed = []
+    for user_pk, user_raw_utm_data_objs in by_user.items():
+        plan = dataclasses.replace(_plan, use_https_pks=_get_use_https_pks(user_pk))
+        results = calculate_rows(
+            plan,
+            user=_plan.form_obj.user,
+            rows=[raw_utm_data.data for raw_utm_data in user_raw_utm_data_objs],
+            hashcodes=[obj.utm_hashcode for obj in user_raw_utm_data_objs],
+        )
+        for raw_utm_data, result in zip(user_raw_utm_data_objs, results):
+            utm_result = raw_utm_data.utmresult
+            if change := get_change(utm_result, result):
+                chunk_result.changes.append(change)
+                changed.append((utm_result, result))
+    chunk_result.changed = len(changed)
+    if changed and not dry_run:
+        save_changes(_plan.form_obj, changed)
+    return chunk_result
+
+
+def _get_use_https_pks(user_pk: int | None) -> frozenset[int]:
+    if user_pk not in _use_https_pks:
+        _use_https_pks[user_pk] = frozenset(
+            CheckboxFormField.objects.filter(
+                title="use_https", user_id=user_pk
+            ).values_list("pk", flat=True)
+        )
+    return _use_https_pks[user_pk]
+
+
+def get_change(utm_result: UtmResult, result: BulkUtmResult) -> UtmResultChange | None:
+    values = {}
+    if utm_result.main_result_value != result.main_result_value:
+        values[""] = (utm_result.main_result_value, result.main_result_value)
+    old_blocks = {rb["title"]: rb for rb in utm_result.result_blocks}
+    new_blocks = {rb["title"]: rb for rb in result.result_blocks}
+    for title in old_blocks.keys() | new_blocks.keys():
+        old_block = old_blocks.get(title, {})
+        new_block = new_blocks.get(title, {})
+        if old_block != new_block:
+            label = new_block.get("label") or old_block.get("label")
+            values[label] = (old_block.get("value", ""), new_block.get("value", ""))
+    if values:
+        return UtmResultChange(hashcode=result.hashcode, values=values)
+
+
+def save_changes(
+    form_obj: Form, changed: list[tuple[UtmResult, BulkUtmResult]]
+) -> None:
+    """Обновляет только изменившиеся прометки и их значения в UtmResultValue."""
+    now = timezone.now()
+    utm_results = []
+    for utm_result, result in changed:
+        utm_result.main_result_value = result.main_result_value
+        utm_result.set_result_blocks(result.result_blocks, form=form_obj)
+        utm_result.updated_at = now
+        utm_results.append(utm_result)
+    with transaction.atomic():
+        UtmResult.objects.bulk_update(
+            utm_results,
+            fields=[
+                "main_result_value",
+                "result_fields_data",
+                "schema",
+                "result_values",
+                "updated_at",
+            ],
+        )
+        UtmResultValue.objects.filter(result__in=utm_results).delete()
+        UtmResultValue.objects.bulk_create(
+            [value for utm_result in utm_results for value in utm_result.build_values()]
+        )
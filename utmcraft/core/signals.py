@@ -0,0 +1,11 @@
+from django.db import transaction
+
+from core.services.hashcode_cache import hashcode_cache
+
+
+def cache_raw_utm_data(sender, instance, created, **kwargs):  # noqa
+    # Новая прометка сразу попадает в общий кэш и перекрывает отрицательную запись.
+    if created:
+        transaction.on_commit(
+            lambda: hashcode_cache.set(instance.utm_hashcode, instance)
+        )
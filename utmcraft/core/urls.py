@@ -1,21 +1,45 @@
+from django.conf import settings
 from django.urls import path
 
 from core.views.api import (
     FormHTMLAPIView,
     ResultBlocksHTMLAPIView,
+    UTMBatchParserAPIView,
+    UTMMatrixBuilderAPIView,
     UTMParserAPIView,
 )
+from core.views.async_api import (
+    FormHTMLAsyncView,
+    ResultBlocksHTMLAsyncView,
+    UTMParserAsyncView,
+)
 from core.views.ui import MainPageView
 
 app_name = "core"
 
+# Под ASGI прометка, HTML формы и парсер обслуживаются async-представлениями.
+if settings.ASYNC_VIEWS_ENABLED:
+    form_html_view = FormHTMLAsyncView.as_view()
+    result_blocks_html_view = ResultBlocksHTMLAsyncView.as_view()
+    parser_view = UTMParserAsyncView.as_view()
+else:
+    form_html_view = FormHTMLAPIView.as_view()
+    result_blocks_html_view = ResultBlocksHTMLAPIView.as_view()
+    parser_view = UTMParserAPIView.as_view()
+
 urlpatterns = [
     path("", MainPageView.as_view(), name="main_page"),
-    path("core/api/form_html", FormHTMLAPIView.as_view(), name="api_form_html"),
+    path("core/api/form_html", form_html_view, name="api_form_html"),
     path(
         "core/api/result_blocks_html",
-        ResultBlocksHTMLAPIView.as_view(),
+        result_blocks_html_view,
         name="api_result_blocks_html",
     ),
-    path("core/api/parser", UTMParserAPIView.as_view(), name="api_parser"),
+    path("core/api/parser", parser_view, name="api_parser"),
+    path(
+        "core/api/parser/batch",
+        UTMBatchParserAPIView.as_view(),
+        name="api_parser_batch",
+    ),
+    path("core/api/matrix", UTMMatrixBuilderAPIView.as_view(), name="api_matrix"),
 ]
@@ -1,10 +1,12 @@
 import base64
 import hashlib
 import logging
+import time
+from contextlib import contextmanager
 from functools import wraps
-from typing import Iterable, Type
+from typing import Iterable, Iterator, Type
 
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Model, Q
 from django.urls import reverse
 from django.utils.html import format_html
@@ -12,6 +14,7 @@ from rest_framework.exceptions import APIException
 from rest_framework.status import HTTP_422_UNPROCESSABLE_ENTITY
 
 log = logging.getLogger(__name__)
+events_log = logging.getLogger("events.utm_build")
 
 
 def get_hash(text: str) -> str:
@@ -101,3 +104,40 @@ def log_exception(func):
 class UnprocessableEntityAPIException(APIException):
     status_code = HTTP_422_UNPROCESSABLE_ENTITY
     default_code = "unprocessable_entity"
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def log_build_event(user, form_id, form_data) -> Iterator[dict]:
+    """
+    Записывает JSON-событие прометки в логгер events: форма, количество полей, время
+    и количество SQL-запросов. Статус прометки устанавливается в event["status"],
+    при исключении остается "error".
+    """
+    event = {
+        "event": "utm_build",
+        "user_id": user.pk,
+        "form_id": form_id,
+        "field_count": len(form_data) if isinstance(form_data, dict) else 0,
+        "status": "error",
+    }
+    if not events_log.isEnabledFor(logging.INFO):
+        yield event
+        return
+    query_counter = _QueryCounter()
+    started_at = time.perf_counter()
+    try:
+        with connection.execute_wrapper(query_counter):
+            yield event
+    finally:
+        event["duration_ms"] = round((time.perf_counter() - started_at) * 1000, 2)
+        event["query_count"] = query_counter.count
+        events_log.info("utm_build", extra={"event": event})
@@ -1,28 +1,108 @@
+import csv
+import itertools
+import json
 import logging
+from typing import Any, Iterator
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.utils.datastructures import MultiValueDictKeyError
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema, inline_serializer
 from rest_framework import serializers
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.renderers import TemplateHTMLRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from core.selectors import get_user_form_by_pk
+from core.async_utils import iterate_in_request_thread
+from core.models import Form
+from core.selectors import (
+    get_form_ui_fields,
+    get_user_form_by_pk,
+    get_user_form_with_relations_by_pk,
+)
 from core.services.form_constructor import FormFactory
 from core.services.utm_builder import UtmBuilder
+from core.services.utm_bulk_builder import BulkUtmResult
+from core.services.utm_matrix_builder import UtmMatrixBuilder
 from core.services.utm_parser import UtmParser
+from core.utils import log_build_event
+
+User = get_user_model()
 
 log = logging.getLogger(__name__)
 
+FORM_HTML_TEMPLATE = "includes/core/form_block.html"
+FORM_NOT_FOUND_TEMPLATE = "includes/core/form_not_found.html"
+RESULT_BLOCKS_HTML_TEMPLATE = "includes/core/result_area.html"
+UTM_BUILD_FAILED_TEMPLATE = "includes/core/utm_build_failed.html"
+# Последняя строка CSV матрицы прометок, если расчет оборвался с ошибкой.
+UTM_MATRIX_CSV_ERROR_MARKER = (
+    "#error: UTM matrix build failed, the result is incomplete"
+)
+
+
+def get_streaming_response(
+    request, streaming_content: Iterator[str], **kwargs
+) -> StreamingHttpResponse:
+    """Потоковый ответ, который и под ASGI отдается частями, а не собирается в памяти."""
+    if isinstance(request._request, ASGIRequest):
+        streaming_content = iterate_in_request_thread(streaming_content)
+    return StreamingHttpResponse(streaming_content, **kwargs)
+
+
+def get_form_html_data(user: User, form_id: int) -> tuple[str, dict | None]:
+    """Шаблон и данные HTML формы прометчика (общие для sync и async представлений)."""
+    form = get_user_form_by_pk(user=user, pk=form_id)
+    if not form:
+        log.error(f"Form pk={form_id} not found for user.pk={user.pk}")
+        return FORM_NOT_FOUND_TEMPLATE, None
+    return FORM_HTML_TEMPLATE, FormFactory(user=user, form=form)()
+
+
+def get_result_blocks_html_data(user: User, post_data: Any) -> tuple[str, dict]:
+    """Прометка и шаблон с данными зоны блоков результата (общие для sync и async
+    представлений)."""
+    post_data = post_data if isinstance(post_data, dict) else {}
+    form_id = post_data.get("form_id")
+    form_data = post_data.get("form_data")
+    try:
+        with log_build_event(user, form_id, form_data) as event:
+            utm_result = UtmBuilder(user=user, post_data=post_data)()
+            event["status"] = "ok" if utm_result else "no_access"
+        if utm_result:
+            return RESULT_BLOCKS_HTML_TEMPLATE, utm_result
+        return UTM_BUILD_FAILED_TEMPLATE, {
+            "error_text": _(
+                "Не получилось прометить ссылку, так как отсутствует доступ к"
+                " форме прометчика."
+            )
+        }
+    except Exception as e:
+        log.exception(
+            f"Failed to build UTM for user.pk={user.pk} form_id={form_id}"
+            f" ({len(form_data) if isinstance(form_data, dict) else 0} fields)."
+            f" Exception: {e}."
+        )
+        return UTM_BUILD_FAILED_TEMPLATE, {
+            "error_text": _(
+                "Не получилось прометить ссылку из-за внутренней ошибки"
+                " UTM-прометчика 😔 Мы уже получили оповещение о ней. Приносим"
+                " свои извинения 🙏"
+            )
+        }
+
 
 class FormHTMLAPIView(APIView):
     permission_classes = (IsAuthenticated,)
     renderer_classes = (TemplateHTMLRenderer,)
-    template_name = "includes/core/form_block.html"
+    template_name = FORM_HTML_TEMPLATE
 
     @extend_schema(
         description=_("Возвращает отрендеренный HTML формы UTM-прометчика."),
@@ -37,18 +117,15 @@ class FormHTMLAPIView(APIView):
         try:
             form_id = int(request.GET["form_id"])
         except MultiValueDictKeyError:
-            return Response(template_name="includes/core/form_not_found.html")
-        form = get_user_form_by_pk(user=request.user, pk=form_id)
-        if not form:
-            log.error(f"Form pk={form_id} not found for user.pk={request.user.pk}")
-            return Response(template_name="includes/core/form_not_found.html")
-        return Response(FormFactory(user=request.user, form=form)())
+            return Response(template_name=FORM_NOT_FOUND_TEMPLATE)
+        template_name, data = get_form_html_data(request.user, form_id)
+        return Response(data, template_name=template_name)
 
 
 class ResultBlocksHTMLAPIView(APIView):
     permission_classes = (IsAuthenticated,)
     renderer_classes = (TemplateHTMLRenderer,)
-    template_name = "includes/core/result_area.html"
+    template_name = RESULT_BLOCKS_HTML_TEMPLATE
 
     @extend_schema(
         description=_("Возвращает отрендеренный HTML зоны блоков результата прометки."),
@@ -62,33 +139,8 @@ class ResultBlocksHTMLAPIView(APIView):
         responses=OpenApiTypes.STR,
     )
     def post(self, request, *args, **kwargs):  # noqa
-        try:
-            if utm_result := UtmBuilder(user=request.user, post_data=request.data)():
-                return Response(utm_result)
-            return Response(
-                template_name="includes/core/utm_build_failed.html",
-                data={
-                    "error_text": _(
-                        "Не получилось прометить ссылку, так как отсутствует доступ к"
-                        " форме прометчика."
-                    )
-                },
-            )
-        except Exception as e:
-            log.exception(
-                "Failed to build UTM for"
-                f" user.pk={request.user.pk} post_data={request.data}. Exception: {e}."
-            )
-            return Response(
-                template_name="includes/core/utm_build_failed.html",
-                data={
-                    "error_text": _(
-                        "Не получилось прометить ссылку из-за внутренней ошибки"
-                        " UTM-прометчика 😔 Мы уже получили оповещение о ней. Приносим"
-                        " свои извинения 🙏"
-                    )
-                },
-            )
+        template_name, data = get_result_blocks_html_data(request.user, request.data)
+        return Response(data, template_name=template_name)
 
 
 class UTMParserAPIView(APIView):
@@ -126,3 +178,278 @@ class UTMParserAPIView(APIView):
                 f" Exception: {e}"
             )
             raise APIException(f"Failed to get UTM parser initial form data")
+
+
+class UTMBatchParserAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        description=_(
+            "Возвращает данные форм UTM-прометчика для списка уникальных кодов"
+            " промеченных ссылок. Ответ отдается потоком в виде JSON-массива в порядке"
+            " переданных кодов."
+        ),
+        request=inline_serializer(
+            name="UTMBatchParserRequest",
+            fields={
+                "utm_hashcodes": serializers.ListField(child=serializers.CharField())
+            },
+        ),
+        responses=inline_serializer(
+            name="UTMBatchParserResponse",
+            fields={
+                "utm_hashcode": serializers.CharField(),
+                "status": serializers.ChoiceField(
+                    choices=(
+                        UtmParser.STATUS_OK,
+                        UtmParser.STATUS_INVALID,
+                        UtmParser.STATUS_NOT_FOUND,
+                        UtmParser.STATUS_NO_ACCESS,
+                    )
+                ),
+                "form_id": serializers.IntegerField(),
+                "form_data": serializers.DictField(),
+                "error": serializers.CharField(),
+            },
+            many=True,
+        ),
+    )
+    def post(self, request, *args, **kwargs):  # noqa
+        utm_hashcodes = request.data.get("utm_hashcodes")
+        if not isinstance(utm_hashcodes, list) or not all(
+            isinstance(utm_hashcode, str) for utm_hashcode in utm_hashcodes
+        ):
+            raise ValidationError(
+                {"utm_hashcodes": _("Необходимо передать массив уникальных кодов.")}
+            )
+        if len(utm_hashcodes) > settings.UTM_PARSER_BATCH_MAX_SIZE:
+            raise ValidationError(
+                {
+                    "utm_hashcodes": _(
+                        "Можно передать не больше %(max_size)s уникальных кодов."
+                    ) % {"max_size": settings.UTM_PARSER_BATCH_MAX_SIZE}
+                }
+            )
+        try:
+            results = UtmParser(user=request.user).parse_many(utm_hashcodes)
+            first_result = next(results, None)
+        except Exception as e:
+            log.exception(
+                "Failed to get UTM parser initial form data in batch. Request sent by"
+                f" user.pk={request.user.pk} for {len(utm_hashcodes)} hashcodes."
+                f" Exception: {e}"
+            )
+            raise APIException("Failed to get UTM parser initial form data")
+        return get_streaming_response(
+            request,
+            self._stream_json_array(first_result, results),
+            content_type="application/json",
+        )
+
+    @staticmethod
+    def _stream_json_array(first_result: dict | None, results: Iterator[dict]):
+        if first_result is None:
+            yield "[]"
+            return
+        yield "[" + json.dumps(first_result, cls=DjangoJSONEncoder, ensure_ascii=False)
+        for result in results:
+            yield "," + json.dumps(result, cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield "]"
+
+
+class UTMMatrixBuilderAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        description=_(
+            "Прометка всеми комбинациями нескольких значений выбранных полей формы."
+            " Прометки сохраняются в историю, ответ отдается потоком в виде"
+            " JSON-массива или CSV-файла (format=csv)."
+        ),
+        parameters=[
+            OpenApiParameter(
+                "format", OpenApiTypes.STR, OpenApiParameter.QUERY, enum=["json", "csv"]
+            )
+        ],
+        request=inline_serializer(
+            name="UTMMatrixBuilderRequest",
+            fields={
+                "form_id": serializers.IntegerField(),
+                "form_data": serializers.DictField(),
+                "matrix": serializers.DictField(
+                    child=serializers.ListField(child=serializers.CharField())
+                ),
+            },
+        ),
+        responses=inline_serializer(
+            name="UTMMatrixBuilderResponse",
+            fields={
+                "utm_hashcode": serializers.CharField(),
+                "values": serializers.DictField(),
+                "main_result": serializers.CharField(),
+                "results": serializers.ListField(child=serializers.DictField()),
+            },
+            many=True,
+        ),
+    )
+    def post(self, request, *args, **kwargs):  # noqa
+        form_obj = get_user_form_with_relations_by_pk(
+            user=request.user, pk=request.data.get("form_id")
+        )
+        if not form_obj:
+            raise NotFound(_("Форма прометчика не найдена."))
+        form_data = request.data.get("form_data")
+        if not isinstance(form_data, dict):
+            raise ValidationError({"form_data": _("Необходимо передать данные формы.")})
+        form_data = {str(k): "" if v is None else str(v) for k, v in form_data.items()}
+        matrix = self._validate_matrix(form_obj, request.data.get("matrix"))
+        matrix_builder = UtmMatrixBuilder(
+            user=request.user,
+            form_obj=form_obj,
+            form_data=form_data,
+            matrix=matrix,
+            chunk_size=settings.UTM_MATRIX_CHUNK_SIZE,
+        )
+        if matrix_builder.size > settings.UTM_MATRIX_MAX_SIZE:
+            raise ValidationError(
+                {
+                    "matrix": _(
+                        "Матрица может содержать не больше %(max_size)s комбинаций."
+                    ) % {"max_size": settings.UTM_MATRIX_MAX_SIZE}
+                }
+            )
+        # Первая пачка считается до ответа: ошибка в ней возвращается обычной 500.
+        results = iter(matrix_builder)
+        try:
+            first_result = next(results, None)
+        except Exception as e:
+            self._log_error(request, matrix_builder, e)
+            raise APIException("Failed to build UTM matrix")
+        if first_result is not None:
+            results = itertools.chain([first_result], results)
+        results = self._log_errors(request, matrix_builder, results)
+        if request.GET.get("format") == "csv":
+            response = get_streaming_response(
+                request,
+                self._stream_csv(form_obj, matrix, results),
+                content_type="text/csv; charset=utf-8",
+            )
+            response["Content-Disposition"] = 'attachment; filename="utm_matrix.csv"'
+            return response
+        return get_streaming_response(
+            request,
+            self._stream_json_array(matrix, results),
+            content_type="application/json",
+        )
+
+    @staticmethod
+    def _validate_matrix(form_obj: Form, matrix) -> dict[str, list[str]]:
+        if not isinstance(matrix, dict) or not matrix:
+            raise ValidationError(
+                {"matrix": _("Необходимо передать значения варьируемых полей.")}
+            )
+        form_fields_pks = {str(f.pk) for f in get_form_ui_fields(form_obj)}
+        cleaned_matrix = {}
+        for pk, values in matrix.items():
+            if pk not in form_fields_pks:
+                raise ValidationError(
+                    {"matrix": _("Поле %(pk)s отсутствует в форме.") % {"pk": pk}}
+                )
+            if not isinstance(values, list) or not values:
+                raise ValidationError(
+                    {
+                        "matrix": _(
+                            "Значения поля %(pk)s должны быть непустым массивом."
+                        ) % {"pk": pk}
+                    }
+                )
+            # Повторяющиеся значения дали бы одинаковые комбинации.
+            cleaned_matrix[pk] = list(dict.fromkeys(str(value) for value in values))
+        return cleaned_matrix
+
+    @classmethod
+    def _log_errors(
+        cls,
+        request,
+        matrix_builder: UtmMatrixBuilder,
+        results: Iterator[BulkUtmResult],
+    ) -> Iterator[BulkUtmResult]:
+        # Статус ответа уже отправлен. Исключение пробрасывается дальше, чтобы ответ
+        # оборвался без закрывающей части: JSON-массив остается незакрытым, и клиент
+        # не примет обрезанный результат за полный.
+        try:
+            yield from results
+        except Exception as e:
+            cls._log_error(request, matrix_builder, e)
+            raise
+
+    @staticmethod
+    def _log_error(request, matrix_builder: UtmMatrixBuilder, e: Exception) -> None:
+        log.exception(
+            f"Failed to build UTM matrix for user.pk={request.user.pk}"
+            f" form_id={matrix_builder.form_obj.pk} size={matrix_builder.size}."
+            f" Exception: {e}"
+        )
+
+    @staticmethod
+    def _stream_json_array(
+        matrix: dict[str, list[str]], results: Iterator[BulkUtmResult]
+    ) -> Iterator[str]:
+        separator = "["
+        for result in results:
+            item = {
+                "utm_hashcode": result.hashcode,
+                "values": {pk: result.form_data[pk] for pk in matrix},
+                "main_result": result.main_result_value,
+                "results": [
+                    {"label": rb["label"], "value": rb["value"]}
+                    for rb in result.result_blocks
+                ],
+            }
+            yield separator + json.dumps(item, ensure_ascii=False)
+            separator = ","
+        yield "[]" if separator == "[" else "]"
+
+    @staticmethod
+    def _stream_csv(
+        form_obj: Form,
+        matrix: dict[str, list[str]],
+        results: Iterator[BulkUtmResult],
+    ) -> Iterator[str]:
+        labels = {str(f.pk): f.label for f in get_form_ui_fields(form_obj)}
+        result_fields = [
+            (f"result-block-{f.pk}", f.label) for f in form_obj.result_fields.all()
+        ]
+        buffer = _LineBuffer()
+        writer = csv.writer(buffer)
+        yield writer.writerow(
+            [
+                *(labels[pk] for pk in matrix),
+                "utm_hashcode",
+                "result",
+                *(label for title, label in result_fields),
+            ]
+        )
+        try:
+            for result in results:
+                values = {rb["title"]: rb["value"] for rb in result.result_blocks}
+                yield writer.writerow(
+                    [
+                        *(result.form_data[pk] for pk in matrix),
+                        result.hashcode,
+                        result.main_result_value,
+                        *(values.get(title, "") for title, label in result_fields),
+                    ]
+                )
+        except Exception:
+            # У CSV нет закрывающей части, поэтому обрыв отмечается явно.
+            yield writer.writerow([UTM_MATRIX_CSV_ERROR_MARKER])
+            raise
+
+
+class _LineBuffer:
+    """Файлоподобный объект для csv.writer, который возвращает записанную строку."""
+
+    @staticmethod
+    def write(value: str) -> str:
+        return value
@@ -0,0 +1,80 @@
+"""
+Async-версии эндпоинтов прометки, HTML формы и парсера для запуска под ASGI
+(ASYNC_VIEWS_ENABLED). Отвечают так же, как DRF-представления из core.views.api.
+Синхронный код с ORM выполняется в пуле потоков БД (core.async_utils), поэтому
+воркер обрабатывает одновременно до ASYNC_DB_THREADS запросов к БД, а ожидание
+клиентов и кэша не занимает потоки.
+"""
+import json
+import logging
+
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.views import View
+from rest_framework.exceptions import NotAuthenticated, ParseError
+
+from core.async_utils import aget_user, run_in_db_thread
+from core.services.utm_parser import UtmParser
+from core.views.api import (
+    FORM_NOT_FOUND_TEMPLATE,
+    get_form_html_data,
+    get_result_blocks_html_data,
+)
+
+log = logging.getLogger(__name__)
+
+
+class BaseAsyncAPIView(View):
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return JsonResponse({"detail": NotAuthenticated.default_detail}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+def _render(request, template_name: str, data: dict | None) -> str:
+    return render_to_string(template_name, context=data, request=request)
+
+
+class FormHTMLAsyncView(BaseAsyncAPIView):
+    async def get(self, request, *args, **kwargs):  # noqa
+        form_id = request.GET.get("form_id")
+        form_id = int(form_id) if form_id is not None else None
+
+        def render_form_html() -> str:
+            if form_id is None:
+                return _render(request, FORM_NOT_FOUND_TEMPLATE, None)
+            return _render(request, *get_form_html_data(request.user, form_id))
+
+        return HttpResponse(await run_in_db_thread(render_form_html))
+
+
+class ResultBlocksHTMLAsyncView(BaseAsyncAPIView):
+    async def post(self, request, *args, **kwargs):  # noqa
+        try:
+            post_data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"detail": ParseError.default_detail}, status=400)
+
+        def render_result_blocks_html() -> str:
+            return _render(
+                request, *get_result_blocks_html_data(request.user, post_data)
+            )
+
+        return HttpResponse(await run_in_db_thread(render_result_blocks_html))
+
+
+class UTMParserAsyncView(BaseAsyncAPIView):
+    async def get(self, request, *args, **kwargs):  # noqa
+        utm_hashcode = request.GET.get("utm_hashcode")
+        try:
+            return JsonResponse(await UtmParser(user=request.user).acall(utm_hashcode))
+        except Exception as e:
+            log.exception(
+                "Failed to get UTM parser initial form data. Request sent by"
+                f" user.pk={request.user.pk} utm_hashcode={utm_hashcode}."
+                f" Exception: {e}"
+            )
+            return JsonResponse(
+                {"detail": "Failed to get UTM parser initial form data"}, status=500
+            )
@@ -4,6 +4,7 @@ from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView
 
+from core.selectors import get_user_forms
 from core.services.form_constructor import FormFactory
 
 
@@ -16,7 +17,7 @@ class MainPageView(LoginRequiredMixin, TemplateView):
         if self.request.user.is_anonymous:
             return context
         context["page"] = "main"
-        forms = self.request.user.profile.forms.all()
+        forms = get_user_forms(self.request.user)
         form_available = bool(forms)
         context["form_available"] = form_available
         if form_available:
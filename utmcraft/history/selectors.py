@@ -1,9 +1,18 @@
+import re
 from datetime import datetime
 
-from django.db.models import Q, QuerySet
+from django.db.models import Exists, OuterRef, Q, QuerySet
 from django.utils.timezone import make_aware
 
-from core.models import UtmResult
+from core.models import UtmResult, UtmResultValue
+from core.services.utm_archive import get_archived_record, utm_result_from_record
+
+# Поисковый запрос вида "utm_campaign:spring_*" ищет значения поля результата с
+# ярлыком "utm_campaign", начинающиеся на "spring_".
+SEARCH_LABEL_SEPARATOR = ":"
+SEARCH_PREFIX_WILDCARD = "*"
+
+HASHCODE_REGEX = re.compile(r"^[a-z0-9+/=]{8}$")
 
 
 def get_utm_results_by_user_pk(pk: int) -> QuerySet[UtmResult]:
@@ -27,17 +36,58 @@ def filter_by_datetime(
     return objects
 
 
+def parse_search_query(query: str) -> tuple[str | None, str, bool]:
+    """
+    Разбирает поисковый запрос по истории.
+    :return: Кортеж: (ярлык поля результата, значение, поиск по префиксу)
+    """
+    label = None
+    query = query.strip()
+    head, separator, tail = query.partition(SEARCH_LABEL_SEPARATOR)
+    # URL тоже содержат ":", поэтому "https://..." не считаем поиском по ярлыку.
+    if separator and head.strip() and "/" not in head and not tail.startswith("//"):
+        label, query = head.strip(), tail.strip()
+    is_prefix = query.endswith(SEARCH_PREFIX_WILDCARD)
+    if is_prefix:
+        query = query.rstrip(SEARCH_PREFIX_WILDCARD)
+    return label, query, is_prefix
+
+
 def search_in_utm_results(
     utm_results: QuerySet[UtmResult], query: str | None = None
 ) -> QuerySet[UtmResult]:
-    if query:
-        utm_results = utm_results.filter(
-            Q(raw_utm_data__utm_hashcode=query)
-            | Q(main_result_value__icontains=query)
-            | Q(
-                result_fields_data__contains=[
-                    {"value": query, "is_error": False, "is_bas64_image": False}
-                ]
-            )
-        )
-    return utm_results
+    if not query:
+        return utm_results
+    label, value, is_prefix = parse_search_query(query)
+    values = UtmResultValue.objects.filter(result=OuterRef("pk"))
+    if label:
+        values = values.filter(label=label)
+        if is_prefix:
+            values = values.filter(value__startswith=value)
+        else:
+            values = values.filter(value=value)
+        return utm_results.filter(Exists(values))
+    if is_prefix:
+        main_result_filter = Q(main_result_value__startswith=value)
+        # istartswith – условие для триграммного индекса по UPPER(value).
+        values = values.filter(value__istartswith=value, value__startswith=value)
+    else:
+        main_result_filter = Q(main_result_value__icontains=value)
+        values = values.filter(value__icontains=value)
+    return utm_results.filter(
+        Q(raw_utm_data__utm_hashcode=query.strip())
+        | main_result_filter
+        | Exists(values)
+    )
+
+
+def get_archived_utm_results(user_pk: int, query: str | None) -> list[UtmResult]:
+    """Ищет прометку пользователя в архиве, если поисковый запрос – уникальный код."""
+    if not query or not HASHCODE_REGEX.match(query := query.strip()):
+        return []
+    if not (record := get_archived_record(query)):
+        return []
+    utm_result = utm_result_from_record(record)
+    if not utm_result or utm_result.created_by_id != user_pk:
+        return []
+    return [utm_result]
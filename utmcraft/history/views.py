@@ -2,9 +2,10 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.views.generic import ListView
 
-from core.models import UtmResult
+from core.models import UtmResult, UtmResultSchema
 from history.selectors import (
     filter_by_datetime,
+    get_archived_utm_results,
     get_utm_results_by_user_pk,
     search_in_utm_results,
 )
@@ -24,11 +25,20 @@ class UtmHistoryView(LoginRequiredMixin, ListView):
             date_from=self.request.GET.get("date_from"),
             date_to=self.request.GET.get("date_to"),
         )
-        objects = search_in_utm_results(objects, query=self.request.GET.get("q"))
-        return objects.order_by("-pk")
+        query = self.request.GET.get("q")
+        objects = search_in_utm_results(objects, query=query).order_by("-pk")
+        # Если в БД прометка не найдена – ищем ее по уникальному коду в архиве.
+        if query and not objects.exists():
+            if archived := get_archived_utm_results(self.request.user.pk, query):
+                return archived
+        return objects
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Схемы блоков результата для всей страницы загружаем одним запросом.
+        UtmResultSchema.preload(
+            utm_result.schema_id for utm_result in context["object_list"]
+        )
         context["query"] = self.request.GET.get("q")
         context["date_from"] = self.request.GET.get("date_from")
         context["date_to"] = self.request.GET.get("date_to")
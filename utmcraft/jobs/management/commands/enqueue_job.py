@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.registry import TASKS
+from jobs.services import enqueue_job
+
+
+class Command(BaseCommand):
+    help = "Adds a background job to the queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("task", choices=sorted(TASKS), help="Job task")
+        parser.add_argument(
+            "--params", default="{}", help="Task parameters as a JSON object"
+        )
+        parser.add_argument("--priority", type=int, default=0, help="Job priority")
+        parser.add_argument("--max-attempts", type=int, help="Maximum attempts")
+
+    def handle(self, *args, **options):
+        try:
+            params = json.loads(options["params"])
+        except ValueError as e:
+            raise CommandError(f"Invalid --params JSON: {e}")
+        if not isinstance(params, dict):
+            raise CommandError("--params must be a JSON object")
+        job = enqueue_job(
+            options["task"],
+            params=params,
+            priority=options["priority"],
+            max_attempts=options["max_attempts"],
+        )
+        self.stdout.write(f"Job pk={job.pk} queued")
@@ -0,0 +1,68 @@
+import logging
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import run_worker
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Runs background job workers that claim jobs from the Postgres queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=1, help="Worker processes"
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Seconds between queue polls when it is empty",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit when there are no queued jobs left",
+        )
+
+    def handle(self, *args, **options):
+        stop_event = multiprocessing.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop_event.set())
+        # Процессы создаются fork-ом и не должны унаследовать открытые соединения.
+        connections.close_all()
+        processes = [
+            self._start_worker(stop_event, options)
+            for __ in range(options["concurrency"])
+        ]
+        self.stderr.write(f"Started {len(processes)} job workers")
+        while processes and not stop_event.wait(1):
+            for i, process in enumerate(processes):
+                if process.is_alive():
+                    continue
+                if options["burst"] or process.exitcode == 0:
+                    processes[i] = None
+                    continue
+                log.error(
+                    f"Job worker pid={process.pid} exited with code"
+                    f" {process.exitcode}, restarting"
+                )
+                processes[i] = self._start_worker(stop_event, options)
+            processes = [process for process in processes if process]
+        self.stderr.write("Stopping job workers, waiting for running jobs")
+        for process in processes:
+            process.join()
+
+    @staticmethod
+    def _start_worker(stop_event, options) -> multiprocessing.Process:
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(stop_event, options["poll_interval"], options["burst"]),
+        )
+        process.start()
+        return process
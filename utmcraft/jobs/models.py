@@ -0,0 +1,104 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from core.models.common import AuthorTimeTrackingModel
+
+
+class Job(AuthorTimeTrackingModel):
+    class Status(models.TextChoices):
+        QUEUED = "queued", _("в очереди")
+        RUNNING = "running", _("выполняется")
+        SUCCEEDED = "succeeded", _("выполнена")
+        FAILED = "failed", _("завершилась с ошибкой")
+        CANCELLED = "cancelled", _("отменена")
+
+    task = models.CharField(max_length=100, verbose_name=_("задача"))
+    params = models.JSONField(
+        verbose_name=_("параметры задачи"), encoder=DjangoJSONEncoder, default=dict
+    )
+    status = models.CharField(
+        max_length=9,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        verbose_name=_("статус"),
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name=_("приоритет"),
+        help_text=_("Задачи с большим приоритетом выполняются раньше."),
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name=_("количество запусков")
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3, verbose_name=_("максимальное количество запусков")
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("запустить не раньше"),
+        help_text=_("Повторный запуск после ошибки откладывается."),
+    )
+    worker = models.CharField(max_length=100, blank=True, verbose_name=_("обработчик"))
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("последний сигнал обработчика")
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("дата запуска")
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("дата завершения")
+    )
+    progress_done = models.PositiveBigIntegerField(
+        default=0, verbose_name=_("выполнено")
+    )
+    progress_total = models.PositiveBigIntegerField(
+        null=True, blank=True, verbose_name=_("всего")
+    )
+    message = models.CharField(
+        max_length=255, blank=True, verbose_name=_("текущий этап")
+    )
+    result = models.JSONField(
+        verbose_name=_("результат"), encoder=DjangoJSONEncoder, null=True, blank=True
+    )
+    error = models.TextField(blank=True, verbose_name=_("ошибка"))
+
+    def __str__(self):
+        return f"{self.__class__.__name__} {self.task} ({self.pk})"
+
+    class Meta:
+        ordering = ["-pk"]
+        verbose_name = _("фоновая задача")
+        verbose_name_plural = _("фоновые задачи")
+        indexes = (
+            # Очередь: порядок выборки задачи обработчиком.
+            models.Index(
+                fields=["-priority", "run_after", "id"],
+                name="job_queue_idx",
+                condition=models.Q(status="queued"),
+            ),
+            # Поиск задач, обработчик которых перестал подавать сигналы.
+            models.Index(
+                fields=["heartbeat_at"],
+                name="job_running_idx",
+                condition=models.Q(status="running"),
+            ),
+        )
+
+    @property
+    def progress(self) -> float | None:
+        """Доля выполненной работы от 0 до 1, если задача сообщает общий объем."""
+        if self.status == self.Status.SUCCEEDED:
+            return 1.0
+        if not self.progress_total:
+            return
+        return min(self.progress_done / self.progress_total, 1.0)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (
+            self.Status.SUCCEEDED,
+            self.Status.FAILED,
+            self.Status.CANCELLED,
+        )
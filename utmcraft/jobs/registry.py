@@ -0,0 +1,19 @@
+"""Реестр фоновых задач: имя задачи -> функция, которая ее выполняет."""
+from typing import Callable
+
+TASKS: dict[str, Callable] = {}
+
+
+def task(name: str) -> Callable[[Callable], Callable]:
+    """
+    Регистрирует функцию задачи. Функция получает JobContext и параметры задачи
+    именованными аргументами и возвращает JSON-сериализуемый результат.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if name in TASKS:
+            raise ValueError(f"Job task {name} is already registered")
+        TASKS[name] = func
+        return func
+
+    return decorator
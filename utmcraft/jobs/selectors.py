@@ -0,0 +1,15 @@
+from django.db.models import QuerySet
+
+from core.models.common import User
+from jobs.models import Job
+
+
+def get_user_jobs(user: User) -> QuerySet[Job]:
+    jobs = Job.objects.all()
+    if not user.is_staff:
+        jobs = jobs.filter(created_by=user)
+    return jobs.order_by("-pk")
+
+
+def get_user_job_by_pk(user: User, pk: int) -> Job | None:
+    return get_user_jobs(user).filter(pk=pk).first()
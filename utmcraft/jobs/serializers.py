@@ -0,0 +1,38 @@
+from rest_framework import serializers
+
+from jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True, allow_null=True)
+    is_finished = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "task",
+            "status",
+            "priority",
+            "attempts",
+            "max_attempts",
+            "progress",
+            "progress_done",
+            "progress_total",
+            "message",
+            "result",
+            "error",
+            "is_finished",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Трейсбек ошибки нужен только разработчикам.
+        request = self.context.get("request")
+        if data["error"] and not (request and request.user.is_staff):
+            data["error"] = "error"
+        return data
@@ -0,0 +1,222 @@
+"""
+Очередь фоновых задач в Postgres.
+
+Обработчик забирает задачу запросом SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+несколько обработчиков не получат одну задачу и не ждут блокировок друг друга. Пока
+задача выполняется, отдельный поток обработчика обновляет heartbeat_at. Задачу, по
+которой сигналы перестали приходить (обработчик упал или был убит), другой обработчик
+возвращает в очередь. После ошибки задача перезапускается с экспоненциальной
+задержкой, пока не исчерпано количество запусков.
+"""
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models.common import User
+from jobs.models import Job
+from jobs.registry import TASKS
+
+log = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Передается в функцию задачи для отчета о прогрессе."""
+
+    def __init__(self, job: Job):
+        self.job = job
+        self._reported_at = 0.0
+
+    def progress(
+        self, done: int, total: int | None = None, message: str | None = None
+    ) -> None:
+        """
+        Сохраняет прогресс задачи не чаще раза в JOBS_PROGRESS_INTERVAL секунд.
+        Если задачу отменили, выбрасывает JobCancelled.
+        """
+        job = self.job
+        job.progress_done = done
+        if total is not None:
+            job.progress_total = total
+        if message is not None:
+            job.message = message[: Job._meta.get_field("message").max_length]
+        if time.monotonic() - self._reported_at < settings.JOBS_PROGRESS_INTERVAL:
+            return
+        self._reported_at = time.monotonic()
+        updated = Job.objects.filter(
+            pk=job.pk, status=Job.Status.RUNNING, worker=job.worker
+        ).update(
+            progress_done=job.progress_done,
+            progress_total=job.progress_total,
+            message=job.message,
+            heartbeat_at=timezone.now(),
+        )
+        if not updated:
+            raise JobCancelled(f"Job pk={job.pk} was cancelled")
+
+
+class JobHeartbeat(threading.Thread):
+    """Поток, который обновляет heartbeat_at задачи, пока она выполняется."""
+
+    def __init__(self, job: Job):
+        super().__init__(name=f"job-heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(settings.JOBS_HEARTBEAT_INTERVAL):
+                Job.objects.filter(
+                    pk=self.job.pk, status=Job.Status.RUNNING, worker=self.job.worker
+                ).update(heartbeat_at=timezone.now())
+        except Exception as e:
+            log.exception(f"Failed to update heartbeat of job pk={self.job.pk}: {e}")
+        finally:
+            # У потока свое соединение с БД, закрываем его.
+            connection.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def enqueue_job(
+    task: str,
+    params: dict[str, Any] | None = None,
+    user: User | None = None,
+    priority: int = 0,
+    max_attempts: int | None = None,
+) -> Job:
+    if task not in TASKS:
+        raise ValueError(f"Unknown job task {task}")
+    return Job.objects.create(
+        task=task,
+        params=params or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        created_by=user,
+        updated_by=user,
+    )
+
+
+def cancel_job(job: Job) -> bool:
+    """
+    Отменяет задачу в очереди сразу, а выполняемую – при следующем отчете
+    о прогрессе. Возвращает False, если задача уже завершена.
+    """
+    updated = Job.objects.filter(
+        pk=job.pk, status__in=[Job.Status.QUEUED, Job.Status.RUNNING]
+    ).update(status=Job.Status.CANCELLED, finished_at=timezone.now())
+    return bool(updated)
+
+
+def claim_job(worker: str) -> Job | None:
+    """Забирает из очереди задачу с наибольшим приоритетом."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_after__lte=now)
+            .order_by("-priority", "run_after", "pk")
+            .first()
+        )
+        if not job:
+            return
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+        job.worker = worker
+        job.started_at = job.heartbeat_at = now
+        job.finished_at = None
+        job.save(
+            update_fields=[
+                "status",
+                "attempts",
+                "worker",
+                "started_at",
+                "heartbeat_at",
+                "finished_at",
+                "updated_at",
+            ]
+        )
+    return job
+
+
+def run_job(job: Job) -> None:
+    if not (func := TASKS.get(job.task)):
+        log.error(f"Unknown task {job.task} of job pk={job.pk}")
+        _finish_job(job, Job.Status.FAILED, error=f"Unknown task {job.task}")
+        return
+    log.info(f"Job pk={job.pk} {job.task} started, attempt {job.attempts}")
+    heartbeat = JobHeartbeat(job)
+    heartbeat.start()
+    try:
+        result = func(JobContext(job), **job.params)
+    except JobCancelled:
+        log.info(f"Job pk={job.pk} {job.task} cancelled")
+        return
+    except Exception as e:
+        log.exception(f"Job pk={job.pk} {job.task} failed: {e}")
+        _retry_or_fail_job(job, traceback.format_exc())
+        return
+    finally:
+        heartbeat.stop()
+    _finish_job(job, Job.Status.SUCCEEDED, result=result)
+    log.info(f"Job pk={job.pk} {job.task} succeeded")
+
+
+def requeue_stale_jobs() -> int:
+    """Возвращает в очередь задачи, обработчик которых перестал подавать сигналы."""
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_HEARTBEAT_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.Status.RUNNING, heartbeat_at__lt=deadline
+            )
+        )
+        for job in jobs:
+            log.warning(f"Job pk={job.pk} lost heartbeat of worker {job.worker}")
+            _retry_or_fail_job(job, f"Worker {job.worker} heartbeat lost")
+    return len(jobs)
+
+
+def _retry_or_fail_job(job: Job, error: str) -> None:
+    if job.attempts < job.max_attempts:
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        Job.objects.filter(
+            pk=job.pk, status=Job.Status.RUNNING, worker=job.worker
+        ).update(
+            status=Job.Status.QUEUED,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            error=error,
+            updated_at=timezone.now(),
+        )
+        return
+    _finish_job(job, Job.Status.FAILED, error=error)
+
+
+def _finish_job(
+    job: Job, status: Job.Status, result: Any = None, error: str = ""
+) -> None:
+    fields = {
+        "status": status,
+        "result": result,
+        "error": error,
+        "finished_at": timezone.now(),
+        "updated_at": timezone.now(),
+    }
+    if status == Job.Status.SUCCEEDED and job.progress_total:
+        fields["progress_done"] = job.progress_total
+    # Фильтр по статусу не дает перезаписать отмену задачи.
+    Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, worker=job.worker).update(
+        **fields
+    )
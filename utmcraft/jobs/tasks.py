@@ -0,0 +1,66 @@
+"""
+Встроенные фоновые задачи: тяжелые операции, которые нельзя выполнять в запросе.
+Параметры задач-команд передаются в management-команду как ее опции, а строки,
+которые команда пишет в stderr, сохраняются как текущий этап задачи.
+"""
+import io
+from collections import deque
+
+from django.core.management import call_command
+
+from core.services import utm_archive
+from jobs.registry import task
+from jobs.services import JobContext
+
+# Количество последних строк вывода команды, которые сохраняются в результат задачи.
+OUTPUT_TAIL_LINES = 20
+
+
+class JobOutputStream(io.TextIOBase):
+    """Поток вывода команды: последняя строка – этап задачи, хвост – ее результат."""
+
+    def __init__(self, ctx: JobContext):
+        self.ctx = ctx
+        self.lines: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+        self._lines_count = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        for line in s.splitlines():
+            if line := line.strip():
+                self.lines.append(line)
+                self._lines_count += 1
+                self.ctx.progress(self._lines_count, message=line)
+        return len(s)
+
+
+def _call_command(ctx: JobContext, command: str, **params) -> dict[str, list[str]]:
+    stdout = io.StringIO()
+    stderr = JobOutputStream(ctx)
+    call_command(command, stdout=stdout, stderr=stderr, **params)
+    return {
+        "stdout": stdout.getvalue().splitlines()[-OUTPUT_TAIL_LINES:],
+        "stderr": list(stderr.lines),
+    }
+
+
+@task("build_utm")
+def build_utm(ctx: JobContext, **params):
+    # Вывод в stdout обработчика никто не прочитает.
+    if params.get("input", "-") == "-" or params.get("output", "-") == "-":
+        raise ValueError("build_utm job requires input and output file paths")
+    return _call_command(ctx, "build_utm", **params)
+
+
+@task("reevaluate_utm_results")
+def reevaluate_utm_results(ctx: JobContext, **params):
+    return _call_command(ctx, "reevaluate_utm_results", **params)
+
+
+@task("archive_utm_data")
+def archive_utm_data(ctx: JobContext, days: int = 365, block_size: int = 256):
+    ctx.progress(0, message=f"Archiving UTM data older than {days} days")
+    path, count = utm_archive.archive_utm_data(days=days, block_size=block_size)
+    return {"path": str(path) if path else None, "count": count}
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from jobs.views import JobCancelAPIView, JobDetailAPIView, JobListAPIView
+
+app_name = "jobs"
+
+urlpatterns = [
+    path("api", JobListAPIView.as_view(), name="api_list"),
+    path("api/<int:pk>", JobDetailAPIView.as_view(), name="api_detail"),
+    path("api/<int:pk>/cancel", JobCancelAPIView.as_view(), name="api_cancel"),
+]
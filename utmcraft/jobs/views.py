@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from jobs.models import Job
+from jobs.selectors import get_user_job_by_pk, get_user_jobs
+from jobs.serializers import JobSerializer
+from jobs.services import cancel_job
+
+
+class JobListAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        description=_(
+            "Возвращает последние фоновые задачи пользователя (для staff – всех"
+            " пользователей)."
+        ),
+        parameters=[
+            OpenApiParameter(
+                "status",
+                OpenApiTypes.STR,
+                OpenApiParameter.QUERY,
+                enum=Job.Status.values,
+            )
+        ],
+        responses=JobSerializer(many=True),
+    )
+    def get(self, request, *args, **kwargs):  # noqa
+        jobs = get_user_jobs(request.user)
+        if job_status := request.GET.get("status"):
+            jobs = jobs.filter(status=job_status)
+        jobs = jobs[: settings.JOBS_LIST_MAX_SIZE]
+        return Response(
+            JobSerializer(jobs, many=True, context={"request": request}).data
+        )
+
+
+class JobDetailAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        description=_("Возвращает статус и прогресс фоновой задачи."),
+        responses=JobSerializer,
+    )
+    def get(self, request, pk: int, *args, **kwargs):  # noqa
+        if not (job := get_user_job_by_pk(request.user, pk)):
+            raise NotFound(_("Задача не найдена."))
+        return Response(JobSerializer(job, context={"request": request}).data)
+
+
+class JobCancelAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        description=_(
+            "Отменяет фоновую задачу. Задача в очереди отменяется сразу, выполняемая"
+            " – при следующем отчете о прогрессе."
+        ),
+        request=None,
+        responses=JobSerializer,
+    )
+    def post(self, request, pk: int, *args, **kwargs):  # noqa
+        if not (job := get_user_job_by_pk(request.user, pk)):
+            raise NotFound(_("Задача не найдена."))
+        if not cancel_job(job):
+            return Response(
+                {"detail": _("Задача уже завершена.")},
+                status=status.HTTP_409_CONFLICT,
+            )
+        job.refresh_from_db()
+        return Response(JobSerializer(job, context={"request": request}).data)
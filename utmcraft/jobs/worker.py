@@ -0,0 +1,46 @@
+import logging
+import os
+import signal
+import socket
+import time
+from multiprocessing.synchronize import Event
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from jobs.services import claim_job, requeue_stale_jobs, run_job
+
+log = logging.getLogger(__name__)
+
+
+def run_worker(stop_event: Event, poll_interval: float, burst: bool = False) -> None:
+    """
+    Цикл обработчика: забирает задачи из очереди, пока не установлен stop_event.
+    Текущая задача при остановке доделывается.
+    :param burst: Завершиться, когда в очереди не осталось задач
+    """
+    # Ctrl+C приходит всей группе процессов, остановкой управляет родитель.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    log.info(f"Job worker {worker} started")
+    requeued_at = 0.0
+    while not stop_event.is_set():
+        try:
+            if time.monotonic() - requeued_at > settings.JOBS_HEARTBEAT_INTERVAL:
+                requeue_stale_jobs()
+                requeued_at = time.monotonic()
+            job = claim_job(worker)
+        except DatabaseError as e:
+            log.exception(f"Job worker {worker} failed to claim a job: {e}")
+            close_old_connections()
+            stop_event.wait(poll_interval)
+            continue
+        if not job:
+            if burst:
+                break
+            stop_event.wait(poll_interval)
+            continue
+        run_job(job)
+        close_old_connections()
+    log.info(f"Job worker {worker} stopped")
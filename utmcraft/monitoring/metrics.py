@@ -0,0 +1,297 @@
+"""
+Метрики запросов в формате Prometheus для нескольких процессов gunicorn.
+
+Каждый процесс копит гистограммы в памяти и не чаще раза в METRICS_FLUSH_INTERVAL
+секунд записывает их в свой файл metrics_<pid>_<время запуска>.json в METRICS_DIR:
+время запуска отличает процесс от будущего процесса с тем же PID. Эндпоинт /metrics
+суммирует файлы всех процессов. Файлы завершившихся процессов при этом переносятся
+в общий файл архива, поэтому счетчики не уменьшаются после перезапуска процесса,
+а количество файлов не растет.
+"""
+import bisect
+import fcntl
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+PROCESS_FILE_PREFIX = "metrics_"
+ARCHIVE_FILE_NAME = "archive.json"
+LOCK_FILE_NAME = ".lock"
+
+# Границы корзин гистограмм.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Имя метрики -> (описание, границы корзин).
+HISTOGRAMS = {
+    "utmcraft_http_request_duration_seconds": (
+        "Request wall time",
+        DURATION_BUCKETS,
+    ),
+    "utmcraft_http_request_python_duration_seconds": (
+        "Request time outside SQL and template rendering",
+        DURATION_BUCKETS,
+    ),
+    "utmcraft_http_request_sql_queries": (
+        "SQL queries per request",
+        COUNT_BUCKETS,
+    ),
+    "utmcraft_http_request_sql_duration_seconds": (
+        "SQL time per request",
+        DURATION_BUCKETS,
+    ),
+    "utmcraft_http_request_render_duration_seconds": (
+        "Template response rendering time per request",
+        DURATION_BUCKETS,
+    ),
+    "utmcraft_http_response_size_bytes": (
+        "Response body size",
+        SIZE_BUCKETS,
+    ),
+}
+COUNTERS = {
+    "utmcraft_http_requests_total": "Requests by route, method and status",
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Метрики процесса: гистограммы и счетчики по наборам меток."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (метрика, метки) -> [счетчики корзин..., количество, сумма]
+        self._histograms: dict[tuple[str, Labels], list[float]] = {}
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._flushed_at = 0.0
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = HISTOGRAMS[name][1]
+        with self._lock:
+            if (values := self._histograms.get((name, labels))) is None:
+                values = self._histograms[(name, labels)] = [0] * (len(buckets) + 2)
+            # Корзины храним не накопительно, суммы по корзинам считаются при выводе.
+            i = bisect.bisect_left(buckets, value)
+            if i < len(buckets):
+                values[i] += 1
+            values[-2] += 1
+            values[-1] += value
+
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        with self._lock:
+            self._counters[(name, labels)] = (
+                self._counters.get((name, labels), 0) + value
+            )
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": [
+                    [name, list(labels), values]
+                    for (name, labels), values in self._histograms.items()
+                ],
+                "counters": [
+                    [name, list(labels), value]
+                    for (name, labels), value in self._counters.items()
+                ],
+            }
+
+    def flush(self, force: bool = False) -> None:
+        """Записывает метрики процесса в его файл, если с прошлой записи прошло
+        METRICS_FLUSH_INTERVAL секунд."""
+        now = time.monotonic()
+        if not force and now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        try:
+            _write_json(_get_process_file(_get_process_id()), self.dump())
+        except OSError as e:
+            log.error(f"Failed to write metrics file: {e}")
+
+
+def _get_dir() -> Path:
+    path = Path(settings.METRICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _get_process_file(process_id: str) -> Path:
+    return _get_dir() / f"{PROCESS_FILE_PREFIX}{process_id}.json"
+
+
+# PID -> идентификатор процесса, PID меняется после fork.
+_process_ids: dict[int, str] = {}
+
+
+def _get_process_id() -> str:
+    pid = os.getpid()
+    if (process_id := _process_ids.get(pid)) is None:
+        # Без /proc время запуска заменяется случайным токеном: файлы процессов с
+        # одинаковым PID не перезаписывают друг друга.
+        started_at = _get_process_start_time(pid) or secrets.token_hex(8)
+        process_id = _process_ids[pid] = f"{pid}_{started_at}"
+    return process_id
+
+
+def _get_process_start_time(pid: int) -> str | None:
+    """Время запуска процесса в тиках с загрузки системы (Linux)."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return
+    # Имя процесса в скобках может содержать пробелы, поэтому поля считаются после
+    # него: starttime – 22-е поле.
+    return stat.rpartition(")")[2].split()[19]
+
+
+def _write_json(path: Path, data: dict) -> None:
+    # Запись через временный файл: читатель не увидит наполовину записанный файл.
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        log.error(f"Invalid metrics file {path}: {e}")
+        return {}
+
+
+def _is_process_alive(process_id: str) -> bool:
+    pid, __, started_at = process_id.partition("_")
+    pid = int(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # Процесс с тем же PID, но другим временем запуска – новый процесс.
+    current_started_at = _get_process_start_time(pid)
+    return not started_at or current_started_at in (None, started_at)
+
+
+@contextmanager
+def _dir_lock():
+    with open(_get_dir() / LOCK_FILE_NAME, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _merge(target: dict, data: dict) -> None:
+    histograms = target.setdefault("histograms", {})
+    for name, labels, values in data.get("histograms", []):
+        key = (name, tuple(map(tuple, labels)))
+        if (merged := histograms.get(key)) is None:
+            histograms[key] = list(values)
+        elif len(merged) == len(values):
+            histograms[key] = [a + b for a, b in zip(merged, values)]
+    counters = target.setdefault("counters", {})
+    for name, labels, value in data.get("counters", []):
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+
+
+def _to_dump(merged: dict) -> dict:
+    return {
+        "histograms": [
+            [name, list(labels), values]
+            for (name, labels), values in merged.get("histograms", {}).items()
+        ],
+        "counters": [
+            [name, list(labels), value]
+            for (name, labels), value in merged.get("counters", {}).items()
+        ],
+    }
+
+
+def collect() -> dict:
+    """Суммирует метрики всех процессов и архивирует файлы завершившихся."""
+    registry.flush(force=True)
+    merged = {}
+    with _dir_lock():
+        archive_path = _get_dir() / ARCHIVE_FILE_NAME
+        archive = {}
+        _merge(archive, _read_json(archive_path))
+        dead_paths = []
+        for path in _get_dir().glob(f"{PROCESS_FILE_PREFIX}*.json"):
+            try:
+                is_alive = _is_process_alive(
+                    path.stem.removeprefix(PROCESS_FILE_PREFIX)
+                )
+            except ValueError:
+                continue
+            if is_alive:
+                _merge(merged, _read_json(path))
+            else:
+                _merge(archive, _read_json(path))
+                dead_paths.append(path)
+        archive = _to_dump(archive)
+        if dead_paths:
+            _write_json(archive_path, archive)
+            for path in dead_paths:
+                path.unlink(missing_ok=True)
+        _merge(merged, archive)
+    return merged
+
+
+def render_prometheus(merged: dict) -> str:
+    lines = []
+    histograms = merged.get("histograms", {})
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric_name, labels), values in sorted(histograms.items()):
+            if metric_name != name:
+                continue
+            cumulative = 0
+            for bucket, count in zip(buckets, values):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels, le=bucket)} {cumulative}"
+                )
+            count, total = values[-2], values[-1]
+            lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+    counters = merged.get("counters", {})
+    for name, description in COUNTERS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric_name, labels), value in sorted(counters.items()):
+            if metric_name == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels, **extra) -> str:
+    items = [*labels, *((k, str(v)) for k, v in extra.items())]
+    if not items:
+        return ""
+    values = ",".join(f'{k}="{_escape(str(v))}"' for k, v in items)
+    return f"{{{values}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.async_utils import aget_user, db_thread_hook, run_in_db_thread
+from monitoring.metrics import registry
+from monitoring.profiler import QueryLogger, SamplingProfiler
+from monitoring.services import save_request_profile
+
+log = logging.getLogger(__name__)
+
+# Метка маршрута для запросов, которые не нашлись в urls.
+UNRESOLVED_ROUTE = "unresolved"
+# Заголовок или параметр запроса, включающий профилирование.
+PROFILE_META_KEY = "HTTP_X_UTMCRAFT_PROFILE"
+PROFILE_PARAM = "_profile"
+# Заголовок ответа с pk сохраненного профиля.
+PROFILE_ID_HEADER = "X-Utmcraft-Profile-Id"
+
+
+class QueryTimer:
+    """execute_wrapper, который считает SQL-запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.count += 1
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """execute_wrapper для всех подключений к БД текущего потока."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+class AsyncCapableMiddleware:
+    """
+    Middleware, которая работает и под WSGI, и под ASGI без переключения в поток.
+    Под ASGI запросы к БД выполняются в пуле потоков БД (core.async_utils), поэтому
+    обертки SQL-запросов подключаются к ним через db_thread_hook. Запросы
+    синхронных представлений под ASGI Django выполняет в своем потоке, и они
+    в обертки не попадают.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Записывает по маршрутам гистограммы времени запроса, количества и времени
+    SQL-запросов, времени рендеринга шаблонного ответа и размера ответа.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def call(self, request):
+        started_at = time.perf_counter()
+        request._metrics_render_duration = 0.0
+        query_timer = QueryTimer()
+        with execute_wrapper(query_timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+        self._observe(request, response, duration, query_timer)
+        return response
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+        request._metrics_render_duration = 0.0
+        query_timer = QueryTimer()
+        with db_thread_hook(lambda: execute_wrapper(query_timer)):
+            response = await self.get_response(request)
+        duration = time.perf_counter() - started_at
+        self._observe(request, response, duration, query_timer)
+        return response
+
+    @staticmethod
+    def process_template_response(request, response):
+        # Шаблонный ответ рендерится сразу после этого метода.
+        started_at = time.perf_counter()
+
+        def set_render_duration(rendered_response):
+            request._metrics_render_duration = time.perf_counter() - started_at
+
+        response.add_post_render_callback(set_render_duration)
+        return response
+
+    @staticmethod
+    def _observe(request, response, duration: float, query_timer: QueryTimer) -> None:
+        resolver_match = getattr(request, "resolver_match", None)
+        route = resolver_match.view_name if resolver_match else UNRESOLVED_ROUTE
+        labels = (("route", route), ("method", request.method))
+        render_duration = request._metrics_render_duration
+        registry.observe("utmcraft_http_request_duration_seconds", labels, duration)
+        registry.observe(
+            "utmcraft_http_request_python_duration_seconds",
+            labels,
+            max(duration - query_timer.duration - render_duration, 0.0),
+        )
+        registry.observe("utmcraft_http_request_sql_queries", labels, query_timer.count)
+        registry.observe(
+            "utmcraft_http_request_sql_duration_seconds", labels, query_timer.duration
+        )
+        registry.observe(
+            "utmcraft_http_request_render_duration_seconds", labels, render_duration
+        )
+        # Размер потокового ответа заранее неизвестен.
+        if not response.streaming:
+            registry.observe(
+                "utmcraft_http_response_size_bytes", labels, len(response.content)
+            )
+        registry.inc(
+            "utmcraft_http_requests_total",
+            (*labels, ("status", str(response.status_code))),
+        )
+        registry.flush()
+
+
+class ProfilerMiddleware(AsyncCapableMiddleware):
+    """
+    Профилирует запрос staff-пользователя с заголовком X-Utmcraft-Profile или
+    параметром ?_profile: семплирующий профайлер снимает стеки потока запроса,
+    SQL-запросы записываются с параметрами и временем. Остальные запросы проходят без
+    изменений. Тело потокового ответа формируется после middleware и в профиль
+    не попадает. Под ASGI профилируются потоки БД, в которых выполняется запрос.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def call(self, request):
+        if not self._is_profile_requested(request) or not request.user.is_staff:
+            return self.get_response(request)
+        profiler = SamplingProfiler(
+            thread_id=threading.get_ident(), interval=settings.PROFILER_INTERVAL
+        )
+        query_logger = QueryLogger(max_queries=settings.PROFILER_MAX_QUERIES)
+        started_at = time.perf_counter()
+        profiler.start()
+        try:
+            with execute_wrapper(query_logger):
+                response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration = time.perf_counter() - started_at
+        self._save_profile(request, response, duration, profiler, query_logger)
+        return response
+
+    async def __acall__(self, request):
+        if not self._is_profile_requested(request):
+            return await self.get_response(request)
+        if not (await aget_user(request)).is_staff:
+            return await self.get_response(request)
+        # Стеки всех потоков БД запроса собираются в один профайлер.
+        profiler = SamplingProfiler(thread_id=0, interval=settings.PROFILER_INTERVAL)
+        query_logger = QueryLogger(max_queries=settings.PROFILER_MAX_QUERIES)
+
+        @contextmanager
+        def profile_db_thread():
+            thread_profiler = SamplingProfiler(
+                thread_id=threading.get_ident(), interval=settings.PROFILER_INTERVAL
+            )
+            thread_profiler.start()
+            try:
+                with execute_wrapper(query_logger):
+                    yield
+            finally:
+                thread_profiler.stop()
+                profiler.merge(thread_profiler)
+
+        started_at = time.perf_counter()
+        with db_thread_hook(profile_db_thread):
+            response = await self.get_response(request)
+        duration = time.perf_counter() - started_at
+        await run_in_db_thread(
+            self._save_profile, request, response, duration, profiler, query_logger
+        )
+        return response
+
+    @staticmethod
+    def _save_profile(
+        request,
+        response,
+        duration: float,
+        profiler: SamplingProfiler,
+        query_logger: QueryLogger,
+    ) -> None:
+        try:
+            profile = save_request_profile(
+                request, response, duration, profiler, query_logger
+            )
+        except Exception as e:
+            log.exception(f"Failed to save request profile: {e}")
+        else:
+            response[PROFILE_ID_HEADER] = str(profile.pk)
+
+    @staticmethod
+    def _is_profile_requested(request) -> bool:
+        # Сначала дешевые проверки META, чтобы не разбирать строку запроса.
+        return PROFILE_META_KEY in request.META or (
+            PROFILE_PARAM in request.META.get("QUERY_STRING", "")
+            and PROFILE_PARAM in request.GET
+        )
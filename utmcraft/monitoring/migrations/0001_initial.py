@@ -0,0 +1,97 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:21
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="дата создания"
+                    ),
+                ),
+                ("method", models.CharField(max_length=10, verbose_name="метод")),
+                ("path", models.TextField(verbose_name="путь")),
+                (
+                    "route",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="маршрут"
+                    ),
+                ),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(verbose_name="код ответа"),
+                ),
+                ("duration", models.FloatField(verbose_name="время запроса, с")),
+                (
+                    "interval",
+                    models.FloatField(verbose_name="интервал семплирования, с"),
+                ),
+                (
+                    "samples",
+                    models.PositiveIntegerField(verbose_name="количество семплов"),
+                ),
+                (
+                    "stacks",
+                    models.TextField(
+                        blank=True,
+                        help_text=(
+                            "Стеки в свернутом формате (collapsed stacks) для"
+                            " flamegraph."
+                        ),
+                        verbose_name="стеки",
+                    ),
+                ),
+                (
+                    "queries_count",
+                    models.PositiveIntegerField(verbose_name="количество SQL-запросов"),
+                ),
+                (
+                    "queries",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Сохраняются первые PROFILER_MAX_QUERIES запросов.",
+                        verbose_name="SQL-запросы",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "профиль запроса",
+                "verbose_name_plural": "профили запросов",
+                "ordering": ["-pk"],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+User = get_user_model()
+
+
+class RequestProfile(models.Model):
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("дата создания")
+    )
+    user = models.ForeignKey(
+        to=User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name=_("пользователь"),
+    )
+    method = models.CharField(max_length=10, verbose_name=_("метод"))
+    path = models.TextField(verbose_name=_("путь"))
+    route = models.CharField(max_length=255, blank=True, verbose_name=_("маршрут"))
+    status_code = models.PositiveSmallIntegerField(verbose_name=_("код ответа"))
+    duration = models.FloatField(verbose_name=_("время запроса, с"))
+    interval = models.FloatField(verbose_name=_("интервал семплирования, с"))
+    samples = models.PositiveIntegerField(verbose_name=_("количество семплов"))
+    stacks = models.TextField(
+        blank=True,
+        verbose_name=_("стеки"),
+        help_text=_("Стеки в свернутом формате (collapsed stacks) для flamegraph."),
+    )
+    queries_count = models.PositiveIntegerField(
+        verbose_name=_("количество SQL-запросов")
+    )
+    queries = models.JSONField(
+        verbose_name=_("SQL-запросы"),
+        encoder=DjangoJSONEncoder,
+        default=list,
+        help_text=_("Сохраняются первые PROFILER_MAX_QUERIES запросов."),
+    )
+
+    class Meta:
+        ordering = ["-pk"]
+        verbose_name = _("профиль запроса")
+        verbose_name_plural = _("профили запросов")
+
+    def __str__(self):
+        return f"{self.__class__.__name__} {self.method} {self.path} ({self.pk})"
+
+    @property
+    def queries_duration(self) -> float:
+        return sum(query["duration"] for query in self.queries)
@@ -0,0 +1,96 @@
+"""
+Семплирующий профайлер одного запроса: отдельный поток раз в PROFILER_INTERVAL секунд
+снимает стек потока запроса и считает одинаковые стеки. Результат – стеки в свернутом
+формате (collapsed stacks), который понимают flamegraph.pl и speedscope.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+# Корни путей, которые убираются из названий фреймов.
+_PATH_ROOTS = sorted(
+    {str(Path(settings.BASE_DIR)), *(p for p in sys.path if p)},
+    key=len,
+    reverse=True,
+)
+
+
+@lru_cache(maxsize=4096)
+def _get_short_path(path: str) -> str:
+    for root in _PATH_ROOTS:
+        if path.startswith(root + "/"):
+            return path[len(root) + 1 :]
+    return path
+
+
+def _get_frame_title(code) -> str:
+    # ";" разделяет фреймы в свернутом формате.
+    title = (
+        f"{code.co_name} ({_get_short_path(code.co_filename)}:{code.co_firstlineno})"
+    )
+    return title.replace(";", ":")
+
+
+class SamplingProfiler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if (frame := sys._current_frames().get(self.thread_id)) is None:  # noqa
+                continue
+            titles = []
+            while frame is not None:
+                titles.append(_get_frame_title(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(titles))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def merge(self, other: "SamplingProfiler") -> None:
+        self.stacks.update(other.stacks)
+        self.samples += other.samples
+
+    def get_collapsed_stacks(self) -> str:
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.stacks.most_common()
+        )
+
+
+class QueryLogger:
+    """execute_wrapper, который записывает SQL-запросы с параметрами и временем."""
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.queries: list[dict] = []
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            if len(self.queries) < self.max_queries:
+                self.queries.append(
+                    {
+                        "alias": context["connection"].alias,
+                        "duration": time.perf_counter() - started_at,
+                        "sql": sql,
+                        "params": repr(params)[: settings.PROFILER_MAX_PARAMS_LENGTH],
+                        "many": many,
+                    }
+                )
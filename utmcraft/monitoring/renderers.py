@@ -0,0 +1,13 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Ошибки DRF (например, отказ в доступе) приходят словарем.
+        if isinstance(data, dict):
+            data = str(data.get("detail", data))
+        return data.encode(self.charset)
@@ -0,0 +1,16 @@
+from django.db.models import QuerySet
+
+from monitoring.models import RequestProfile
+
+
+def get_request_profiles() -> QuerySet[RequestProfile]:
+    # Стеки и SQL-лог в списке не нужны, а занимают большую часть строки.
+    return (
+        RequestProfile.objects.select_related("user")
+        .defer("stacks", "queries")
+        .order_by("-pk")
+    )
+
+
+def get_request_profile_by_pk(pk: int) -> RequestProfile | None:
+    return RequestProfile.objects.filter(pk=pk).first()
@@ -0,0 +1,64 @@
+import logging
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from monitoring.models import RequestProfile
+from monitoring.profiler import QueryLogger, SamplingProfiler
+
+log = logging.getLogger(__name__)
+
+
+def save_request_profile(
+    request: HttpRequest,
+    response: HttpResponse,
+    duration: float,
+    profiler: SamplingProfiler,
+    query_logger: QueryLogger,
+) -> RequestProfile:
+    resolver_match = getattr(request, "resolver_match", None)
+    profile = RequestProfile.objects.create(
+        user=request.user,
+        method=request.method,
+        path=request.get_full_path(),
+        route=resolver_match.view_name if resolver_match else "",
+        status_code=response.status_code,
+        duration=duration,
+        interval=profiler.interval,
+        samples=profiler.samples,
+        stacks=profiler.get_collapsed_stacks(),
+        queries_count=query_logger.count,
+        queries=query_logger.queries,
+    )
+    # Храним только последние PROFILER_MAX_PROFILES профилей.
+    pks = RequestProfile.objects.order_by("-pk").values_list("pk", flat=True)
+    max_profiles = settings.PROFILER_MAX_PROFILES
+    if outdated_pks := list(pks[max_profiles : max_profiles + 1]):
+        RequestProfile.objects.filter(pk__lte=outdated_pks[0]).delete()
+    log.info(
+        f"Saved request profile pk={profile.pk} for {request.method}"
+        f" {request.path} by user.pk={request.user.pk}"
+    )
+    return profile
+
+
+def format_queries(profile: RequestProfile) -> str:
+    """SQL-лог профиля в текстовом виде."""
+    lines = [
+        f"-- {profile.queries_count} queries,"
+        f" {profile.queries_duration * 1000:.1f} ms in saved queries"
+    ]
+    for query in profile.queries:
+        lines.append("")
+        lines.append(
+            f"-- {query['duration'] * 1000:.2f} ms [{query['alias']}]"
+            + (" executemany" if query["many"] else "")
+        )
+        lines.append(f"-- params: {query['params']}")
+        lines.append(f"{query['sql']};")
+    if profile.queries_count > len(profile.queries):
+        lines.append("")
+        lines.append(
+            f"-- {profile.queries_count - len(profile.queries)} more queries not saved"
+        )
+    return "\n".join(lines) + "\n"
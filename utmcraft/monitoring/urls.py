@@ -0,0 +1,25 @@
+from django.urls import path
+
+from monitoring.views import (
+    MetricsAPIView,
+    RequestProfileListView,
+    RequestProfileQueriesView,
+    RequestProfileStacksView,
+)
+
+app_name = "monitoring"
+
+urlpatterns = [
+    path("metrics", MetricsAPIView.as_view(), name="metrics"),
+    path("profiles/", RequestProfileListView.as_view(), name="profiles"),
+    path(
+        "profiles/<int:pk>/stacks.txt",
+        RequestProfileStacksView.as_view(),
+        name="profile_stacks",
+    ),
+    path(
+        "profiles/<int:pk>/queries.sql",
+        RequestProfileQueriesView.as_view(),
+        name="profile_queries",
+    ),
+]
@@ -0,0 +1,90 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpResponse
+from django.urls import reverse_lazy
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from django.views.generic import ListView
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from monitoring.metrics import collect, render_prometheus
+from monitoring.models import RequestProfile
+from monitoring.renderers import PrometheusRenderer
+from monitoring.selectors import get_request_profile_by_pk, get_request_profiles
+from monitoring.services import format_queries
+
+
+class MetricsAPIView(APIView):
+    # Basic-аутентификация – для сборщика метрик Prometheus.
+    authentication_classes = (SessionAuthentication, BasicAuthentication)
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+
+    @extend_schema(
+        description=_(
+            "Метрики запросов всех процессов в текстовом формате Prometheus. Доступно"
+            " только staff-пользователям."
+        ),
+        responses=OpenApiTypes.STR,
+    )
+    def get(self, request, *args, **kwargs):  # noqa
+        return Response(
+            render_prometheus(collect()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class StaffRequiredMixin(LoginRequiredMixin):
+    login_url = reverse_lazy("auth:login")
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not request.user.is_staff:
+            raise Http404
+        return super().dispatch(request, *args, **kwargs)
+
+
+class RequestProfileListView(StaffRequiredMixin, ListView):
+    template_name = "profiles.html"
+    context_object_name = "profiles"
+
+    def get_queryset(self):
+        return get_request_profiles()
+
+
+class BaseRequestProfileDownloadView(StaffRequiredMixin, View):
+    file_name = None
+
+    def get(self, request, *args, **kwargs):  # noqa
+        if not (profile := get_request_profile_by_pk(kwargs["pk"])):
+            raise Http404
+        response = HttpResponse(
+            self.get_content(profile), content_type="text/plain; charset=utf-8"
+        )
+        if "download" in request.GET:
+            response["Content-Disposition"] = (
+                f'attachment; filename="profile_{profile.pk}_{self.file_name}"'
+            )
+        return response
+
+    def get_content(self, profile: RequestProfile) -> str:
+        raise NotImplementedError
+
+
+class RequestProfileStacksView(BaseRequestProfileDownloadView):
+    """Стеки в свернутом формате: flamegraph.pl profile.txt > profile.svg."""
+
+    file_name = "stacks.txt"
+
+    def get_content(self, profile: RequestProfile) -> str:
+        return profile.stacks + "\n"
+
+
+class RequestProfileQueriesView(BaseRequestProfileDownloadView):
+    file_name = "queries.sql"
+
+    def get_content(self, profile: RequestProfile) -> str:
+        return format_queries(profile)
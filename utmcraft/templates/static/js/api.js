@@ -1,6 +1,7 @@
 const FormHTMLRoute = '/core/api/form_html'
 const ResultBlocksHTMLRoute = '/core/api/result_blocks_html'
 const ParserRoute = '/core/api/parser'
+const MatrixRoute = '/core/api/matrix'
 const ClientAdminInputTextRoute = '/settings/api/v1/input-text/'
 const ClientAdminInputIntRoute = '/settings/api/v1/input-int/'
 const ClientAdminCheckboxRoute = '/settings/api/v1/checkbox/'
@@ -29,6 +30,19 @@ const fetchResultBlocksHTML = async (data) => {
 }
 
 
+const fetchMatrixCSV = async (data) => {
+    return await fetch(MatrixRoute + '?' + new URLSearchParams({format: 'csv'}), {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': Cookies.get('csrftoken'),
+            'Content-Type': 'application/json'
+        },
+        mode: 'same-origin',
+        body: data
+    })
+}
+
+
 const fetchParserData = async (utmHashcode) => {
     const response = await fetch(ParserRoute + '?' + new URLSearchParams({utm_hashcode: utmHashcode}))
     if (response.status === 500) {
@@ -97,10 +97,89 @@ const initFormOnsubmitListener = () => {
         return JSON.stringify(data)
     }
 
+    const getUtmMatrixData = () => {
+        const form = document.getElementById('builder-form')
+        const formdata = new FormData(form)
+        const data = {
+            form_id: 0,
+            form_data: {},
+            matrix: {},
+        }
+        const values = {}
+        for (let pair of formdata.entries()) {
+            const name = pair[0]
+            const value = pair[1]
+            if (name === 'form_id') {
+                data.form_id = value
+                continue
+            }
+            if (name === 'csrfmiddlewaretoken' || name === 'build') {
+                continue
+            }
+            if (!(name in values)) {
+                values[name] = []
+            }
+            // В полях ввода несколько значений перечисляются через ';'.
+            const field = document.getElementById(`id_${name}`)
+            if (/^\d+$/.test(name) && !!field && field.tagName === 'INPUT' && field.type === 'text') {
+                values[name].push(...value.split(MatrixValuesSeparator).map(v => v.trim()).filter(v => v))
+            } else {
+                values[name].push(value)
+            }
+        }
+        for (const [name, fieldValues] of Object.entries(values)) {
+            data.form_data[name] = fieldValues.length > 0 ? fieldValues[0] : ''
+            if (fieldValues.length > 1) {
+                data.matrix[name] = fieldValues
+            }
+        }
+        return JSON.stringify(data)
+    }
+
+    const buildMatrix = async () => {
+        const resultArea = document.getElementById('result-area')
+        const showError = (errorText) => {
+            resultArea.innerHTML = '<div class="alert alert-danger mb-3" role="alert"></div>'
+            resultArea.firstChild.textContent = errorText
+            setIsVisibleByElemsIds(['result-area'], true)
+        }
+        const response = await fetchMatrixCSV(getUtmMatrixData())
+        if (!response.ok) {
+            let errorText = 'Не получилось прометить матрицу.'
+            try {
+                errorText = Object.values(await response.json()).flat().join(' ')
+            } catch {
+            }
+            showError(errorText)
+            return
+        }
+        let blob
+        try {
+            // Если расчет оборвался на середине, сервер закрывает соединение.
+            blob = await response.blob()
+        } catch {
+            showError('Не получилось прометить матрицу целиком, попробуйте еще раз.')
+            return
+        }
+        const link = document.createElement('a')
+        link.href = URL.createObjectURL(blob)
+        link.download = 'utm_matrix.csv'
+        link.click()
+        URL.revokeObjectURL(link.href)
+    }
+
+    initMatrixMode()
+
     if (!!form) {
         form.onsubmit = async (e) => {
             e.preventDefault()
             showSpinner()
+            const matrixMode = document.getElementById('matrix-mode')
+            if (!!matrixMode && matrixMode.checked) {
+                await buildMatrix()
+                hideSpinner()
+                return
+            }
             const rawData = getUtmBuilderData()
             const resultData = await fetchResultBlocksHTML(rawData)
             const resultArea = document.getElementById('result-area')
@@ -114,6 +193,31 @@ const initFormOnsubmitListener = () => {
 }
 
 
+const MatrixValuesSeparator = ';'
+
+
+const initMatrixMode = () => {
+    const matrixMode = document.getElementById('matrix-mode')
+    if (!matrixMode) {
+        return
+    }
+    matrixMode.onchange = () => {
+        // В режиме матрицы в списках можно выбрать несколько значений, а в числовых
+        // полях перечислить несколько чисел через ';'.
+        const selects = $('#builder-form select.form-select2, #builder-form select.form-select2-no-search')
+        selects.select2('destroy')
+        selects.each((i, select) => {
+            select.multiple = matrixMode.checked
+        })
+        initSelect2()
+        document.querySelectorAll('#builder-form input[type="number"], #builder-form input[data-matrix-number]').forEach(input => {
+            input.type = matrixMode.checked ? 'text' : 'number'
+            input.toggleAttribute('data-matrix-number', matrixMode.checked)
+        })
+    }
+}
+
+
 const initSelectDependencies = () => {
     const selectDependencies = document.getElementById('select-dependencies-data')
     if (!selectDependencies) {